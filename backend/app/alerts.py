@@ -0,0 +1,230 @@
+"""
+Stock and pending check-in alert generation.
+
+Low / out of stock alerts are event driven: every stock write path calls
+update_stock_alerts() with the (item_id, store_id) pairs it touched, which
+compares their totals with the state kept in stock_alert_states and only
+creates or resolves notifications on a transition (ok -> low -> out -> ok).
+generate_stock_alerts() re-evaluates every pair and only runs as an
+infrequent reconcile job.
+
+Pending check-in alerts are generated by the background job runner
+(app.tasks) on a schedule, or queued on demand through
+POST /api/notifications/generate-pending-checkin-alerts.
+"""
+from datetime import datetime
+from typing import Iterable, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.change_hooks import on_commit
+from app.notification_bus import notification_bus
+from app.models import (
+    Notification, NotificationType, NotificationStatus, Inventory, Item, Store, Box, StockAlertState
+)
+from app.stock import STOCK_MIN_LEVEL, with_stock_thresholds
+
+StockKey = Tuple[int, int]  # (item_id, store_id)
+
+ALERT_LOW = "low"
+ALERT_OUT = "out"
+ALERT_OK = "ok"
+
+# Pairs evaluated per statement when reconciling all inventory
+RECONCILE_BATCH_SIZE = 500
+
+
+def stock_state(quantity: int, min_level) -> str:
+    if quantity <= 0:
+        return ALERT_OUT
+    if min_level is not None and quantity <= min_level:
+        return ALERT_LOW
+    return ALERT_OK
+
+
+def update_stock_alerts(db: Session, keys: Iterable[StockKey]) -> int:
+    """
+    Re-evaluate the alert state of the given (item_id, store_id) pairs after a
+    stock movement and create / resolve notifications for pairs whose state
+    changed (ok -> low -> out -> ok). Costs a few queries for the changed
+    pairs only, never a scan of all inventory.
+
+    Runs in a SAVEPOINT: a failure (e.g. two requests entering the same state
+    at once) is logged and left to the periodic reconcile job instead of
+    failing the stock movement. The caller commits.
+    Returns the number of state transitions.
+    """
+    keys = {(item_id, store_id) for item_id, store_id in keys if item_id and store_id}
+    if not keys:
+        return 0
+
+    try:
+        with db.begin_nested():
+            return _apply_stock_alerts(db, keys)
+    except Exception as e:
+        print(f"[Alerts] Could not update stock alerts for {len(keys)} item/store pair(s): {e}")
+        return 0
+
+
+def _apply_stock_alerts(db: Session, keys: Set[StockKey]) -> int:
+    db.flush()  # Evaluate the movement being written
+    item_ids = {item_id for item_id, _ in keys}
+    store_ids = {store_id for _, store_id in keys}
+
+    # Current totals over the per-box rows against the item's current thresholds
+    # (inactive items never alert)
+    levels = {}
+    for item_id, store_id, quantity, min_level in with_stock_thresholds(db.query(
+        Inventory.item_id,
+        Inventory.store_id,
+        func.sum(Inventory.quantity),
+        func.max(STOCK_MIN_LEVEL),
+    ).join(
+        Item, Item.item_id == Inventory.item_id
+    )).filter(
+        Inventory.item_id.in_(item_ids),
+        Inventory.store_id.in_(store_ids),
+        Item.status == "active"
+    ).group_by(Inventory.item_id, Inventory.store_id):
+        if (item_id, store_id) in keys:
+            levels[(item_id, store_id)] = (int(quantity or 0), min_level)
+
+    states = {
+        (row.item_id, row.store_id): row
+        for row in db.query(StockAlertState).filter(
+            StockAlertState.item_id.in_(item_ids),
+            StockAlertState.store_id.in_(store_ids)
+        )
+        if (row.item_id, row.store_id) in keys
+    }
+
+    transitions = []
+    for key in keys:
+        quantity, min_level = levels.get(key, (None, None))
+        # Pairs without inventory rows (deleted) or inactive items are ok
+        new_state = stock_state(quantity, min_level) if quantity is not None else ALERT_OK
+        current = states.get(key)
+        if (current.state if current else ALERT_OK) != new_state:
+            transitions.append((key, current, new_state, quantity))
+    if not transitions:
+        return 0
+
+    # Resolve the open alerts of pairs leaving their state
+    resolved_ids = [current.notification_id for _, current, _, _ in transitions if current and current.notification_id]
+    if resolved_ids:
+        db.query(Notification).filter(
+            Notification.notification_id.in_(resolved_ids),
+            Notification.status == NotificationStatus.unread
+        ).update({
+            Notification.status: NotificationStatus.read,
+            Notification.read_at: datetime.utcnow()
+        }, synchronize_session=False)
+        # Bulk UPDATE is invisible to the change hooks - hint clients to refetch
+        on_commit(db, lambda: notification_bus.publish("unread_changed", {"reason": "alerts_resolved"}))
+
+    alerting = [key for key, _, new_state, _ in transitions if new_state != ALERT_OK]
+    names = {}
+    if alerting:
+        items = dict(
+            db.query(Item.item_id, Item).filter(Item.item_id.in_({item_id for item_id, _ in alerting})).all()
+        )
+        store_names = dict(
+            db.query(Store.store_id, Store.store_name).filter(Store.store_id.in_({store_id for _, store_id in alerting})).all()
+        )
+        names = {key: (items.get(key[0]), store_names.get(key[1])) for key in alerting}
+
+    now = datetime.now()
+    opened = []  # (state row, new notification)
+    for key, current, new_state, quantity in transitions:
+        if new_state == ALERT_OK:
+            db.delete(current)
+            continue
+
+        item, store_name = names[key]
+        notification = _stock_notification(key, item, store_name, new_state, quantity)
+        db.add(notification)
+
+        if current is None:
+            current = StockAlertState(item_id=key[0], store_id=key[1])
+            db.add(current)
+        current.state = new_state
+        current.quantity = quantity
+        current.changed_at = now
+        opened.append((current, notification))
+
+    db.flush()  # Assigns notification ids
+    for current, notification in opened:
+        current.notification_id = notification.notification_id
+    db.flush()
+    return len(transitions)
+
+
+def _stock_notification(key: StockKey, item: Optional[Item], store_name: Optional[str], state: str, quantity: int) -> Notification:
+    item_id, store_id = key
+    item_name = item.item_name if item else f"Item {item_id}"
+    item_code = item.item_code if item else None
+    link = f"/inventory?item_id={item_id}&store_id={store_id}"
+
+    if state == ALERT_OUT:
+        return Notification(
+            user_id=None,  # All users
+            type=NotificationType.out_of_stock,
+            title=f"Out of Stock: {item_name}",
+            message=f"{item_name} is out of stock at {store_name}",
+            link=link,
+            notification_data={"item_id": item_id, "store_id": store_id, "item_code": item_code}
+        )
+    return Notification(
+        user_id=None,  # All users
+        type=NotificationType.low_stock,
+        title=f"Low Stock: {item_name}",
+        message=f"{item_name} is running low ({quantity} remaining) at {store_name}",
+        link=link,
+        notification_data={"item_id": item_id, "store_id": store_id, "item_code": item_code, "quantity": quantity}
+    )
+
+
+def generate_stock_alerts(db: Session) -> int:
+    """
+    Reconcile the alert state of every item/store pair (safety net for
+    changes made outside the stock write paths, e.g. direct SQL or level
+    changes). Stock movements update alerts themselves through
+    update_stock_alerts. The caller commits.
+    Returns the number of state transitions.
+    """
+    keys = set(db.query(Inventory.item_id, Inventory.store_id).distinct().all())
+    keys |= set(db.query(StockAlertState.item_id, StockAlertState.store_id).all())
+
+    ordered = sorted(keys)
+    transitions = 0
+    for start in range(0, len(ordered), RECONCILE_BATCH_SIZE):
+        transitions += update_stock_alerts(db, ordered[start:start + RECONCILE_BATCH_SIZE])
+    return transitions
+
+
+def generate_pending_checkin_alerts(db: Session) -> int:
+    """
+    Create one notification for boxes waiting to be checked in, unless an
+    unread one already exists. The caller commits.
+    """
+    pending_box_ids = [box_id for (box_id,) in db.query(Box.box_id).filter(Box.status == "pending_checkin")]
+    if not pending_box_ids:
+        return 0
+
+    existing = db.query(Notification.notification_id).filter(
+        Notification.type == NotificationType.pending_checkin,
+        Notification.status == NotificationStatus.unread
+    ).first()
+    if existing:
+        return 0
+
+    db.add(Notification(
+        user_id=None,  # All users
+        type=NotificationType.pending_checkin,
+        title=f"{len(pending_box_ids)} Box(es) Pending Check-In",
+        message=f"You have {len(pending_box_ids)} box(es) waiting to be checked in",
+        link="/receiving",
+        notification_data={"count": len(pending_box_ids), "box_ids": pending_box_ids}
+    ))
+    return 1
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func, or_
 from typing import Optional, List
 from datetime import datetime, date
-import json
 
 from app.database import get_db
 from app.models import (
@@ -22,8 +22,14 @@ from app.schemas import (
     BoxWithContents,
     BoxContentResponse,
     BoxCheckIn,
+    BoxLabelsRequest,
+    LabelLayoutName,
 )
 from app.auth import get_current_user
+from app.labels import LabelSpec, label_renderer, build_sheet_pdf
+from app.alerts import update_stock_alerts
+from app.serializers import FastJSONResponse, box_row
+from app.stock import load_stock_levels, DEFAULT_MIN_LEVEL, DEFAULT_MAX_LEVEL
 
 
 router = APIRouter(prefix="/api/boxes", tags=["Boxes"])
@@ -419,59 +425,25 @@ async def checkin_box(
 
         contents = db.query(BoxContent).filter(BoxContent.box_id == box_id).all()
 
+        # Min/max levels from each item type's size_stock_levels (one query for all contents)
+        stock_levels = load_stock_levels(db, [content.item_id for content in contents])
+
         for content in contents:
-            # Get item to determine stock levels
-            item = db.query(Item).filter(Item.item_id == content.item_id).first()
+            min_level, max_level = stock_levels.get(content.item_id, (DEFAULT_MIN_LEVEL, DEFAULT_MAX_LEVEL))
             
             # ALWAYS create a new inventory record for each box checkin
-            # This ensures items from different boxes remain separate
-            # Get min/max levels from item type's size_stock_levels
-            min_level = 50
-            max_level = 1000
-            
-            if item:
-                # Get batch and item type
-                batch = db.query(ItemBatch).filter(ItemBatch.batch_id == item.batch_id).first()
-                if batch:
-                    item_type = db.query(ItemType).filter(ItemType.type_id == batch.type_id).first()
-                    if item_type:
-                        # Parse size_stock_levels if exists
-                        size_stock_levels = None
-                        if hasattr(item_type, 'size_stock_levels') and item_type.size_stock_levels:
-                            if isinstance(item_type.size_stock_levels, str):
-                                try:
-                                    size_stock_levels = json.loads(item_type.size_stock_levels)
-                                except (json.JSONDecodeError, TypeError):
-                                    size_stock_levels = None
-                            else:
-                                size_stock_levels = item_type.size_stock_levels
-                        
-                        # If item has size and size_stock_levels exists, use size-specific levels
-                        if item.size and size_stock_levels and isinstance(size_stock_levels, dict):
-                            size_level = size_stock_levels.get(item.size)
-                            if size_level and isinstance(size_level, dict):
-                                min_level = size_level.get('min', item_type.min_stock_level or 50)
-                                max_level = size_level.get('max', item_type.max_stock_level or 1000)
-                            else:
-                                # Use item type default
-                                min_level = item_type.min_stock_level or 50
-                                max_level = item_type.max_stock_level or 1000
-                        else:
-                            # Use item type default
-                            min_level = item_type.min_stock_level or 50
-                            max_level = item_type.max_stock_level or 1000
-            
-            # Create NEW inventory record for this box (don't merge with existing)
+            # This ensures items from different boxes remain separate (FIFO allocation per box)
             inventory = Inventory(
                 store_id=checkin_data.store_id,
                 item_id=content.item_id,
+                box_id=box.box_id,
+                box_reference=box.box_code,
                 quantity=content.quantity,
                 reserved_quantity=0,
                 min_level=min_level,
                 max_level=max_level,
             )
             db.add(inventory)
-            db.flush()  # Flush to get inventory_id
 
             transaction = StockTransaction(
                 transaction_type="box_checkin",
@@ -485,6 +457,7 @@ async def checkin_box(
             )
             db.add(transaction)
 
+        update_stock_alerts(db, [(content.item_id, checkin_data.store_id) for content in contents])
         db.commit()
         db.refresh(box)
 
@@ -598,6 +571,106 @@ async def get_box(
     return response
 
 
+def box_label_specs(db: Session, box_ids: List[int], include_items: bool) -> List[LabelSpec]:
+    """
+    Label contents for boxes (in the given order), each box followed by its
+    item lines. Loads everything with two queries.
+    """
+    boxes = {
+        box.box_id: (box, store_name)
+        for box, store_name in db.query(Box, Store.store_name)
+        .outerjoin(Store, Store.store_id == Box.store_id)
+        .filter(Box.box_id.in_(box_ids))
+    }
+    missing = [box_id for box_id in box_ids if box_id not in boxes]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Box not found: {', '.join(str(box_id) for box_id in missing)}",
+        )
+
+    lines_by_box = {}
+    for content, item in (
+        db.query(BoxContent, Item)
+        .join(Item, Item.item_id == BoxContent.item_id)
+        .filter(BoxContent.box_id.in_(box_ids))
+        .order_by(BoxContent.box_id, BoxContent.content_id)
+    ):
+        lines_by_box.setdefault(content.box_id, []).append((content, item))
+
+    specs: List[LabelSpec] = []
+    for box_id in dict.fromkeys(box_ids):
+        box, store_name = boxes[box_id]
+        lines = lines_by_box.get(box_id, [])
+        references = " / ".join(
+            f"{label} {value}" for label, value in (("PO", box.po_number), ("DO", box.do_number)) if value
+        )
+        details = [
+            box.supplier,
+            references,
+            f"{len(lines)} item line(s), {sum(content.quantity for content, _ in lines)} pcs",
+            " - ".join(part for part in (store_name, box.location_in_store) if part),
+            f"Received {box.received_date}" if box.received_date else None,
+        ]
+        specs.append((box.qr_code or box.box_code, box.box_code, tuple(line for line in details if line)))
+
+        if include_items:
+            for content, item in lines:
+                variant = " / ".join(part for part in (item.size and f"Size {item.size}", item.color) if part)
+                details = [item.item_name, variant, f"Qty {content.quantity} {item.unit_type or 'pcs'} - {box.box_code}"]
+                specs.append((item.qr_code or item.item_code, item.item_code, tuple(line for line in details if line)))
+    return specs
+
+
+def label_pdf_response(specs: List[LabelSpec], layout: str, filename: str) -> Response:
+    try:
+        labels, cached = label_renderer.render_labels(specs, layout)
+        content = build_sheet_pdf(labels, layout)
+    except Exception as e:
+        print(f"[Labels] Could not render {len(specs)} box label(s): {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not generate labels",
+        )
+    return Response(
+        content=content,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Labels-Cached": str(cached),
+        },
+    )
+
+
+@router.post("/labels")
+def get_boxes_labels(
+    labels_request: BoxLabelsRequest,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    Printable labels for many boxes (e.g. a whole delivery) as one PDF:
+    each box label followed by its item labels, in the order given
+    """
+    specs = box_label_specs(db, labels_request.box_ids, labels_request.include_items)
+    filename = f"box-labels-{datetime.now().strftime('%Y%m%d-%H%M%S')}.pdf"
+    return label_pdf_response(specs, labels_request.layout.value, filename)
+
+
+@router.get("/{box_id}/labels")
+def get_box_labels(
+    box_id: int,
+    layout: LabelLayoutName = Query(LabelLayoutName.a4),
+    include_items: bool = Query(True),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Printable PDF with the box label and one label per item line"""
+    specs = box_label_specs(db, [box_id], include_items)
+    box_code = specs[0][1]
+    return label_pdf_response(specs, layout.value, f"{box_code}-labels.pdf")
+
+
 @router.get("/{box_id}/inventory")
 async def get_box_inventory(
     box_id: int,
@@ -680,44 +753,21 @@ async def get_boxes(
     query = query.order_by(Box.created_at.desc())
     boxes = query.offset(skip).limit(limit).all()
 
-    result: List[BoxResponse] = []
-    for box in boxes:
-        contents = db.query(BoxContent).filter(BoxContent.box_id == box.box_id).all()
-        total_items = sum(c.quantity for c in contents)
-
-        # Ensure required fields have values
-        qr_code = box.qr_code if box.qr_code else box.box_code
-        received_by = box.received_by if box.received_by else box.created_by or "System"
-        
-        # Use model_validate for Pydantic v2 compatibility
-        box_dict = {
-            "box_id": box.box_id,
-            "box_code": box.box_code,
-            "qr_code": qr_code,
-            "supplier": box.supplier,
-            "po_number": box.po_number,
-            "do_number": box.do_number,
-            "invoice_number": box.invoice_number,
-            "store_id": box.store_id,
-            "location_in_store": box.location_in_store,
-            "status": box.status,
-            "received_date": box.received_date or date.today(),
-            "received_by": received_by,
-            "checked_in_at": box.checked_in_at or box.checked_in_date,
-            "checked_in_by": box.checked_in_by,
-            "notes": box.notes,
-            "created_at": box.created_at,
-            "updated_at": box.updated_at,
-            "total_items": total_items,
-        }
-        
-        box_response = BoxResponse(**box_dict)
-
-        if box.store_id:
-            store = db.query(Store).filter(Store.store_id == box.store_id).first()
-            if store:
-                box_response.store_name = store.store_name
-
-        result.append(box_response)
-
-    return result
+    # Totals and store names for the whole page in two queries
+    box_ids = [box.box_id for box in boxes]
+    totals = dict(
+        db.query(BoxContent.box_id, func.sum(BoxContent.quantity))
+        .filter(BoxContent.box_id.in_(box_ids))
+        .group_by(BoxContent.box_id)
+    ) if box_ids else {}
+    store_ids = {box.store_id for box in boxes if box.store_id}
+    store_names = dict(
+        db.query(Store.store_id, Store.store_name).filter(Store.store_id.in_(store_ids))
+    ) if store_ids else {}
+
+    # Rows are built from trusted DB values and sent without response_model
+    # validation (app.serializers)
+    return FastJSONResponse(content=[
+        box_row(box, totals.get(box.box_id, 0), store_names.get(box.store_id))
+        for box in boxes
+    ])
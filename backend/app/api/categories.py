@@ -1,8 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, or_
 from typing import Optional, List
-import json
 
 from app.database import get_db
 from app.models import Category, ItemType
@@ -11,6 +10,7 @@ from app.schemas import (
     ItemTypeResponse
 )
 from app.auth import get_current_user
+from app.reference_cache import CATEGORIES, ITEM_TYPES, reference_cache, reference_response, matches_search
 
 router = APIRouter(prefix="/api/categories", tags=["Categories"])
 
@@ -20,6 +20,7 @@ router = APIRouter(prefix="/api/categories", tags=["Categories"])
 
 @router.get("/", response_model=List[CategoryResponse])
 async def get_categories(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     status: Optional[str] = Query(None, regex='^(active|inactive)$'),
@@ -30,38 +31,24 @@ async def get_categories(
 ):
     """
     Get all categories with optional filtering and type counts
+    (served from the reference cache, supports If-None-Match)
     """
-    query = db.query(Category)
-    
-    # Status filter
-    if status:
-        query = query.filter(Category.status == status)
-    
-    # Search filter
-    if search:
-        search_pattern = f"%{search}%"
-        query = query.filter(
-            or_(
-                Category.category_name.like(search_pattern),
-                Category.description.like(search_pattern)
-            )
-        )
-    
-    # Order by display_order, then by name
-    query = query.order_by(Category.display_order.asc(), Category.category_name.asc())
-    
-    # Pagination
-    categories = query.offset(skip).limit(limit).all()
-    
-    # Add type counts if requested
-    if include_counts:
-        for category in categories:
-            type_count = db.query(func.count(ItemType.type_id)).filter(
-                ItemType.category_id == category.category_id
-            ).scalar()
-            category.type_count = type_count
-    
-    return categories
+    def select(rows):
+        rows = [
+            row for row in rows
+            if (not status or row["status"] == status)
+            and matches_search(row, search, ("category_name", "description"))
+        ]
+        return rows[skip:skip + limit]
+
+    def finalize(rows):
+        if not include_counts:
+            for row in rows:
+                row["type_count"] = 0
+        return rows
+
+    params = {"skip": skip, "limit": limit, "status": status, "search": search, "include_counts": include_counts}
+    return reference_response(request, db, CATEGORIES, params, select, finalize=finalize)
 
 @router.get("/{category_id}", response_model=CategoryWithTypes)
 async def get_category(
@@ -93,13 +80,6 @@ async def get_category(
             ItemType.category_id == category_id
         ).order_by(ItemType.display_order.asc(), ItemType.type_name.asc()).all()
         
-        # Parse JSON fields for types
-        for type_obj in types:
-            if type_obj.available_sizes and isinstance(type_obj.available_sizes, str):
-                type_obj.available_sizes = json.loads(type_obj.available_sizes)
-            if type_obj.available_colors and isinstance(type_obj.available_colors, str):
-                type_obj.available_colors = json.loads(type_obj.available_colors)
-        
         category.types = types
     
     return category
@@ -305,6 +285,7 @@ async def reorder_category(
 
 @router.get("/{category_id}/types", response_model=List[ItemTypeResponse])
 async def get_category_types(
+    request: Request,
     category_id: int,
     status: Optional[str] = Query(None, regex='^(active|inactive)$'),
     db: Session = Depends(get_db),
@@ -312,62 +293,21 @@ async def get_category_types(
 ):
     """
     Get all types for a specific category
+    (served from the reference cache, supports If-None-Match)
     """
     # Verify category exists
-    category = db.query(Category).filter(Category.category_id == category_id).first()
-    if not category:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Category not found"
-        )
-    
-    query = db.query(ItemType).filter(ItemType.category_id == category_id)
-    
-    if status:
-        query = query.filter(ItemType.status == status)
-    
-    types = query.order_by(ItemType.display_order.asc(), ItemType.type_name.asc()).all()
-    
-    # Parse JSON fields and add category name to each type
-    for type_obj in types:
-        try:
-            if type_obj.available_sizes and isinstance(type_obj.available_sizes, str):
-                type_obj.available_sizes = json.loads(type_obj.available_sizes)
-            elif type_obj.available_sizes is None:
-                type_obj.available_sizes = []
-            if type_obj.available_colors and isinstance(type_obj.available_colors, str):
-                type_obj.available_colors = json.loads(type_obj.available_colors)
-            elif type_obj.available_colors is None:
-                type_obj.available_colors = []
-            # Handle size_stock_levels - check if column exists first
-            if hasattr(type_obj, 'size_stock_levels'):
-                if type_obj.size_stock_levels and isinstance(type_obj.size_stock_levels, str):
-                    try:
-                        type_obj.size_stock_levels = json.loads(type_obj.size_stock_levels)
-                    except (json.JSONDecodeError, TypeError):
-                        type_obj.size_stock_levels = None
-                elif type_obj.size_stock_levels is None:
-                    type_obj.size_stock_levels = None
-            else:
-                # Column doesn't exist yet - set to None
-                type_obj.size_stock_levels = None
-            
-            type_obj.category_name = category.category_name
-            type_obj.item_count = 0  # Will be updated when items module is implemented
-        except Exception as e:
-            # Log error but continue processing other types
-            print(f"Error processing type {type_obj.type_id}: {str(e)}")
-            # Set defaults to prevent crashes
-            if not hasattr(type_obj, 'available_sizes') or type_obj.available_sizes is None:
-                type_obj.available_sizes = []
-            if not hasattr(type_obj, 'available_colors') or type_obj.available_colors is None:
-                type_obj.available_colors = []
-            if hasattr(type_obj, 'size_stock_levels'):
-                type_obj.size_stock_levels = None
-            type_obj.category_name = category.category_name
-            type_obj.item_count = 0
-    
-    return types
+    if not any(row["category_id"] == category_id for row in reference_cache.get(db, CATEGORIES).rows):
+        # "status" is the query parameter here, not the fastapi module
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    def select(rows):
+        return [
+            row for row in rows
+            if row["category_id"] == category_id and (not status or row["status"] == status)
+        ]
+
+    params = {"category_id": category_id, "status": status}
+    return reference_response(request, db, ITEM_TYPES, params, select)
 
 @router.get("/stats/count")
 async def get_category_stats(
@@ -0,0 +1,253 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from typing import Optional, List
+from datetime import datetime
+
+from app.database import get_db
+from app.models import Issuance, Item, Store, StockTransaction
+from app.schemas import IssuanceCreate, IssuanceResponse, IssuanceLineResponse
+from app.auth import get_current_user
+from app.alerts import update_stock_alerts
+from app.search_index import index_reference
+from app.stock import InventoryLedger, StockError, consume_box_contents, mark_emptied_boxes
+
+router = APIRouter(prefix="/api/issuances", tags=["Issuances"])
+
+# reference_type of the stock_out transactions that make up an issuance
+ISSUANCE_REFERENCE_TYPE = "ISSUANCE"
+
+# ============================================================================
+# HELPER FUNCTIONS
+# ============================================================================
+
+def generate_issuance_number(db: Session) -> str:
+    """Generate unique issuance number ISS-YYYY-NNNN"""
+    year = datetime.now().year
+    last_issuance = (
+        db.query(Issuance)
+        .filter(Issuance.issuance_number.like(f"ISS-{year}-%"))
+        .order_by(Issuance.issuance_id.desc())
+        .first()
+    )
+
+    if last_issuance:
+        new_num = int(last_issuance.issuance_number.split("-")[-1]) + 1
+    else:
+        new_num = 1
+
+    return f"ISS-{year}-{new_num:04d}"
+
+
+def build_issuance_response(db: Session, issuance: Issuance) -> IssuanceResponse:
+    """
+    Load an issuance with all of its lines (one query for the lines joined
+    with their items, one for store names)
+    """
+    rows = db.query(StockTransaction, Item).outerjoin(
+        Item, Item.item_id == StockTransaction.item_id
+    ).filter(
+        StockTransaction.reference_type == ISSUANCE_REFERENCE_TYPE,
+        StockTransaction.reference_number == issuance.issuance_number
+    ).order_by(StockTransaction.transaction_id.asc()).all()
+
+    store_ids = {transaction.from_store_id for transaction, _ in rows if transaction.from_store_id}
+    if issuance.store_id:
+        store_ids.add(issuance.store_id)
+    store_names = dict(
+        db.query(Store.store_id, Store.store_name).filter(Store.store_id.in_(store_ids)).all()
+    ) if store_ids else {}
+
+    response = IssuanceResponse.model_validate(issuance)
+    response.store_name = store_names.get(issuance.store_id)
+    response.lines = [
+        IssuanceLineResponse(
+            transaction_id=transaction.transaction_id,
+            item_id=transaction.item_id,
+            item_code=item.item_code if item else None,
+            item_name=item.item_name if item else None,
+            size=item.size if item else None,
+            store_id=transaction.from_store_id,
+            store_name=store_names.get(transaction.from_store_id),
+            box_id=transaction.box_id,
+            quantity=transaction.quantity,
+            notes=transaction.notes,
+        )
+        for transaction, item in rows
+    ]
+    return response
+
+# ============================================================================
+# ISSUANCE ENDPOINTS
+# ============================================================================
+
+@router.post("/", response_model=IssuanceResponse, status_code=status.HTTP_201_CREATED)
+def create_issuance(
+    issuance_data: IssuanceCreate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Issue many items (e.g. uniforms in several sizes) to an employee or group
+    in one document.
+    - Items and stores are validated with one query each
+    - Stock for all lines is loaded and locked with one query and allocated FIFO
+    - Either every line is issued or none (errors for all failing lines are returned)
+    - One stock_out transaction per line and box it was allocated from, all
+      written with one bulk insert
+    """
+    lines = issuance_data.lines
+
+    # Validate items and stores
+    item_ids = {line.item_id for line in lines}
+    found_items = {item_id for (item_id,) in db.query(Item.item_id).filter(Item.item_id.in_(item_ids))}
+    missing_items = sorted(item_ids - found_items)
+    if missing_items:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Item(s) not found: {', '.join(str(i) for i in missing_items)}"
+        )
+
+    line_stores = [line.store_id or issuance_data.store_id for line in lines]
+    if any(store_id is None for store_id in line_stores):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="store_id is required on the issuance or on every line"
+        )
+    store_ids = set(line_stores)
+    found_stores = {store_id for (store_id,) in db.query(Store.store_id).filter(Store.store_id.in_(store_ids))}
+    missing_stores = sorted(store_ids - found_stores)
+    if missing_stores:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Store(s) not found: {', '.join(str(s) for s in missing_stores)}"
+        )
+
+    try:
+        # Check and allocate stock for all lines against one locked snapshot
+        ledger = InventoryLedger(db)
+        ledger.load({(line.item_id, store_id) for line, store_id in zip(lines, line_stores)})
+
+        allocations = []
+        line_allocations = []  # (line, store_id, [(inventory row, quantity taken)])
+        errors = []
+        for index, (line, store_id) in enumerate(zip(lines, line_stores), start=1):
+            try:
+                taken = ledger.take(line.item_id, store_id, line.quantity, prefer_box_id=line.box_id)
+                allocations.extend(taken)
+                line_allocations.append((line, store_id, taken))
+            except StockError as e:
+                errors.append(f"Line {index} (item {line.item_id}, store {store_id}): {e}")
+
+        if errors:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="; ".join(errors)
+            )
+
+        issuance = Issuance(
+            issuance_number=generate_issuance_number(db),
+            store_id=issuance_data.store_id,
+            employee_name=issuance_data.employee_name,
+            employee_id=issuance_data.employee_id,
+            department=issuance_data.department,
+            reference_number=issuance_data.reference_number,
+            reason=issuance_data.reason,
+            notes=issuance_data.notes,
+            line_count=len(lines),
+            total_quantity=sum(line.quantity for line in lines),
+            created_by=current_user.username,
+        )
+        db.add(issuance)
+        db.flush()  # Writes the document and all inventory updates
+
+        consume_box_contents(db, allocations)
+        mark_emptied_boxes(db, {row.box_id for row, _ in allocations if row.box_id})
+
+        # One multi-row INSERT for all lines: a transaction per box the FIFO allocation took from
+        db.execute(insert(StockTransaction), [
+            {
+                "transaction_type": "stock_out",
+                "item_id": line.item_id,
+                "from_store_id": store_id,
+                "quantity": quantity,
+                "box_id": row.box_id,
+                "reference_number": issuance.issuance_number,
+                "reference_type": ISSUANCE_REFERENCE_TYPE,
+                "employee_name": issuance_data.employee_name,
+                "employee_id": issuance_data.employee_id,
+                "department": issuance_data.department,
+                "reason": issuance_data.reason,
+                "notes": line.notes,
+                "created_by": current_user.username,
+            }
+            for line, store_id, taken in line_allocations
+            for row, quantity in taken
+        ])
+        index_reference(db, ISSUANCE_REFERENCE_TYPE, issuance.issuance_number, "stock_out", issuance_data.employee_name)
+
+        update_stock_alerts(db, ledger.changed)
+        db.commit()
+        db.refresh(issuance)
+
+        return build_issuance_response(db, issuance)
+
+    except HTTPException:
+        raise
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Issuance number already taken by a concurrent request, please retry"
+        )
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error creating issuance: {str(e)}"
+        )
+
+@router.get("/", response_model=List[IssuanceResponse])
+def get_issuances(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    employee_id: Optional[str] = Query(None),
+    department: Optional[str] = Query(None),
+    store_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    List issuance documents (without lines), newest first
+    """
+    query = db.query(Issuance)
+
+    if employee_id:
+        query = query.filter(Issuance.employee_id == employee_id)
+    if department:
+        query = query.filter(Issuance.department == department)
+    if store_id:
+        query = query.filter(Issuance.store_id == store_id)
+
+    issuances = query.order_by(Issuance.issuance_id.desc()).offset(skip).limit(limit).all()
+    return [IssuanceResponse.model_validate(issuance) for issuance in issuances]
+
+@router.get("/{issuance_id}", response_model=IssuanceResponse)
+def get_issuance(
+    issuance_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Get an issuance document with all of its lines
+    """
+    issuance = db.query(Issuance).filter(Issuance.issuance_id == issuance_id).first()
+    if not issuance:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Issuance not found"
+        )
+
+    return build_issuance_response(db, issuance)
@@ -2,7 +2,6 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import Optional, List
-import json
 import uuid
 
 from app.database import get_db
@@ -78,11 +77,7 @@ async def create_batch(
                 detail=f"Item type {item_type.type_name} has no sizes configured"
             )
         
-        # Parse sizes (JSON array like ["S","M","L","XL","XXL"])
-        if isinstance(item_type.available_sizes, str):
-            sizes = json.loads(item_type.available_sizes)
-        else:
-            sizes = item_type.available_sizes
+        sizes = item_type.available_sizes  # ["S","M","L","XL","XXL"]
         
         if not sizes or len(sizes) == 0:
             raise HTTPException(
@@ -1,13 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, or_
 from typing import Optional, List
-import json
 
 from app.database import get_db
 from app.models import Category, ItemType
 from app.schemas import ItemTypeCreate, ItemTypeUpdate, ItemTypeResponse
 from app.auth import get_current_user
+from app.reference_cache import ITEM_TYPES, reference_response, matches_search
 
 router = APIRouter(prefix="/api/item-types", tags=["Item Types"])
 
@@ -17,6 +17,7 @@ router = APIRouter(prefix="/api/item-types", tags=["Item Types"])
 
 @router.get("/", response_model=List[ItemTypeResponse])
 async def get_item_types(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     category_id: Optional[int] = None,
@@ -27,76 +28,19 @@ async def get_item_types(
 ):
     """
     Get all item types with filtering
+    (served from the reference cache, supports If-None-Match)
     """
-    query = db.query(ItemType)
-    
-    # Category filter
-    if category_id:
-        query = query.filter(ItemType.category_id == category_id)
-    
-    # Status filter
-    if status:
-        query = query.filter(ItemType.status == status)
-    
-    # Search filter
-    if search:
-        search_pattern = f"%{search}%"
-        query = query.filter(
-            or_(
-                ItemType.type_name.like(search_pattern),
-                ItemType.description.like(search_pattern)
-            )
-        )
-    
-    # Order by display_order
-    query = query.order_by(ItemType.display_order.asc(), ItemType.type_name.asc())
-    
-    # Pagination
-    types = query.offset(skip).limit(limit).all()
-    
-    # Add category names and parse JSON fields
-    for type_obj in types:
-        category = db.query(Category).filter(
-            Category.category_id == type_obj.category_id
-        ).first()
-        if category:
-            type_obj.category_name = category.category_name
-        
-        # Parse JSON fields
-        try:
-            if type_obj.available_sizes and isinstance(type_obj.available_sizes, str):
-                type_obj.available_sizes = json.loads(type_obj.available_sizes)
-            elif type_obj.available_sizes is None:
-                type_obj.available_sizes = []
-            if type_obj.available_colors and isinstance(type_obj.available_colors, str):
-                type_obj.available_colors = json.loads(type_obj.available_colors)
-            elif type_obj.available_colors is None:
-                type_obj.available_colors = []
-            # Handle size_stock_levels - check if column exists first
-            if hasattr(type_obj, 'size_stock_levels'):
-                if type_obj.size_stock_levels and isinstance(type_obj.size_stock_levels, str):
-                    try:
-                        type_obj.size_stock_levels = json.loads(type_obj.size_stock_levels)
-                    except (json.JSONDecodeError, TypeError):
-                        type_obj.size_stock_levels = None
-                elif type_obj.size_stock_levels is None:
-                    type_obj.size_stock_levels = None
-            else:
-                # Column doesn't exist yet - set to None
-                type_obj.size_stock_levels = None
-        except Exception as e:
-            print(f"Error parsing JSON fields for type {type_obj.type_id}: {str(e)}")
-            # Set defaults
-            if not hasattr(type_obj, 'available_sizes') or type_obj.available_sizes is None:
-                type_obj.available_sizes = []
-            if not hasattr(type_obj, 'available_colors') or type_obj.available_colors is None:
-                type_obj.available_colors = []
-            if hasattr(type_obj, 'size_stock_levels'):
-                type_obj.size_stock_levels = None
-        
-        type_obj.item_count = 0  # Placeholder for future items count
-    
-    return types
+    def select(rows):
+        rows = [
+            row for row in rows
+            if (not category_id or row["category_id"] == category_id)
+            and (not status or row["status"] == status)
+            and matches_search(row, search, ("type_name", "description"))
+        ]
+        return rows[skip:skip + limit]
+
+    params = {"skip": skip, "limit": limit, "category_id": category_id, "status": status, "search": search}
+    return reference_response(request, db, ITEM_TYPES, params, select)
 
 @router.get("/{type_id}", response_model=ItemTypeResponse)
 async def get_item_type(
@@ -122,40 +66,7 @@ async def get_item_type(
     if category:
         type_obj.category_name = category.category_name
     
-    # Parse JSON fields
-    try:
-        if type_obj.available_sizes and isinstance(type_obj.available_sizes, str):
-            type_obj.available_sizes = json.loads(type_obj.available_sizes)
-        elif type_obj.available_sizes is None:
-            type_obj.available_sizes = []
-        if type_obj.available_colors and isinstance(type_obj.available_colors, str):
-            type_obj.available_colors = json.loads(type_obj.available_colors)
-        elif type_obj.available_colors is None:
-            type_obj.available_colors = []
-        # Handle size_stock_levels - check if column exists first
-        if hasattr(type_obj, 'size_stock_levels'):
-            if type_obj.size_stock_levels and isinstance(type_obj.size_stock_levels, str):
-                try:
-                    type_obj.size_stock_levels = json.loads(type_obj.size_stock_levels)
-                except (json.JSONDecodeError, TypeError):
-                    type_obj.size_stock_levels = None
-            elif type_obj.size_stock_levels is None:
-                type_obj.size_stock_levels = None
-        else:
-            # Column doesn't exist yet - set to None
-            type_obj.size_stock_levels = None
-        
-        type_obj.item_count = 0  # Placeholder
-    except Exception as e:
-        print(f"Error parsing JSON fields for type {type_obj.type_id}: {str(e)}")
-        # Set defaults
-        if not hasattr(type_obj, 'available_sizes') or type_obj.available_sizes is None:
-            type_obj.available_sizes = []
-        if not hasattr(type_obj, 'available_colors') or type_obj.available_colors is None:
-            type_obj.available_colors = []
-        if hasattr(type_obj, 'size_stock_levels'):
-            type_obj.size_stock_levels = None
-        type_obj.item_count = 0
+    type_obj.item_count = 0  # Placeholder
     
     return type_obj
 
@@ -231,77 +142,28 @@ async def create_item_type(
                         detail=f"max_stock_level for size '{size}' must be greater than min_stock_level"
                     )
         
-        # Build ItemType with optional size_stock_levels
-        type_data = {
-            'category_id': item_type.category_id,
-            'type_name': item_type.type_name,
-            'description': item_type.description,
-            'has_size': item_type.has_size if item_type.has_size is not None else False,
-            'available_sizes': json.dumps(item_type.available_sizes) if item_type.available_sizes else None,
-            'has_color': item_type.has_color if item_type.has_color is not None else False,
-            'available_colors': json.dumps(item_type.available_colors) if item_type.available_colors else None,
-            'status': item_type.status.value if hasattr(item_type.status, 'value') else str(item_type.status),
-            'display_order': item_type.display_order if item_type.display_order is not None else 0,
-            'min_stock_level': min_stock,
-            'max_stock_level': max_stock,
-            'created_by': current_user.username
-        }
-        # Only add size_stock_levels if column exists (check via model)
-        if hasattr(ItemType, 'size_stock_levels'):
-            if item_type.size_stock_levels:
-                # Convert SizeStockLevel objects to plain dicts for JSON serialization
-                size_levels_dict = {}
-                for size, levels in item_type.size_stock_levels.items():
-                    if hasattr(levels, 'min') and hasattr(levels, 'max'):
-                        # It's a SizeStockLevel object, convert to dict
-                        size_levels_dict[size] = {
-                            'min': levels.min,
-                            'max': levels.max
-                        }
-                    else:
-                        # Already a dict
-                        size_levels_dict[size] = levels
-                type_data['size_stock_levels'] = json.dumps(size_levels_dict)
-            else:
-                type_data['size_stock_levels'] = None
-        
-        new_type = ItemType(**type_data)
+        # JSON columns take lists / dicts as they are (app.json_types validates them);
+        # size_stock_levels is stored as type_size_thresholds rows
+        new_type = ItemType(
+            category_id=item_type.category_id,
+            type_name=item_type.type_name,
+            description=item_type.description,
+            has_size=item_type.has_size if item_type.has_size is not None else False,
+            available_sizes=item_type.available_sizes or [],
+            has_color=item_type.has_color if item_type.has_color is not None else False,
+            available_colors=item_type.available_colors or [],
+            status=item_type.status.value if hasattr(item_type.status, 'value') else str(item_type.status),
+            display_order=item_type.display_order if item_type.display_order is not None else 0,
+            min_stock_level=min_stock,
+            max_stock_level=max_stock,
+            size_stock_levels=item_type.size_stock_levels,
+            created_by=current_user.username
+        )
         
         db.add(new_type)
         db.commit()
         db.refresh(new_type)
         
-        # Parse JSON back to lists/dicts for response
-        try:
-            if new_type.available_sizes:
-                new_type.available_sizes = json.loads(new_type.available_sizes)
-            else:
-                new_type.available_sizes = []
-            if new_type.available_colors:
-                new_type.available_colors = json.loads(new_type.available_colors)
-            else:
-                new_type.available_colors = []
-            # Handle size_stock_levels - check if column exists
-            if hasattr(new_type, 'size_stock_levels'):
-                if new_type.size_stock_levels:
-                    try:
-                        if isinstance(new_type.size_stock_levels, str):
-                            new_type.size_stock_levels = json.loads(new_type.size_stock_levels)
-                    except (json.JSONDecodeError, TypeError):
-                        new_type.size_stock_levels = None
-                else:
-                    new_type.size_stock_levels = None
-            else:
-                new_type.size_stock_levels = None
-        except Exception as e:
-            print(f"Error parsing response for new type: {str(e)}")
-            if not hasattr(new_type, 'available_sizes') or new_type.available_sizes is None:
-                new_type.available_sizes = []
-            if not hasattr(new_type, 'available_colors') or new_type.available_colors is None:
-                new_type.available_colors = []
-            if hasattr(new_type, 'size_stock_levels'):
-                new_type.size_stock_levels = None
-        
         new_type.category_name = category.category_name
         new_type.item_count = 0
         
@@ -347,27 +209,11 @@ async def update_item_type(
             )
     
     try:
-        # Update fields
+        # Update fields (JSON columns and size_stock_levels take lists / dicts as they are)
         update_data = type_update.dict(exclude_unset=True)
         for field, value in update_data.items():
             if field == 'status' and value:
                 setattr(type_obj, field, value.value)
-            elif field in ['available_sizes', 'available_colors'] and value:
-                setattr(type_obj, field, json.dumps(value))
-            elif field == 'size_stock_levels' and value:
-                # Convert SizeStockLevel objects to plain dicts for JSON serialization
-                size_levels_dict = {}
-                for size, levels in value.items():
-                    if hasattr(levels, 'min') and hasattr(levels, 'max'):
-                        # It's a SizeStockLevel object, convert to dict
-                        size_levels_dict[size] = {
-                            'min': levels.min,
-                            'max': levels.max
-                        }
-                    else:
-                        # Already a dict
-                        size_levels_dict[size] = levels
-                setattr(type_obj, field, json.dumps(size_levels_dict))
             else:
                 setattr(type_obj, field, value)
         
@@ -376,37 +222,6 @@ async def update_item_type(
         db.commit()
         db.refresh(type_obj)
         
-        # Parse JSON for response
-        try:
-            if type_obj.available_sizes:
-                type_obj.available_sizes = json.loads(type_obj.available_sizes)
-            else:
-                type_obj.available_sizes = []
-            if type_obj.available_colors:
-                type_obj.available_colors = json.loads(type_obj.available_colors)
-            else:
-                type_obj.available_colors = []
-            # Handle size_stock_levels - check if column exists
-            if hasattr(type_obj, 'size_stock_levels'):
-                if type_obj.size_stock_levels:
-                    try:
-                        if isinstance(type_obj.size_stock_levels, str):
-                            type_obj.size_stock_levels = json.loads(type_obj.size_stock_levels)
-                    except (json.JSONDecodeError, TypeError):
-                        type_obj.size_stock_levels = None
-                else:
-                    type_obj.size_stock_levels = None
-            else:
-                type_obj.size_stock_levels = None
-        except Exception as e:
-            print(f"Error parsing response for type {type_obj.type_id}: {str(e)}")
-            if not hasattr(type_obj, 'available_sizes') or type_obj.available_sizes is None:
-                type_obj.available_sizes = []
-            if not hasattr(type_obj, 'available_colors') or type_obj.available_colors is None:
-                type_obj.available_colors = []
-            if hasattr(type_obj, 'size_stock_levels'):
-                type_obj.size_stock_levels = None
-        
         # Add category name
         category = db.query(Category).filter(
             Category.category_id == type_obj.category_id
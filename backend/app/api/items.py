@@ -1,68 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Body, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_, and_
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Header, status
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, or_, and_, insert, select
+from sqlalchemy.exc import IntegrityError
 from typing import Optional, List, Tuple
 from datetime import datetime
 import uuid
-import json
 
 from pydantic import BaseModel
 
 from app.database import get_db
-from app.models import Item, ItemBatch, Inventory, StockTransaction, ItemType, Store, Box
+from app.models import Item, ItemBatch, Inventory, StockTransaction, ItemType, Store, Box, BoxContent
 from app.schemas import (
     ItemCreate, ItemUpdate, ItemResponse,
     InventoryResponse,
     StockTransactionResponse,
-    StockTransactionCreate
+    StockTransactionCreate,
+    StockAllocation,
+    BulkTransferCreate, BulkTransferResponse, BulkTransferResult
 )
 from app.auth import get_current_user
+from app import idempotency
+from app.alerts import update_stock_alerts
+from app.search_index import index_reference
+from app.serializers import (
+    FastJSONResponse, INVENTORY_COLUMNS, ITEM_COLUMNS, labelled, projected_row, select_columns, transaction_row
+)
+from app.stock import (
+    StockError, InventoryLedger, allocate_stock, consume_box_contents, mark_emptied_boxes,
+    receive_allocations, add_inventory, with_stock_thresholds, STOCK_MIN_LEVEL, STOCK_MAX_LEVEL
+)
 
 router = APIRouter(prefix="/api/items", tags=["Items"])
 
+# Idempotency-Key scope for POST /api/items/transactions
+TRANSACTIONS_IDEMPOTENCY_SCOPE = "stock_transactions"
+
+# reference_type of item lines written by POST /api/items/transactions/bulk-transfer
+BULK_TRANSFER_REFERENCE_TYPE = "BULK_TRANSFER"
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
-def get_item_stock_levels(db: Session, item: Item) -> Tuple[int, int]:
+def find_legacy_box(db: Session, item_id: int, store_id: int, quantity: int, created_at) -> Tuple[Optional[str], Optional[int]]:
     """
-    Get min and max stock levels for an item based on its type and size.
-    Returns (min_level, max_level) tuple.
+    (box_code, box_id) of an inventory row created before rows carried their box:
+    the box_checkin transaction that created it, matched by quantity and time proximity
     """
-    try:
-        # Get batch and item type
-        batch = db.query(ItemBatch).filter(ItemBatch.batch_id == item.batch_id).first()
-        if not batch:
-            return (50, 1000)  # Default values
-        
-        item_type = db.query(ItemType).filter(ItemType.type_id == batch.type_id).first()
-        if not item_type:
-            return (50, 1000)  # Default values
-        
-        # Parse size_stock_levels if exists
-        size_stock_levels = None
-        if hasattr(item_type, 'size_stock_levels') and item_type.size_stock_levels:
-            if isinstance(item_type.size_stock_levels, str):
-                try:
-                    size_stock_levels = json.loads(item_type.size_stock_levels)
-                except (json.JSONDecodeError, TypeError):
-                    size_stock_levels = None
-            else:
-                size_stock_levels = item_type.size_stock_levels
-        
-        # If item has size and size_stock_levels exists, use size-specific levels
-        if item.size and size_stock_levels and isinstance(size_stock_levels, dict):
-            size_level = size_stock_levels.get(item.size)
-            if size_level and isinstance(size_level, dict):
-                min_level = size_level.get('min', item_type.min_stock_level or 50)
-                max_level = size_level.get('max', item_type.max_stock_level or 1000)
-                return (min_level, max_level)
-        
-        # Fallback to item type default levels
-        return (item_type.min_stock_level or 50, item_type.max_stock_level or 1000)
-    except Exception as e:
-        print(f"Error getting stock levels for item {item.item_id}: {str(e)}")
-        return (50, 1000)  # Default on error
+    # Since each box checkin creates a new inventory record, match by quantity and time proximity
+    matching_transactions = db.query(StockTransaction).filter(
+        StockTransaction.item_id == item_id,
+        StockTransaction.to_store_id == store_id,
+        StockTransaction.transaction_type == 'box_checkin',
+        StockTransaction.box_id.isnot(None),
+        StockTransaction.quantity == quantity  # Match quantity for accuracy
+    ).order_by(StockTransaction.created_at.desc()).all()
+    
+    # Find the transaction with created_at closest to inventory.created_at
+    matching_transaction = None
+    if matching_transactions:
+        if len(matching_transactions) == 1:
+            # Only one match - use it
+            matching_transaction = matching_transactions[0]
+        else:
+            # Multiple matches - find the one with created_at closest to inventory.created_at
+            min_diff = None
+            for trans in matching_transactions:
+                # Calculate time difference in seconds (simple subtraction)
+                diff_seconds = abs((trans.created_at - created_at).total_seconds())
+                if min_diff is None or diff_seconds < min_diff:
+                    min_diff = diff_seconds
+                    matching_transaction = trans
+    
+    # If no match by quantity, fall back to latest transaction (for backward compatibility)
+    if not matching_transaction:
+        matching_transaction = db.query(StockTransaction).filter(
+            StockTransaction.item_id == item_id,
+            StockTransaction.to_store_id == store_id,
+            StockTransaction.transaction_type == 'box_checkin',
+            StockTransaction.box_id.isnot(None)
+        ).order_by(StockTransaction.created_at.desc()).first()
+    
+    if matching_transaction and matching_transaction.reference_number:
+        return (matching_transaction.reference_number, matching_transaction.box_id)  # reference_number is box_code
+    return (None, None)
 
 # ============================================================================
 # ITEM ENDPOINTS
@@ -78,13 +99,30 @@ async def get_items(
     status: Optional[str] = Query(None, regex='^(active|inactive)$'),
     search: Optional[str] = None,
     include_stock: bool = Query(False),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. item_id,item_code,size"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """
-    Get all items with optional filtering
+    Get all items with optional filtering.
+    Only the requested fields are selected and returned (all without fields=).
     """
-    query = db.query(Item)
+    columns = select_columns(fields, ITEM_COLUMNS)
+    
+    # Get total stock if requested
+    if include_stock and "total_stock" in columns:
+        columns["total_stock"] = select(
+            func.coalesce(func.sum(Inventory.quantity), 0)
+        ).where(
+            Inventory.item_id == Item.item_id
+        ).scalar_subquery()
+    
+    # Batch and type information come with the same query
+    query = db.query(*labelled(columns)).select_from(Item).outerjoin(
+        ItemBatch, ItemBatch.batch_id == Item.batch_id
+    ).outerjoin(
+        ItemType, ItemType.type_id == ItemBatch.type_id
+    )
     
     # Filters
     if batch_id:
@@ -92,11 +130,11 @@ async def get_items(
     
     if type_id:
         # Filter by type_id through batch
-        query = query.join(ItemBatch).filter(ItemBatch.type_id == type_id)
+        query = query.filter(ItemBatch.type_id == type_id)
     
     if year_code:
         # Filter by year_code through batch
-        query = query.join(ItemBatch).filter(ItemBatch.year_code == year_code)
+        query = query.filter(ItemBatch.year_code == year_code)
     
     if status:
         query = query.filter(Item.status == status)
@@ -117,31 +155,10 @@ async def get_items(
     # Pagination
     items = query.offset(skip).limit(limit).all()
     
-    # Add additional data
-    result = []
-    for item in items:
-        # Get batch and type information
-        batch = db.query(ItemBatch).filter(ItemBatch.batch_id == item.batch_id).first()
-        if batch:
-            item_type = db.query(ItemType).filter(ItemType.type_id == batch.type_id).first()
-            item.year_code = batch.year_code
-            item.type_name = item_type.type_name if item_type else None
-        else:
-            item.year_code = None
-            item.type_name = None
-        
-        # Get total stock if requested
-        if include_stock:
-            total_stock = db.query(func.coalesce(func.sum(Inventory.quantity), 0)).filter(
-                Inventory.item_id == item.item_id
-            ).scalar()
-            item.total_stock = total_stock or 0
-        else:
-            item.total_stock = 0
-        
-        result.append(item)
-    
-    return result
+    # Rows are built from trusted DB values and sent without response_model
+    # validation (app.serializers)
+    names = list(columns)
+    return FastJSONResponse(content=[projected_row(row, names) for row in items])
 
 # ============================================================================
 # INVENTORY ENDPOINTS (MUST BE BEFORE /{item_id} ROUTE)
@@ -177,15 +194,32 @@ async def get_inventory(
     item_id: Optional[int] = Query(None),
     store_id: Optional[int] = Query(None),
     low_stock: bool = Query(False, description="Filter for low stock items"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. item_code,size,quantity"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """
-    Get inventory records with optional filtering
+    Get inventory records with optional filtering.
+    Only the requested fields are selected and returned (all without fields=).
     """
     try:
+        columns = select_columns(fields, INVENTORY_COLUMNS)
+        names = list(columns)
         
-        query = db.query(Inventory)
+        # Legacy rows without a box are matched to their check-in transaction
+        with_box = "box_reference" in columns or "box_id" in columns
+        if with_box:
+            for name in ("inventory_id", "item_id", "store_id", "quantity", "created_at", "box_reference", "box_id"):
+                columns.setdefault(name, INVENTORY_COLUMNS[name])
+        
+        # Min/max levels come from the item's size threshold / type defaults, evaluated in SQL
+        query = with_stock_thresholds(
+            db.query(*labelled(columns)).select_from(Inventory).outerjoin(
+                Item, Item.item_id == Inventory.item_id
+            )
+        ).outerjoin(
+            Store, Store.store_id == Inventory.store_id
+        )
         
         # Filters
         if item_id:
@@ -196,7 +230,7 @@ async def get_inventory(
         
         # Low stock filter (quantity < min_level) - stock is low only if below minimum, not equal
         if low_stock:
-            query = query.filter(Inventory.quantity > 0, Inventory.quantity < Inventory.min_level)
+            query = query.filter(Inventory.quantity > 0, Inventory.quantity < STOCK_MIN_LEVEL)
         
         # Order by store_id, then item_id
         query = query.order_by(Inventory.store_id.asc(), Inventory.item_id.asc())
@@ -204,126 +238,21 @@ async def get_inventory(
         # Pagination
         inventory_list = query.offset(skip).limit(limit).all()
         
-        # Return empty list if no records (FastAPI will serialize this correctly)
-        if not inventory_list:
-            return []
-        
-        # Build response with proper serialization
+        # Rows are built from trusted DB values and sent without response_model
+        # validation (app.serializers)
         result = []
-        for inv in inventory_list:
-            item = db.query(Item).filter(Item.item_id == inv.item_id).first()
-            store = db.query(Store).filter(Store.store_id == inv.store_id).first()
-            
-            # Check if item/store exists
-            if not item:
-                print(f"[WARNING] Item with item_id={inv.item_id} not found for inventory_id={inv.inventory_id}")
-            if not store:
-                print(f"[WARNING] Store with store_id={inv.store_id} not found for inventory_id={inv.inventory_id}")
-            
-            # Calculate available_quantity manually (computed column might not work with SQLAlchemy)
-            reserved_qty = inv.reserved_quantity if inv.reserved_quantity is not None else 0
-            available_qty = inv.quantity - reserved_qty
-            
-            # Get min/max levels from item type's size_stock_levels (if available) or use inventory's stored values
-            min_level = inv.min_level if inv.min_level is not None else 50
-            max_level = inv.max_level if inv.max_level is not None else 1000
-            
-            # If item exists, try to get updated levels from item type
-            if item:
-                item_min, item_max = get_item_stock_levels(db, item)
-                # Use item type levels if inventory doesn't have custom levels set
-                # (inventory.min_level == 50 means it's likely using default)
-                if inv.min_level is None or inv.min_level == 50:
-                    min_level = item_min
-                if inv.max_level is None or inv.max_level == 1000:
-                    max_level = item_max
-            
-            # Get box reference for THIS specific inventory record
-            # Find the box_checkin transaction that created this inventory record
-            # Since each box checkin creates a new inventory record, match by quantity and time proximity
-            box_reference = None
-            box_id = None
-            
-            # Get all matching transactions (same item_id, store_id, quantity)
-            matching_transactions = db.query(StockTransaction).filter(
-                StockTransaction.item_id == inv.item_id,
-                StockTransaction.to_store_id == inv.store_id,
-                StockTransaction.transaction_type == 'box_checkin',
-                StockTransaction.box_id.isnot(None),
-                StockTransaction.quantity == inv.quantity  # Match quantity for accuracy
-            ).order_by(StockTransaction.created_at.desc()).all()
-            
-            # Find the transaction with created_at closest to inventory.created_at
-            matching_transaction = None
-            if matching_transactions:
-                if len(matching_transactions) == 1:
-                    # Only one match - use it
-                    matching_transaction = matching_transactions[0]
-                else:
-                    # Multiple matches - find the one with created_at closest to inventory.created_at
-                    inv_created_at = inv.created_at
-                    min_diff = None
-                    for trans in matching_transactions:
-                        # Calculate time difference in seconds (simple subtraction)
-                        diff_seconds = abs((trans.created_at - inv_created_at).total_seconds())
-                        if min_diff is None or diff_seconds < min_diff:
-                            min_diff = diff_seconds
-                            matching_transaction = trans
-            
-            # If no match by quantity, fall back to latest transaction (for backward compatibility)
-            if not matching_transaction:
-                matching_transaction = db.query(StockTransaction).filter(
-                    StockTransaction.item_id == inv.item_id,
-                    StockTransaction.to_store_id == inv.store_id,
-                    StockTransaction.transaction_type == 'box_checkin',
-                    StockTransaction.box_id.isnot(None)
-                ).order_by(StockTransaction.created_at.desc()).first()
-            
-            if matching_transaction and matching_transaction.reference_number:
-                box_reference = matching_transaction.reference_number  # This is box_code
-                box_id = matching_transaction.box_id
-            
-            # Build response dictionary - ensure all required fields are present
-            inv_data = {
-                "inventory_id": inv.inventory_id,
-                "store_id": inv.store_id,
-                "item_id": inv.item_id,
-                "quantity": int(inv.quantity) if inv.quantity is not None else 0,
-                "reserved_quantity": int(reserved_qty),
-                "available_quantity": int(available_qty),
-                "min_level": int(min_level),
-                "max_level": int(max_level),
-                "location_in_store": inv.location_in_store if inv.location_in_store else None,
-                "last_counted_at": inv.last_counted_at if inv.last_counted_at else None,
-                "last_counted_by": inv.last_counted_by if inv.last_counted_by else None,
-                "notes": inv.notes if inv.notes else None,
-                "created_at": inv.created_at,
-                "updated_at": inv.updated_at,
-                "store_name": store.store_name if store else None,
-                "item_code": item.item_code if item else None,
-                "item_name": item.item_name if item else None,
-                "size": item.size if item else None,
-                "year_code": None,
-                "box_reference": box_reference,  # Box code (e.g., BOX-2025-0005)
-                "box_id": box_id,  # Box ID for linking
-            }
-            
-            # Get year code from batch if item exists
-            if item:
-                batch = db.query(ItemBatch).filter(ItemBatch.batch_id == item.batch_id).first()
-                if batch:
-                    inv_data["year_code"] = batch.year_code
-            
-            try:
-                result.append(InventoryResponse(**inv_data))
-            except Exception as e:
-                print(f"[ERROR] Failed to create InventoryResponse for inventory_id={inv.inventory_id}: {str(e)}")
-                print(f"[ERROR] inv_data keys: {list(inv_data.keys())}")
-                print(f"[ERROR] inv_data values: {inv_data}")
-                # Continue to next record instead of failing completely
-                continue
-        
-        return result
+        for row in inventory_list:
+            inv_data = projected_row(row, names)
+            if with_box and row.box_id is None:
+                box_reference, box_id = find_legacy_box(db, row.item_id, row.store_id, row.quantity, row.created_at)
+                if box_id is not None:
+                    if "box_reference" in inv_data:
+                        inv_data["box_reference"] = box_reference
+                    if "box_id" in inv_data:
+                        inv_data["box_id"] = box_id
+            result.append(inv_data)
+        
+        return FastJSONResponse(content=result)
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
@@ -383,6 +312,7 @@ async def delete_inventory(
     
     try:
         db.delete(inventory)
+        update_stock_alerts(db, [(inventory.item_id, inventory.store_id)])
         db.commit()
         return None
     except Exception as e:
@@ -476,6 +406,7 @@ async def bulk_delete_inventory(
             deleted_ids.append(inventory.inventory_id)
             db.delete(inventory)
         
+        update_stock_alerts(db, {(inventory.item_id, inventory.store_id) for inventory in inventories})
         db.commit()
         
         return {
@@ -511,7 +442,18 @@ async def get_stock_transactions(
     """
     Get stock transactions with optional filtering
     """
-    query = db.query(StockTransaction)
+    from_store = aliased(Store)
+    to_store = aliased(Store)
+    # Item / store names come with the same query
+    query = db.query(
+        StockTransaction, Item.item_code, Item.item_name, from_store.store_name, to_store.store_name
+    ).outerjoin(
+        Item, Item.item_id == StockTransaction.item_id
+    ).outerjoin(
+        from_store, from_store.store_id == StockTransaction.from_store_id
+    ).outerjoin(
+        to_store, to_store.store_id == StockTransaction.to_store_id
+    )
     
     # Filters
     if item_id:
@@ -537,45 +479,36 @@ async def get_stock_transactions(
     # Pagination
     transactions = query.offset(skip).limit(limit).all()
     
-    # Add item and store names
-    result = []
-    for trans in transactions:
-        item = db.query(Item).filter(Item.item_id == trans.item_id).first()
-        
-        if item:
-            trans.item_code = item.item_code
-            trans.item_name = item.item_name
-        else:
-            trans.item_code = None
-            trans.item_name = None
-        
-        # Get store names
-        if trans.from_store_id:
-            from_store = db.query(Store).filter(Store.store_id == trans.from_store_id).first()
-            trans.from_store_name = from_store.store_name if from_store else None
-        else:
-            trans.from_store_name = None
-        
-        if trans.to_store_id:
-            to_store = db.query(Store).filter(Store.store_id == trans.to_store_id).first()
-            trans.to_store_name = to_store.store_name if to_store else None
-        else:
-            trans.to_store_name = None
-        
-        result.append(trans)
-    
-    return result
+    # Rows are built from trusted DB values and sent without response_model
+    # validation (app.serializers)
+    return FastJSONResponse(content=[
+        transaction_row(trans, item_code, item_name, from_store_name, to_store_name)
+        for trans, item_code, item_name, from_store_name, to_store_name in transactions
+    ])
 
 @router.post("/transactions", response_model=StockTransactionResponse, status_code=status.HTTP_201_CREATED)
 async def create_stock_transaction(
     transaction_data: StockTransactionCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """
     Create a new stock transaction (stock_out, adjustment, transfer, etc.)
+    - Send an Idempotency-Key header to make retries safe: a repeated key
+      returns the original response without applying the transaction again
     """
+    idempotency_key = idempotency.validate_key(idempotency_key)
+    fingerprint = None
+    if idempotency_key:
+        fingerprint = idempotency.request_hash(transaction_data)
+        replayed = idempotency.replay(db, TRANSACTIONS_IDEMPOTENCY_SCOPE, idempotency_key, fingerprint, current_user.username)
+        if replayed:
+            return replayed
+
     try:
+        allocations = []
+        
         # Verify item exists
         item = db.query(Item).filter(Item.item_id == transaction_data.item_id).first()
         if not item:
@@ -599,31 +532,23 @@ async def create_stock_transaction(
                     detail="from_store_id is required for stock_out transactions"
                 )
             
-            # Check inventory exists and has enough stock
-            inventory = db.query(Inventory).filter(
-                Inventory.item_id == transaction_data.item_id,
-                Inventory.store_id == transaction_data.from_store_id
-            ).first()
-            
-            if not inventory:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Inventory record not found for this item and store"
-                )
-            
-            available_qty = inventory.quantity - (inventory.reserved_quantity or 0)
             requested_qty = transaction_data.quantity  # Already validated as positive
             
-            if requested_qty > available_qty:
+            # Allocate across the item's per-box rows, oldest check-in first
+            # (the scanned box first if box_id is given); rows stay locked until commit
+            try:
+                allocations = allocate_stock(
+                    db, transaction_data.item_id, transaction_data.from_store_id, requested_qty,
+                    prefer_box_id=transaction_data.box_id
+                )
+            except StockError as e:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Insufficient stock. Available: {available_qty}, Requested: {requested_qty}"
+                    detail=str(e)
                 )
             
-            # Update inventory (subtract quantity)
-            inventory.quantity -= requested_qty
-            if inventory.quantity < 0:
-                inventory.quantity = 0
+            consume_box_contents(db, allocations)
+            mark_emptied_boxes(db, {row.box_id for row, _ in allocations if row.box_id})
             
             # Update box status to 'stocked_out' if box_id is provided
             if transaction_data.box_id:
@@ -652,114 +577,67 @@ async def create_stock_transaction(
                     detail="from_store_id and to_store_id must be different"
                 )
             
-            # Check inventory exists and has enough stock in from_store
-            from_inventory = db.query(Inventory).filter(
-                Inventory.item_id == transaction_data.item_id,
-                Inventory.store_id == transaction_data.from_store_id
-            ).first()
-            
-            if not from_inventory:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Inventory record not found for this item in from_store"
-                )
-            
-            available_qty = from_inventory.quantity - (from_inventory.reserved_quantity or 0)
             requested_qty = transaction_data.quantity
             
-            if requested_qty > available_qty:
+            # Allocate FIFO across the from_store's per-box rows (the given box first)
+            try:
+                allocations = allocate_stock(
+                    db, transaction_data.item_id, transaction_data.from_store_id, requested_qty,
+                    prefer_box_id=transaction_data.box_id
+                )
+            except StockError as e:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Insufficient stock in from_store. Available: {available_qty}, Requested: {requested_qty}"
+                    detail=str(e).replace("Insufficient stock", "Insufficient stock in from_store")
                 )
             
-            # Subtract quantity from from_store
-            from_inventory.quantity -= requested_qty
-            if from_inventory.quantity < 0:
-                from_inventory.quantity = 0
-            
-            # Add quantity to to_store
-            to_inventory = db.query(Inventory).filter(
-                Inventory.item_id == transaction_data.item_id,
-                Inventory.store_id == transaction_data.to_store_id
-            ).first()
+            # Add to to_store keeping one row per box, so box references and FIFO order carry over
+            receive_allocations(db, allocations, transaction_data.to_store_id)
             
-            # Get box_id and box_reference from source inventory
-            # Box reference is determined by latest box_checkin transaction for this item in from_store
-            box_id = None
-            box_reference = None
-            if from_inventory:
-                # First, check if box_id is provided directly in transaction_data
-                if transaction_data.box_id:
-                    box_id = transaction_data.box_id
-                    box = db.query(Box).filter(Box.box_id == box_id).first()
-                    if box:
-                        box_reference = box.box_code
-                else:
-                    # Fallback: find from latest box_checkin transaction
-                    latest_box_transaction = db.query(StockTransaction).filter(
-                        StockTransaction.item_id == transaction_data.item_id,
-                        StockTransaction.to_store_id == transaction_data.from_store_id,
-                        StockTransaction.transaction_type == 'box_checkin',
-                        StockTransaction.box_id.isnot(None)
-                    ).order_by(StockTransaction.created_at.desc()).first()
-                    
-                    if latest_box_transaction:
-                        box_id = latest_box_transaction.box_id
-                        box_reference = latest_box_transaction.reference_number  # This is box_code
+            # Boxes the stock came from (box_id -> box_code)
+            box_references = {row.box_id: row.box_reference for row, _ in allocations if row.box_id}
+            box_ids = set(box_references)
+            if transaction_data.box_id:
+                box_ids.add(transaction_data.box_id)
             
-            if to_inventory:
-                # Update existing inventory
-                to_inventory.quantity += requested_qty
-            else:
-                # Create new inventory record
-                to_inventory = Inventory(
-                    item_id=transaction_data.item_id,
-                    store_id=transaction_data.to_store_id,
-                    quantity=requested_qty,
-                    reserved_quantity=0,
-                    min_level=from_inventory.min_level,  # Copy from source inventory
-                    max_level=from_inventory.max_level,  # Copy from source inventory
+            if box_ids:
+                db.flush()
+                left_in_source = dict(
+                    db.query(Inventory.box_id, func.sum(Inventory.quantity)).filter(
+                        Inventory.box_id.in_(box_ids),
+                        Inventory.store_id == transaction_data.from_store_id
+                    ).group_by(Inventory.box_id).all()
                 )
-                db.add(to_inventory)
-            
-            # Update box.store_id to destination store when transferring (if box_id is found)
-            if box_id:
-                box = db.query(Box).filter(Box.box_id == box_id).first()
-                if box:
-                    # Update box location to destination store
-                    box.store_id = transaction_data.to_store_id
-                    db.add(box)  # Ensure box is tracked for commit
-                    
-                    # If box_reference not found, get it from box
-                    if not box_reference:
-                        box_reference = box.box_code
-            
-            # Create a box_checkin transaction in destination store to maintain box reference
-            # This ensures box_reference appears correctly in the destination store
-            if box_id and box_reference:
-                # Check if box_checkin transaction already exists for this box+item in destination store
-                existing_checkin = db.query(StockTransaction).filter(
-                    StockTransaction.box_id == box_id,
-                    StockTransaction.item_id == transaction_data.item_id,
-                    StockTransaction.to_store_id == transaction_data.to_store_id,
-                    StockTransaction.transaction_type == 'box_checkin'
-                ).first()
+                for box in db.query(Box).filter(Box.box_id.in_(box_ids)):
+                    # Move the box when it was named explicitly or nothing of it is left in from_store
+                    if box.box_id == transaction_data.box_id or not left_in_source.get(box.box_id):
+                        box.store_id = transaction_data.to_store_id
+                    box_references[box.box_id] = box_references.get(box.box_id) or box.box_code
                 
-                if not existing_checkin:
-                    # Create box_checkin transaction in destination store
-                    box_checkin_transaction = StockTransaction(
+                # Create a box_checkin marker in destination store to maintain box reference
+                # (once per box + item + store)
+                existing_markers = {
+                    box_id for (box_id,) in db.query(StockTransaction.box_id).filter(
+                        StockTransaction.box_id.in_(box_ids),
+                        StockTransaction.item_id == transaction_data.item_id,
+                        StockTransaction.to_store_id == transaction_data.to_store_id,
+                        StockTransaction.transaction_type == 'box_checkin'
+                    )
+                }
+                for box_id, box_reference in box_references.items():
+                    if box_id in existing_markers or not box_reference:
+                        continue
+                    db.add(StockTransaction(
                         transaction_type='box_checkin',
                         box_id=box_id,
                         item_id=transaction_data.item_id,
                         to_store_id=transaction_data.to_store_id,
                         quantity=0,  # Box checkin doesn't change quantity, it's just a marker
-                        reference_number=box_reference,  # Use box_code from source
+                        reference_number=box_reference,
                         reference_type='BOX',
                         notes=f'Box transferred from store {transaction_data.from_store_id}',
                         created_by=current_user.username
-                    )
-                    db.add(box_checkin_transaction)
+                    ))
         
         # For stock_in transactions, add to inventory
         elif transaction_data.transaction_type == 'stock_in':
@@ -782,7 +660,7 @@ async def create_stock_transaction(
             
             if inventory:
                 # Update existing inventory
-                inventory.quantity += transaction_data.quantity
+                add_inventory(db, inventory.inventory_id, transaction_data.quantity)
             else:
                 # Create new inventory record
                 inventory = Inventory(
@@ -824,18 +702,62 @@ async def create_stock_transaction(
         )
         
         db.add(new_transaction)
+        
+        # Low / out of stock alerts for the item in the stores that changed
+        if transaction_data.transaction_type in ('stock_out', 'transfer_out', 'stock_in'):
+            update_stock_alerts(db, [
+                (transaction_data.item_id, transaction_data.from_store_id),
+                (transaction_data.item_id, transaction_data.to_store_id),
+            ])
+        
+        # Per-box split of stock-outs/transfers (pick list)
+        allocation_list = [
+            StockAllocation(
+                inventory_id=row.inventory_id,
+                box_id=row.box_id,
+                box_reference=row.box_reference,
+                quantity=quantity,
+            )
+            for row, quantity in allocations
+        ]
+        
+        # Store the response with the write so a retry can never apply it twice
+        if idempotency_key:
+            db.flush()
+            db.refresh(new_transaction)
+            new_transaction.item_code = item.item_code
+            new_transaction.item_name = item.item_name
+            new_transaction.allocations = allocation_list
+            response_body = StockTransactionResponse.model_validate(new_transaction).model_dump(mode="json")
+            idempotency.remember(
+                db, TRANSACTIONS_IDEMPOTENCY_SCOPE, idempotency_key, fingerprint,
+                status.HTTP_201_CREATED, response_body, current_user.username
+            )
+        
         db.commit()
         db.refresh(new_transaction)
         
         # Add item information to response
         new_transaction.item_code = item.item_code
         new_transaction.item_name = item.item_name
+        new_transaction.allocations = allocation_list
         
         return new_transaction
         
     except HTTPException:
         db.rollback()
         raise
+    except IntegrityError:
+        db.rollback()
+        # A concurrent request with the same Idempotency-Key committed first
+        if idempotency_key:
+            replayed = idempotency.replay(db, TRANSACTIONS_IDEMPOTENCY_SCOPE, idempotency_key, fingerprint, current_user.username)
+            if replayed:
+                return replayed
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Transaction conflicts with a concurrent request, please retry"
+        )
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -843,6 +765,234 @@ async def create_stock_transaction(
             detail=f"Error creating transaction: {str(e)}"
         )
 
+@router.post("/transactions/bulk-transfer", response_model=BulkTransferResponse, status_code=status.HTTP_201_CREATED)
+def bulk_transfer(
+    transfer_data: BulkTransferCreate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Transfer many items and/or whole boxes between two stores in one request.
+    - Stores, boxes, box contents and all source/destination inventory rows are
+      loaded with one query each (inventory rows locked), allocated FIFO per box
+    - Either every line is transferred or none (errors for all failing lines are returned)
+    - All transfer_out transactions and box markers are written with one bulk insert
+    """
+    from_store_id = transfer_data.from_store_id
+    to_store_id = transfer_data.to_store_id
+
+    found_stores = {
+        store_id for (store_id,) in db.query(Store.store_id).filter(Store.store_id.in_([from_store_id, to_store_id]))
+    }
+    missing_stores = sorted({from_store_id, to_store_id} - found_stores)
+    if missing_stores:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Store(s) not found: {', '.join(str(s) for s in missing_stores)}"
+        )
+
+    item_ids = {line.item_id for line in transfer_data.lines}
+    if item_ids:
+        found_items = {item_id for (item_id,) in db.query(Item.item_id).filter(Item.item_id.in_(item_ids))}
+        missing_items = sorted(item_ids - found_items)
+        if missing_items:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Item(s) not found: {', '.join(str(i) for i in missing_items)}"
+            )
+
+    # Whole boxes: must be checked in to from_store
+    box_ids = list(dict.fromkeys(transfer_data.box_ids))
+    boxes = {}
+    contents = {}
+    errors = []
+    if box_ids:
+        boxes = {box.box_id: box for box in db.query(Box).filter(Box.box_id.in_(box_ids))}
+        for box_id in box_ids:
+            box = boxes.get(box_id)
+            if not box:
+                errors.append(f"Box {box_id} not found")
+            elif box.status != 'checked_in':
+                errors.append(f"Box {box.box_code} is {box.status}")
+            elif box.store_id != from_store_id:
+                errors.append(f"Box {box.box_code} is not in store {from_store_id}")
+        for content in db.query(BoxContent).filter(BoxContent.box_id.in_(box_ids)).order_by(BoxContent.content_id.asc()):
+            contents.setdefault(content.box_id, []).append(content)
+            item_ids.add(content.item_id)
+
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="; ".join(errors)
+        )
+
+    try:
+        # All source and destination rows in one locked query
+        ledger = InventoryLedger(db)
+        ledger.load([(item_id, store_id) for item_id in item_ids for store_id in (from_store_id, to_store_id)])
+
+        # (item_id, box_id, quantity, allocations) per transaction to write
+        moves = []
+        for box_id in box_ids:
+            box_contents = contents.get(box_id, [])
+            for item_id, quantity in ledger.plan_box(box_id, box_contents, from_store_id):
+                taken = ledger.take_from_box(box_id, item_id, from_store_id, quantity)
+                moves.append((item_id, box_id, quantity, taken))
+            # The box only moves as a whole: nothing of it may stay behind (e.g. reserved units)
+            left = ledger.box_quantity(box_id, [content.item_id for content in box_contents], from_store_id)
+            if left:
+                errors.append(
+                    f"Box {boxes[box_id].box_code} cannot be transferred whole: "
+                    f"{left} unit(s) of it stay in store {from_store_id} (reserved)"
+                )
+
+        for index, line in enumerate(transfer_data.lines, start=1):
+            try:
+                taken = ledger.take(line.item_id, from_store_id, line.quantity, prefer_box_id=line.box_id)
+                moves.append((line.item_id, None, line.quantity, taken))
+            except StockError as e:
+                errors.append(f"Line {index} (item {line.item_id}): {e}")
+
+        if errors:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="; ".join(errors)
+            )
+
+        for _, _, _, taken in moves:
+            ledger.receive(taken, to_store_id)
+        db.flush()
+
+        # Boxes touched by the transfer: move those named explicitly or with nothing left in from_store
+        box_references = {box.box_id: box.box_code for box in boxes.values()}
+        for _, _, _, taken in moves:
+            for row, _ in taken:
+                if row.box_id:
+                    box_references.setdefault(row.box_id, row.box_reference)
+        boxes_moved = list(box_ids)
+        other_box_ids = set(box_references) - set(box_ids)
+        if other_box_ids:
+            left_in_source = dict(
+                db.query(Inventory.box_id, func.sum(Inventory.quantity)).filter(
+                    Inventory.box_id.in_(other_box_ids),
+                    Inventory.store_id == from_store_id
+                ).group_by(Inventory.box_id).all()
+            )
+            boxes_moved += sorted(box_id for box_id in other_box_ids if not left_in_source.get(box_id))
+        if boxes_moved:
+            db.query(Box).filter(Box.box_id.in_(boxes_moved)).update(
+                {Box.store_id: to_store_id}, synchronize_session=False
+            )
+
+        # Box reference markers in the destination store (once per box + item + store)
+        existing_markers = set(
+            db.query(StockTransaction.box_id, StockTransaction.item_id).filter(
+                StockTransaction.box_id.in_(box_references),
+                StockTransaction.to_store_id == to_store_id,
+                StockTransaction.transaction_type == 'box_checkin'
+            ).distinct().all()
+        ) if box_references else set()
+
+        common = {
+            "employee_name": transfer_data.employee_name,
+            "employee_id": transfer_data.employee_id,
+            "department": transfer_data.department,
+            "reason": transfer_data.reason,
+            "notes": transfer_data.notes,
+            "created_by": current_user.username,
+        }
+        rows = []
+        for item_id, box_id, quantity, taken in moves:
+            if box_id:
+                rows.append(dict(
+                    common,
+                    transaction_type="transfer_out",
+                    item_id=item_id,
+                    from_store_id=from_store_id,
+                    to_store_id=to_store_id,
+                    quantity=quantity,
+                    box_id=box_id,
+                    reference_number=box_references[box_id],
+                    reference_type="BOX",
+                ))
+            else:
+                # Item line: a transaction per box the FIFO allocation took from
+                rows.extend(
+                    dict(
+                        common,
+                        transaction_type="transfer_out",
+                        item_id=item_id,
+                        from_store_id=from_store_id,
+                        to_store_id=to_store_id,
+                        quantity=taken_quantity,
+                        box_id=row.box_id,
+                        reference_number=transfer_data.reference_number,
+                        reference_type=BULK_TRANSFER_REFERENCE_TYPE,
+                    )
+                    for row, taken_quantity in taken
+                )
+            for row, _ in taken:
+                marker = (row.box_id, item_id)
+                if row.box_id and box_references.get(row.box_id) and marker not in existing_markers:
+                    existing_markers.add(marker)
+                    rows.append(dict(
+                        common,
+                        transaction_type="box_checkin",
+                        item_id=item_id,
+                        to_store_id=to_store_id,
+                        quantity=0,  # Marker only
+                        box_id=row.box_id,
+                        reference_number=box_references[row.box_id],
+                        reference_type="BOX",
+                        notes=f"Box transferred from store {from_store_id}",
+                    ))
+        if rows:
+            db.execute(insert(StockTransaction), rows)
+            if any(row["reference_type"] == BULK_TRANSFER_REFERENCE_TYPE for row in rows):
+                index_reference(
+                    db, BULK_TRANSFER_REFERENCE_TYPE, transfer_data.reference_number, "transfer_out", transfer_data.employee_name
+                )
+
+        results = [
+            BulkTransferResult(
+                item_id=item_id,
+                box_id=box_id,
+                quantity=quantity,
+                allocations=[
+                    StockAllocation(
+                        inventory_id=row.inventory_id,
+                        box_id=row.box_id,
+                        box_reference=row.box_reference,
+                        quantity=taken_quantity,
+                    )
+                    for row, taken_quantity in taken
+                ],
+            )
+            for item_id, box_id, quantity, taken in moves
+        ]
+
+        update_stock_alerts(db, ledger.changed)
+        db.commit()
+
+        return BulkTransferResponse(
+            from_store_id=from_store_id,
+            to_store_id=to_store_id,
+            transaction_count=len(moves),
+            total_quantity=sum(result.quantity for result in results),
+            boxes_moved=boxes_moved,
+            results=results,
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error creating bulk transfer: {str(e)}"
+        )
+
 @router.get("/{item_id}", response_model=ItemResponse)
 async def get_item(
     item_id: int,
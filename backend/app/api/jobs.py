@@ -0,0 +1,132 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case
+from typing import Optional, List
+from datetime import datetime, timedelta
+
+from app.database import get_db
+from app.models import Job
+from app.schemas import JobCreate, JobResponse, JobStatus, JobMetricsResponse
+from app.auth import get_current_user
+from app.jobs import JOB_DEFINITIONS, enqueue, job_runner
+
+router = APIRouter(prefix="/api/jobs", tags=["Jobs"])
+
+
+def require_admin(current_user):
+    if current_user.role != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can manage background jobs"
+        )
+
+
+@router.get("/", response_model=List[JobResponse])
+def get_jobs(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    job_name: Optional[str] = Query(None),
+    status_filter: Optional[JobStatus] = Query(None, alias="status"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    List background jobs, newest first (admin only)
+    """
+    require_admin(current_user)
+
+    query = db.query(Job)
+    if job_name:
+        query = query.filter(Job.job_name == job_name)
+    if status_filter:
+        query = query.filter(Job.status == status_filter.value)
+
+    jobs = query.order_by(Job.job_id.desc()).offset(skip).limit(limit).all()
+    return [JobResponse.model_validate(job) for job in jobs]
+
+
+@router.get("/metrics", response_model=List[JobMetricsResponse])
+def get_job_metrics(
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Schedule and execution-time metrics per registered job (admin only):
+    in-process counters of this runner plus 24 hour aggregates from the jobs table
+    """
+    require_admin(current_user)
+
+    since = datetime.now() - timedelta(hours=24)
+    finished = Job.status.in_(["succeeded", "failed"])
+    aggregates = {
+        row.job_name: row
+        for row in db.query(
+            Job.job_name,
+            func.sum(case((Job.status == "queued", 1), else_=0)).label("queued"),
+            func.sum(case((finished & (Job.finished_at >= since), 1), else_=0)).label("runs"),
+            func.sum(case(((Job.status == "failed") & (Job.finished_at >= since), 1), else_=0)).label("failures"),
+            func.avg(case((finished & (Job.finished_at >= since), Job.duration_ms))).label("avg_ms"),
+            func.max(case((finished & (Job.finished_at >= since), Job.duration_ms))).label("max_ms"),
+        ).filter(
+            (Job.status == "queued") | (Job.finished_at >= since)
+        ).group_by(Job.job_name)
+    }
+
+    metrics = []
+    for stats in job_runner.stats():
+        row = aggregates.get(stats["job_name"])
+        metrics.append(JobMetricsResponse(
+            **stats,
+            queued=int(row.queued or 0) if row else 0,
+            runs_24h=int(row.runs or 0) if row else 0,
+            failures_24h=int(row.failures or 0) if row else 0,
+            avg_ms_24h=round(float(row.avg_ms), 1) if row and row.avg_ms is not None else None,
+            max_ms_24h=row.max_ms if row else None,
+        ))
+    return metrics
+
+
+@router.post("/", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def run_job(
+    job_data: JobCreate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Queue a registered job to run now (admin only)
+    """
+    require_admin(current_user)
+
+    if job_data.job_name not in JOB_DEFINITIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown job: {job_data.job_name}. Available: {', '.join(sorted(JOB_DEFINITIONS))}"
+        )
+
+    new_job = enqueue(db, job_data.job_name, job_data.payload, created_by=current_user.username)
+    db.commit()
+    db.refresh(new_job)
+    job_runner.wake()
+
+    return JobResponse.model_validate(new_job)
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Get the status, result and timing of a job (admin only)
+    """
+    require_admin(current_user)
+
+    job = db.query(Job).filter(Job.job_id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+
+    return JobResponse.model_validate(job)
@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import Response
+from datetime import datetime
+import base64
+
+from app.schemas import QrLabelRequest, QrLabelResponse, QrLabel
+from app.auth import get_current_user
+from app.labels import MEDIA_TYPES, label_renderer, build_pdf, build_zip
+
+router = APIRouter(prefix="/api/labels", tags=["Labels"])
+
+
+@router.post("/qr")
+def generate_qr_labels(
+    label_request: QrLabelRequest,
+    current_user = Depends(get_current_user)
+):
+    """
+    Render QR codes for many codes at once (box codes, item codes...).
+
+    - output=pdf: one printable label per page (QR + code), PNG rendering
+    - output=zip: one PNG/SVG file per code, plus a PNG sprite sheet
+    - output=json: data URIs, for previews
+    Rendered images are cached, so reprinting the same codes is cheap.
+    """
+    image_format = "png" if label_request.output == "pdf" else label_request.format.value
+    try:
+        images, cached = label_renderer.render(label_request.codes, label_request.size, image_format)
+    except Exception as e:
+        print(f"[Labels] Could not render {len(label_request.codes)} label(s): {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not generate labels"
+        )
+
+    if label_request.output == "json":
+        media_type = MEDIA_TYPES[image_format]
+        return QrLabelResponse(
+            format=image_format,
+            size=label_request.size,
+            cached=cached,
+            labels=[
+                QrLabel(code=code, data_uri=f"data:{media_type};base64,{base64.b64encode(data).decode()}")
+                for code, data in zip(label_request.codes, images)
+            ]
+        )
+
+    if label_request.output == "pdf":
+        content = build_pdf(label_request.codes, images, label_request.size)
+    else:
+        content = build_zip(label_request.codes, images, image_format)
+
+    extension = label_request.output.value
+    filename = f"qr-labels-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{extension}"
+    return Response(
+        content=content,
+        media_type=MEDIA_TYPES[extension],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Labels-Cached": str(cached),
+        }
+    )
+
+
+@router.get("/cache")
+def get_label_cache_stats(
+    current_user = Depends(get_current_user)
+):
+    """
+    QR render cache statistics of this process (admin only)
+    """
+    if current_user.role != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view label cache statistics"
+        )
+    return {"workers": label_renderer.workers, **label_renderer.cache.stats()}
@@ -1,12 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from jose import jwt
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, exists, func, insert, literal, select, union_all
 from typing import List, Optional
 from datetime import datetime
-from app.database import get_db
-from app.models import Notification, NotificationType, NotificationStatus, User, Inventory, Item, Box
+from app.database import get_db, SessionLocal
+from app.models import Notification, NotificationReceipt, NotificationType, NotificationStatus, User, Job
 from app.schemas import NotificationResponse, NotificationCreate, NotificationUpdate
-from app.auth import get_current_user
+from app.auth import get_current_user, user_from_token
+from app import notification_retention
+from app.jobs import enqueue, job_runner
+from app.notification_bus import notification_bus, format_event
+
+# Comment line sent on idle streams so proxies keep the connection open
+STREAM_KEEPALIVE_SECONDS = 25
+# Client reconnect delay after a dropped stream
+STREAM_RETRY_MS = 5000
 
 router = APIRouter()
 
@@ -18,20 +32,30 @@ def get_notifications(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get notifications for current user"""
-    query = db.query(Notification).filter(
-        or_(
-            Notification.user_id == current_user.user_id,
-            Notification.user_id.is_(None)  # Global notifications
+    """Get notifications for current user (status is the user's own read state)"""
+    visible = union_all(*[
+        select(Notification.notification_id).where(audience)
+        for audience in audiences(current_user.user_id)
+    ]).subquery()
+    query = db.query(Notification, NotificationReceipt.read_at).join(
+        visible, visible.c.notification_id == Notification.notification_id
+    ).outerjoin(
+        NotificationReceipt,
+        and_(
+            NotificationReceipt.notification_id == Notification.notification_id,
+            NotificationReceipt.user_id == current_user.user_id
         )
     )
     
     if unread_only:
-        query = query.filter(Notification.status == NotificationStatus.unread)
+        query = query.filter(
+            Notification.status == NotificationStatus.unread,
+            NotificationReceipt.user_id.is_(None)
+        )
     
-    notifications = query.order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+    rows = query.order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
     # Convert to response format with metadata mapping
-    return [NotificationResponse.model_validate(n) for n in notifications]
+    return [notification_response(n, read_at) for n, read_at in rows]
 
 @router.get("/unread-count", response_model=dict)
 def get_unread_count(
@@ -39,17 +63,100 @@ def get_unread_count(
     db: Session = Depends(get_db)
 ):
     """Get count of unread notifications"""
-    count = db.query(Notification).filter(
-        and_(
-            or_(
-                Notification.user_id == current_user.user_id,
-                Notification.user_id.is_(None)
-            ),
-            Notification.status == NotificationStatus.unread
+    return {"count": count_unread(db, current_user.user_id)}
+
+def audiences(user_id: int):
+    """
+    Filters for the notifications a user sees: their own and the global ones.
+    Queried separately (not OR-ed) so each one uses ix_notifications_user_status.
+    """
+    return (Notification.user_id == user_id, Notification.user_id.is_(None))
+
+def unread_by(user_id: int):
+    """Open notifications the user has no read receipt for (anti-join on the receipts primary key)"""
+    return and_(
+        Notification.status == NotificationStatus.unread,
+        ~exists().where(
+            NotificationReceipt.user_id == user_id,
+            NotificationReceipt.notification_id == Notification.notification_id
         )
-    ).count()
+    )
+
+def count_unread(db: Session, user_id: int) -> int:
+    """Index-only count: (user_id, status, notification_id) index anti-joined with the receipts primary key"""
+    return sum(
+        db.query(func.count(Notification.notification_id)).filter(audience, unread_by(user_id)).scalar()
+        for audience in audiences(user_id)
+    )
+
+def notification_response(notification: Notification, read_at: Optional[datetime] = None) -> NotificationResponse:
+    response = NotificationResponse.model_validate(notification)
+    if read_at is not None:
+        response.status = NotificationStatus.read.value
+    return response
+
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    token: Optional[str] = Query(None, description="Access token (EventSource cannot send headers)")
+):
+    """
+    Server-Sent Events stream of the current user's notifications.
+    
+    Events:
+      unread_count   {"count": n} - sent on connect and when the user marks notifications read
+      notification   a new unread notification (NotificationResponse fields)
+      notification_read / notification_deleted   {"notification_id": id}
+      unread_changed bulk change (resolved stock alerts) - refetch the count
     
-    return {"count": count}
+    The token may be passed as ?token= or an Authorization header. The
+    stream ends when the token expires; the client reconnects with a fresh one.
+    """
+    if not token:
+        authorization = request.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            token = authorization[7:]
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    
+    def authenticate():
+        # Short-lived session: nothing is held open for the lifetime of the stream
+        db = SessionLocal()
+        try:
+            user = user_from_token(db, token)
+            return user.user_id, count_unread(db, user.user_id)
+        finally:
+            db.close()
+    
+    user_id, unread = await run_in_threadpool(authenticate)
+    expires_at = jwt.get_unverified_claims(token).get("exp")
+    subscriber = notification_bus.subscribe(user_id)
+    
+    async def events():
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            yield format_event("unread_count", {"count": unread})
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber.queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    if expires_at and time.time() >= expires_at:
+                        yield format_event("token_expired", {})
+                        break
+                    yield ": keepalive\n\n"
+        finally:
+            notification_bus.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable nginx response buffering
+        }
+    )
 
 @router.post("/", response_model=NotificationResponse)
 def create_notification(
@@ -97,35 +204,69 @@ def mark_as_read(
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
-    notification.status = NotificationStatus.read
-    notification.read_at = datetime.utcnow()
+    receipt = db.query(NotificationReceipt).filter(
+        NotificationReceipt.user_id == current_user.user_id,
+        NotificationReceipt.notification_id == notification_id
+    ).first()
+    if not receipt:
+        receipt = NotificationReceipt(
+            user_id=current_user.user_id,
+            notification_id=notification_id,
+            read_at=datetime.utcnow()
+        )
+        db.add(receipt)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Marked read by a concurrent request (e.g. another tab)
+            db.rollback()
+            receipt = db.query(NotificationReceipt).filter(
+                NotificationReceipt.user_id == current_user.user_id,
+                NotificationReceipt.notification_id == notification_id
+            ).first()
     
-    db.commit()
     db.refresh(notification)
     
-    return NotificationResponse.model_validate(notification)
+    # Other tabs of the same user update their badge without refetching
+    notification_bus.publish("unread_count", {"count": count_unread(db, current_user.user_id)}, current_user.user_id)
+    
+    return notification_response(notification, receipt.read_at)
 
 @router.put("/read-all", response_model=dict)
 def mark_all_as_read(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Mark all notifications as read for current user"""
-    updated = db.query(Notification).filter(
-        and_(
-            or_(
-                Notification.user_id == current_user.user_id,
-                Notification.user_id.is_(None)
-            ),
-            Notification.status == NotificationStatus.unread
-        )
-    ).update({
-        Notification.status: NotificationStatus.read,
-        Notification.read_at: datetime.utcnow()
-    })
-    
-    db.commit()
-    
+    """Mark all notifications as read for current user (other users keep their own read state)"""
+    for attempt in range(2):
+        read_at = datetime.utcnow()
+        try:
+            updated = 0
+            for audience in audiences(current_user.user_id):
+                # INSERT ... SELECT: one statement per audience, no rows loaded
+                result = db.execute(
+                    insert(NotificationReceipt).from_select(
+                        ["user_id", "notification_id", "read_at"],
+                        select(
+                            literal(current_user.user_id),
+                            Notification.notification_id,
+                            literal(read_at)
+                        ).where(audience, unread_by(current_user.user_id))
+                    )
+                )
+                updated += result.rowcount
+            db.commit()
+            break
+        except IntegrityError:
+            # A notification was marked read concurrently - the retry skips it
+            db.rollback()
+            if attempt:
+                raise HTTPException(status_code=409, detail="Notifications changed while marking them read, please retry")
+
+    if updated:
+        # The user's other tabs; nobody else's count changes
+        notification_bus.publish("unread_count", {"count": 0}, current_user.user_id)
+
     return {"updated": updated}
 
 @router.delete("/{notification_id}", response_model=dict)
@@ -148,6 +289,9 @@ def delete_notification(
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
+    db.query(NotificationReceipt).filter(
+        NotificationReceipt.notification_id == notification_id
+    ).delete(synchronize_session=False)
     db.delete(notification)
     db.commit()
     
@@ -158,113 +302,70 @@ def generate_stock_alerts(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Generate stock alerts for low stock and out of stock items (admin only)"""
+    """
+    Queue a full reconcile of low stock / out of stock alerts (admin only).
+    Stock movements update alerts themselves; this catches changes made
+    outside the API. Poll GET /api/jobs/{job_id} for the result.
+    """
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admins can generate alerts")
     
-    # Get all inventory items
-    inventories = db.query(Inventory).join(Item).filter(Item.status == "active").all()
-    
-    alerts_created = 0
-    
-    for inv in inventories:
-        # Check for out of stock
-        if inv.quantity == 0:
-            # Check if notification already exists (avoid duplicates)
-            # Use JSON_EXTRACT or similar for MySQL/MariaDB
-            existing = db.query(Notification).filter(
-                and_(
-                    Notification.type == NotificationType.out_of_stock,
-                    Notification.status == NotificationStatus.unread
-                )
-            ).all()
-            
-            # Check if this specific item/store combination already has a notification
-            existing = next((n for n in existing if n.notification_data and 
-                           n.notification_data.get('item_id') == inv.item_id and 
-                           n.notification_data.get('store_id') == inv.store_id), None)
-            
-            if not existing:
-                notification = Notification(
-                    user_id=None,  # All users
-                    type=NotificationType.out_of_stock,
-                    title=f"Out of Stock: {inv.item.item_name}",
-                    message=f"{inv.item.item_name} is out of stock at {inv.store.store_name}",
-                    link=f"/inventory?item_id={inv.item_id}&store_id={inv.store_id}",
-                    notification_data={"item_id": inv.item_id, "store_id": inv.store_id, "item_code": inv.item.item_code}
-                )
-                db.add(notification)
-                alerts_created += 1
-        
-        # Check for low stock
-        elif inv.quantity <= inv.min_level:
-            existing = db.query(Notification).filter(
-                and_(
-                    Notification.type == NotificationType.low_stock,
-                    Notification.status == NotificationStatus.unread
-                )
-            ).all()
-            
-            # Check if this specific item/store combination already has a notification
-            existing = next((n for n in existing if n.notification_data and 
-                           n.notification_data.get('item_id') == inv.item_id and 
-                           n.notification_data.get('store_id') == inv.store_id), None)
-            
-            if not existing:
-                notification = Notification(
-                    user_id=None,  # All users
-                    type=NotificationType.low_stock,
-                    title=f"Low Stock: {inv.item.item_name}",
-                    message=f"{inv.item.item_name} is running low ({inv.quantity} remaining) at {inv.store.store_name}",
-                    link=f"/inventory?item_id={inv.item_id}&store_id={inv.store_id}",
-                    notification_data={"item_id": inv.item_id, "store_id": inv.store_id, "item_code": inv.item.item_code, "quantity": inv.quantity}
-                )
-                db.add(notification)
-                alerts_created += 1
-    
-    db.commit()
-    
-    return {"success": True, "alerts_created": alerts_created}
+    return queue_alert_job(db, "generate_stock_alerts", current_user)
 
 @router.post("/generate-pending-checkin-alerts", response_model=dict)
 def generate_pending_checkin_alerts(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Generate alerts for pending check-in boxes (admin only)"""
+    """
+    Queue pending check-in alert generation (admin only).
+    Also runs periodically in the background; poll GET /api/jobs/{job_id} for the result.
+    """
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admins can generate alerts")
     
-    # Get pending check-in boxes
-    pending_boxes = db.query(Box).filter(Box.status == "pending_checkin").all()
-    
-    if not pending_boxes:
-        return {"success": True, "alerts_created": 0}
-    
-    # Check if notification already exists
-    existing = db.query(Notification).filter(
-        and_(
-            Notification.type == NotificationType.pending_checkin,
-            Notification.status == NotificationStatus.unread
-        )
-    ).first()
-    
-    if existing:
-        return {"success": True, "alerts_created": 0}
-    
-    notification = Notification(
-        user_id=None,  # All users
-        type=NotificationType.pending_checkin,
-        title=f"{len(pending_boxes)} Box(es) Pending Check-In",
-        message=f"You have {len(pending_boxes)} box(es) waiting to be checked in",
-        link="/receiving",
-        notification_data={"count": len(pending_boxes), "box_ids": [b.box_id for b in pending_boxes]}
-    )
+    return queue_alert_job(db, "generate_pending_checkin_alerts", current_user)
+
+@router.get("/retention", response_model=dict)
+def get_retention(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Retention policy (days per type, null = kept forever) and rows due for removal (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can manage notification retention")
     
-    db.add(notification)
-    db.commit()
+    return {
+        "mode": notification_retention.RETENTION_MODE,
+        "policy": {t.value: days for t, days in notification_retention.retention_policy().items()},
+        "eligible": notification_retention.eligible_counts(db),
+    }
+
+@router.post("/retention/run", response_model=dict)
+def run_retention(
+    mode: Optional[str] = Query(None, pattern="^(delete|archive)$"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Queue a notification retention run now (admin only). Also runs daily in the
+    background; the job result reports rows removed and time taken.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can manage notification retention")
     
-    return {"success": True, "alerts_created": 1}
+    return queue_alert_job(db, "purge_notifications", current_user, payload={"mode": mode} if mode else None)
+
+def queue_alert_job(db: Session, job_name: str, current_user: User, payload: Optional[dict] = None) -> dict:
+    # Reuse a run that is already waiting instead of queueing duplicates
+    job = db.query(Job).filter(Job.job_name == job_name, Job.status == "queued").first()
+    if not job:
+        job = enqueue(db, job_name, payload=payload, created_by=current_user.username)
+        db.commit()
+        db.refresh(job)
+    job_runner.wake()
+    
+    return {"success": True, "job_id": job.job_id, "status": job.status}
 
 @router.post("/test-create", response_model=dict)
 def create_test_notifications(
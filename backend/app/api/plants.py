@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, or_
 from typing import Optional, List
@@ -7,6 +7,8 @@ from app.database import get_db
 from app.models import Plant, Store
 from app.schemas import PlantCreate, PlantUpdate, PlantResponse, PlantWithStores, StoreResponse
 from app.auth import get_current_user
+from app.reference_cache import PLANTS, reference_response, matches_search
+from app.api.stores import store_usage
 
 router = APIRouter(prefix="/api/plants", tags=["Plants"])
 
@@ -16,6 +18,7 @@ router = APIRouter(prefix="/api/plants", tags=["Plants"])
 
 @router.get("/", response_model=List[PlantResponse])
 async def get_plants(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     status: Optional[str] = Query(None, regex='^(active|inactive)$'),
@@ -26,41 +29,24 @@ async def get_plants(
 ):
     """
     Get all plants with optional filtering and store counts
+    (served from the reference cache, supports If-None-Match)
     """
-    query = db.query(Plant)
-    
-    # Status filter
-    if status:
-        query = query.filter(Plant.status == status)
-    
-    # Search filter
-    if search:
-        search_pattern = f"%{search}%"
-        query = query.filter(
-            or_(
-                Plant.plant_name.like(search_pattern),
-                Plant.plant_code.like(search_pattern),
-                Plant.location.like(search_pattern),
-                Plant.city.like(search_pattern),
-                Plant.state.like(search_pattern)
-            )
-        )
-    
-    # Order by name
-    query = query.order_by(Plant.plant_name.asc())
-    
-    # Pagination
-    plants = query.offset(skip).limit(limit).all()
-    
-    # Add store counts if requested
-    if include_counts:
-        for plant in plants:
-            store_count = db.query(func.count(Store.store_id)).filter(
-                Store.plant_id == plant.plant_id
-            ).scalar()
-            plant.store_count = store_count
-    
-    return plants
+    def select(rows):
+        rows = [
+            row for row in rows
+            if (not status or row["status"] == status)
+            and matches_search(row, search, ("plant_name", "plant_code", "location", "city", "state"))
+        ]
+        return rows[skip:skip + limit]
+
+    def finalize(rows):
+        if not include_counts:
+            for row in rows:
+                row["store_count"] = 0
+        return rows
+
+    params = {"skip": skip, "limit": limit, "status": status, "search": search, "include_counts": include_counts}
+    return reference_response(request, db, PLANTS, params, select, finalize=finalize)
 
 @router.get("/{plant_id}", response_model=PlantWithStores)
 async def get_plant(
@@ -92,15 +78,12 @@ async def get_plant(
             Store.plant_id == plant_id
         ).order_by(Store.store_name.asc()).all()
         
-        # Add plant info to each store
+        # Add plant info to each store (stock totals in one query)
+        usage = store_usage(db, [store.store_id for store in stores])
         for store in stores:
             store.plant_name = plant.plant_name
             store.plant_code = plant.plant_code
-            from app.models import Inventory
-            current_items_count = db.query(func.sum(Inventory.quantity)).filter(
-                Inventory.store_id == store.store_id
-            ).scalar() or 0
-            setattr(store, 'current_items', int(current_items_count))
+            setattr(store, 'current_items', usage.get(store.store_id, 0))
             
             if store.capacity and store.capacity > 0:
                 setattr(store, 'utilization_percentage', (store.current_items / store.capacity) * 100)
@@ -312,17 +295,12 @@ async def get_plant_stores(
     
     stores = query.order_by(Store.store_name.asc()).all()
     
-    # Add plant info to each store
-    from app.models import Inventory
+    # Add plant info to each store (stock totals in one query)
+    usage = store_usage(db, [store.store_id for store in stores])
     for store in stores:
         store.plant_name = plant.plant_name
         store.plant_code = plant.plant_code
-        
-        # Calculate current_items from inventory
-        current_items_count = db.query(func.sum(Inventory.quantity)).filter(
-            Inventory.store_id == store.store_id
-        ).scalar() or 0
-        setattr(store, 'current_items', int(current_items_count))
+        setattr(store, 'current_items', usage.get(store.store_id, 0))
         
         # Calculate utilization percentage if capacity exists
         if store.capacity and store.capacity > 0:
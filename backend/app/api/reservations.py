@@ -0,0 +1,338 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import Optional, List
+from datetime import datetime, timedelta
+
+from app.database import get_db
+from app.models import Reservation, Item, Store, Inventory, StockTransaction
+from app.schemas import (
+    ReservationCreate, ReservationConfirm, ReservationResponse, ReservationStatus,
+    ReservationSweepResponse
+)
+from app.auth import get_current_user
+from app.alerts import update_stock_alerts
+from app.stock import InventoryLedger, StockError, allocate_stock, consume_box_contents, mark_emptied_boxes
+from app.reservations import (
+    RESERVATION_REFERENCE_TYPE, reservation_reference, allocations_json,
+    close_reservations, expire_reservations
+)
+
+router = APIRouter(prefix="/api/reservations", tags=["Reservations"])
+
+# ============================================================================
+# HELPER FUNCTIONS
+# ============================================================================
+
+def get_active_reservation(db: Session, reservation_id: int) -> Reservation:
+    """Load and lock a reservation that can still be confirmed or released"""
+    reservation = db.query(Reservation).filter(
+        Reservation.reservation_id == reservation_id
+    ).with_for_update().first()
+    if not reservation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reservation not found"
+        )
+    if reservation.status != 'active':
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Reservation is already {reservation.status}"
+        )
+    if reservation.expires_at <= datetime.now():
+        # Past its TTL but not swept yet - expire it now
+        close_reservations(db, [reservation], 'expired', 'system')
+        db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Reservation has expired"
+        )
+    return reservation
+
+# ============================================================================
+# RESERVATION ENDPOINTS
+# ============================================================================
+
+@router.post("/", response_model=List[ReservationResponse], status_code=status.HTTP_201_CREATED)
+def create_reservations(
+    reservation_data: ReservationCreate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Hold stock for one or many items (e.g. pre-allocating uniforms for a
+    distribution event). One reservation is created per line.
+    - Stock for all lines is loaded and locked with one query and held FIFO
+      in Inventory.reserved_quantity, so stock-outs and transfers can no
+      longer take it
+    - Either every line is reserved or none (errors for all failing lines are returned)
+    - Holds expire after ttl_minutes unless confirmed or released
+    """
+    lines = reservation_data.lines
+
+    item_ids = {line.item_id for line in lines}
+    found_items = {item_id for (item_id,) in db.query(Item.item_id).filter(Item.item_id.in_(item_ids))}
+    missing_items = sorted(item_ids - found_items)
+    if missing_items:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Item(s) not found: {', '.join(str(i) for i in missing_items)}"
+        )
+
+    line_stores = [line.store_id or reservation_data.store_id for line in lines]
+    if any(store_id is None for store_id in line_stores):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="store_id is required on the request or on every line"
+        )
+    store_ids = set(line_stores)
+    found_stores = {store_id for (store_id,) in db.query(Store.store_id).filter(Store.store_id.in_(store_ids))}
+    missing_stores = sorted(store_ids - found_stores)
+    if missing_stores:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Store(s) not found: {', '.join(str(s) for s in missing_stores)}"
+        )
+
+    try:
+        ledger = InventoryLedger(db)
+        ledger.load({(line.item_id, store_id) for line, store_id in zip(lines, line_stores)})
+
+        held = []
+        errors = []
+        for index, (line, store_id) in enumerate(zip(lines, line_stores), start=1):
+            try:
+                held.append(ledger.reserve(line.item_id, store_id, line.quantity, prefer_box_id=line.box_id))
+            except StockError as e:
+                errors.append(f"Line {index} (item {line.item_id}, store {store_id}): {e}")
+
+        if errors:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="; ".join(errors)
+            )
+
+        expires_at = datetime.now() + timedelta(minutes=reservation_data.ttl_minutes)
+        reservations = [
+            Reservation(
+                item_id=line.item_id,
+                store_id=store_id,
+                box_id=line.box_id,
+                quantity=line.quantity,
+                status='active',
+                allocations=allocations_json(allocations),
+                expires_at=expires_at,
+                reference_number=reservation_data.reference_number,
+                employee_name=reservation_data.employee_name,
+                employee_id=reservation_data.employee_id,
+                department=reservation_data.department,
+                notes=reservation_data.notes,
+                created_by=current_user.username,
+            )
+            for line, store_id, allocations in zip(lines, line_stores, held)
+        ]
+        db.add_all(reservations)
+        db.commit()
+
+        return [ReservationResponse.model_validate(reservation) for reservation in reservations]
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error creating reservations: {str(e)}"
+        )
+
+@router.get("/", response_model=List[ReservationResponse])
+def get_reservations(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    item_id: Optional[int] = Query(None),
+    store_id: Optional[int] = Query(None),
+    status_filter: Optional[ReservationStatus] = Query(None, alias="status"),
+    reference_number: Optional[str] = Query(None),
+    employee_id: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    List reservations, newest first (item/store/status filters use the
+    composite index)
+    """
+    query = db.query(Reservation)
+
+    if item_id:
+        query = query.filter(Reservation.item_id == item_id)
+    if store_id:
+        query = query.filter(Reservation.store_id == store_id)
+    if status_filter:
+        query = query.filter(Reservation.status == status_filter.value)
+    if reference_number:
+        query = query.filter(Reservation.reference_number == reference_number)
+    if employee_id:
+        query = query.filter(Reservation.employee_id == employee_id)
+
+    reservations = query.order_by(Reservation.reservation_id.desc()).offset(skip).limit(limit).all()
+    return [ReservationResponse.model_validate(reservation) for reservation in reservations]
+
+@router.post("/expire", response_model=ReservationSweepResponse)
+def expire_now(
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Release all expired holds now instead of waiting for the sweeper (admin only)
+    """
+    if current_user.role != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can run the reservation sweep"
+        )
+
+    expired_count, released_quantity = expire_reservations(db)
+    return ReservationSweepResponse(expired_count=expired_count, released_quantity=released_quantity)
+
+@router.get("/{reservation_id}", response_model=ReservationResponse)
+def get_reservation(
+    reservation_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Get a reservation
+    """
+    reservation = db.query(Reservation).filter(Reservation.reservation_id == reservation_id).first()
+    if not reservation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reservation not found"
+        )
+
+    return ReservationResponse.model_validate(reservation)
+
+@router.post("/{reservation_id}/confirm", response_model=ReservationResponse)
+def confirm_reservation(
+    reservation_id: int,
+    confirm_data: Optional[ReservationConfirm] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Issue the held stock: the held units become a stock_out transaction
+    (reference RES-NNNNNN). Send a smaller quantity to issue part of the
+    hold; the rest is released.
+    """
+    confirm_data = confirm_data or ReservationConfirm()
+    reservation = get_active_reservation(db, reservation_id)
+
+    issue_qty = confirm_data.quantity or reservation.quantity
+    if issue_qty > reservation.quantity:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot issue {issue_qty}, only {reservation.quantity} reserved"
+        )
+
+    try:
+        holds = reservation.allocations or []
+        rows = {
+            row.inventory_id: row
+            for row in db.query(Inventory).filter(
+                Inventory.inventory_id.in_([hold["inventory_id"] for hold in holds])
+            ).with_for_update()
+        } if holds else {}
+
+        # Turn holds into stock-outs in allocation (FIFO) order; the rest is released
+        allocations = []
+        remaining = issue_qty
+        for hold in holds:
+            row = rows.get(hold["inventory_id"])
+            if not row:
+                continue  # Row deleted since - covered from free stock below
+            row.reserved_quantity = max((row.reserved_quantity or 0) - hold["quantity"], 0)
+            taken = min(hold["quantity"], row.quantity, remaining)
+            if taken > 0:
+                row.quantity -= taken
+                remaining -= taken
+                allocations.append((row, taken))
+
+        if remaining > 0:
+            try:
+                allocations.extend(allocate_stock(
+                    db, reservation.item_id, reservation.store_id, remaining,
+                    prefer_box_id=reservation.box_id
+                ))
+            except StockError as e:
+                db.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Reserved stock is no longer available: {e}"
+                )
+
+        db.flush()
+        consume_box_contents(db, allocations)
+        mark_emptied_boxes(db, {row.box_id for row, _ in allocations if row.box_id})
+
+        transaction = StockTransaction(
+            transaction_type='stock_out',
+            item_id=reservation.item_id,
+            from_store_id=reservation.store_id,
+            quantity=issue_qty,
+            box_id=reservation.box_id,
+            reference_number=reservation_reference(reservation),
+            reference_type=RESERVATION_REFERENCE_TYPE,
+            employee_name=confirm_data.employee_name or reservation.employee_name,
+            employee_id=confirm_data.employee_id or reservation.employee_id,
+            department=confirm_data.department or reservation.department,
+            reason=confirm_data.reason,
+            notes=confirm_data.notes or reservation.notes,
+            created_by=current_user.username,
+        )
+        db.add(transaction)
+        db.flush()
+
+        update_stock_alerts(db, [(reservation.item_id, reservation.store_id)])
+
+        reservation.status = 'confirmed'
+        reservation.transaction_id = transaction.transaction_id
+        reservation.closed_at = datetime.now()
+        reservation.closed_by = current_user.username
+        db.commit()
+        db.refresh(reservation)
+
+        return ReservationResponse.model_validate(reservation)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error confirming reservation: {str(e)}"
+        )
+
+@router.post("/{reservation_id}/release", response_model=ReservationResponse)
+def release_reservation(
+    reservation_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Cancel a hold and make its stock available again
+    """
+    reservation = get_active_reservation(db, reservation_id)
+
+    try:
+        close_reservations(db, [reservation], 'released', current_user.username)
+        db.commit()
+        db.refresh(reservation)
+
+        return ReservationResponse.model_validate(reservation)
+
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error releasing reservation: {str(e)}"
+        )
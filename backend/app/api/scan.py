@@ -0,0 +1,640 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+
+from app.database import get_db
+from app.models import Inventory, Store, Box, BoxContent, StockTransaction, ScanSession, ScanEvent
+from app.schemas import (
+    ScanResolveRequest, ScanResolution, ScanMatch, ScanLocation,
+    ScanSessionCreate, ScanSessionResponse, ScanEventCreate, ScanEventResult, ScanEventType
+)
+from app.auth import get_current_user
+from app.code_index import code_index
+from app.alerts import update_stock_alerts
+from app.stock import InventoryLedger, StockError, load_stock_levels, consume_box_contents, mark_emptied_boxes
+
+router = APIRouter(prefix="/api/scan", tags=["Scan"])
+
+# ============================================================================
+# HELPER FUNCTIONS
+# ============================================================================
+
+def resolve_codes(db: Session, codes: List[str], include_location: bool = True, allow_prefix: bool = False) -> List[ScanResolution]:
+    """
+    Resolve scanned codes against the in-memory code index (codes it does not
+    know are looked up in the database), then load current stock locations for
+    all matched entities with one query per entity type.
+    """
+    # Deduplicate while keeping scan order
+    unique_codes = list(dict.fromkeys(c.strip() for c in codes if c and c.strip()))
+    code_index.ensure_codes(db, unique_codes)
+
+    lookups = []
+    item_ids = set()
+    box_ids = set()
+    for code in unique_codes:
+        matched_by, entries = code_index.lookup(code, allow_prefix=allow_prefix)
+        lookups.append((code, matched_by, entries))
+        for entry in entries:
+            entity_type, entity_id = entry["key"]
+            if entity_type == "item":
+                item_ids.add(entity_id)
+            else:
+                box_ids.add(entity_id)
+
+    item_locations: Dict[int, List[ScanLocation]] = {}
+    box_info: Dict[int, dict] = {}
+
+    if include_location and item_ids:
+        rows = db.query(
+            Inventory.item_id,
+            Inventory.store_id,
+            Store.store_name,
+            func.sum(Inventory.quantity),
+            func.sum(Inventory.quantity - Inventory.reserved_quantity),
+        ).join(
+            Store, Store.store_id == Inventory.store_id
+        ).filter(
+            Inventory.item_id.in_(item_ids),
+            Inventory.quantity > 0
+        ).group_by(
+            Inventory.item_id, Inventory.store_id, Store.store_name
+        ).all()
+
+        for item_id, store_id, store_name, quantity, available in rows:
+            item_locations.setdefault(item_id, []).append(ScanLocation(
+                store_id=store_id,
+                store_name=store_name,
+                quantity=int(quantity or 0),
+                available_quantity=int(available or 0),
+            ))
+
+    if include_location and box_ids:
+        remaining = dict(
+            db.query(BoxContent.box_id, func.sum(BoxContent.remaining))
+            .filter(BoxContent.box_id.in_(box_ids))
+            .group_by(BoxContent.box_id)
+            .all()
+        )
+        rows = db.query(
+            Box.box_id, Box.status, Box.store_id, Box.location_in_store, Store.store_name
+        ).outerjoin(
+            Store, Store.store_id == Box.store_id
+        ).filter(
+            Box.box_id.in_(box_ids)
+        ).all()
+
+        for box_id, box_status, store_id, location_in_store, store_name in rows:
+            box_info[box_id] = {
+                "status": box_status,
+                "location": ScanLocation(
+                    store_id=store_id,
+                    store_name=store_name,
+                    location_in_store=location_in_store,
+                    quantity=int(remaining.get(box_id) or 0),
+                ),
+            }
+
+    result = []
+    for code, matched_by, entries in lookups:
+        matches = []
+        for entry in entries:
+            entity_type, entity_id = entry["key"]
+            match = ScanMatch(
+                entity_type=entity_type,
+                entity_id=entity_id,
+                code=entry["primary_code"],
+                label=entry["label"],
+            )
+            if entity_type == "item":
+                match.locations = item_locations.get(entity_id, [])
+            elif entity_id in box_info:
+                match.status = box_info[entity_id]["status"]
+                if box_info[entity_id]["location"].store_id:
+                    match.locations = [box_info[entity_id]["location"]]
+            matches.append(match)
+
+        result.append(ScanResolution(
+            code=code,
+            found=bool(matches),
+            matched_by=matched_by,
+            matches=matches,
+        ))
+
+    return result
+
+def _pick_entity(code: str, event_type: ScanEventType) -> Tuple[Optional[str], Optional[int]]:
+    """Pick the entity a scanned code refers to (boxes win over items)"""
+    _, entries = code_index.lookup(code)
+    boxes = [entry["key"] for entry in entries if entry["key"][0] == "box"]
+    items = [entry["key"] for entry in entries if entry["key"][0] == "item"]
+    if boxes:
+        return boxes[0]
+    if items and event_type != ScanEventType.checkin:
+        return items[0]
+    return (None, None)
+
+
+def _event_result(event: ScanEvent, status_override: Optional[str] = None) -> ScanEventResult:
+    return ScanEventResult(
+        idempotency_key=event.idempotency_key,
+        status=status_override or event.status,
+        message=event.message,
+        entity_type=event.entity_type,
+        entity_id=event.entity_id,
+        transaction_ids=event.transaction_ids or [],
+    )
+
+
+class ScanBatch:
+    """
+    Applies the events of one scan session against preloaded rows.
+
+    Every handler validates before it mutates anything, so a failed event
+    leaves no partial changes and the rest of the session still applies.
+    """
+
+    def __init__(self, db: Session, request: ScanSessionCreate, username: str):
+        self.db = db
+        self.request = request
+        self.username = username
+        self.ledger = InventoryLedger(db)
+        self.boxes: Dict[int, Box] = {}
+        self.contents: Dict[int, List[BoxContent]] = {}
+        self.store_ids = set()
+        self.levels: Dict[int, Tuple[int, int]] = {}
+        self.markers = set()  # (box_id, item_id, store_id) with a box_checkin transaction
+        self.stocked_out = []  # Allocations of all stock-outs, applied to BoxContent.remaining in finish()
+
+    def preload(self, resolved: List[Tuple[ScanEventCreate, Tuple[Optional[str], Optional[int]]]]):
+        """Load every row the session can touch with one query per table"""
+        db = self.db
+        box_ids = {entity_id for _, (entity_type, entity_id) in resolved if entity_type == "box"}
+        item_events = [(event, entity_id) for event, (entity_type, entity_id) in resolved if entity_type == "item"]
+
+        if box_ids:
+            self.boxes = {box.box_id: box for box in db.query(Box).filter(Box.box_id.in_(box_ids))}
+            contents = db.query(BoxContent).filter(
+                BoxContent.box_id.in_(box_ids)
+            ).order_by(BoxContent.content_id.asc())
+            for content in contents:
+                self.contents.setdefault(content.box_id, []).append(content)
+
+            self.markers = set(
+                db.query(StockTransaction.box_id, StockTransaction.item_id, StockTransaction.to_store_id).filter(
+                    StockTransaction.box_id.in_(box_ids),
+                    StockTransaction.transaction_type == 'box_checkin'
+                ).distinct().all()
+            )
+
+        store_ids = {self.request.store_id}
+        for event, _ in resolved:
+            store_ids.update([event.from_store_id, event.to_store_id])
+        store_ids.update(box.store_id for box in self.boxes.values())
+        store_ids.discard(None)
+        if store_ids:
+            self.store_ids = {
+                store_id for (store_id,) in db.query(Store.store_id).filter(Store.store_id.in_(store_ids))
+            }
+
+        checkin_item_ids = set()
+        keys = set()
+        for event, (entity_type, entity_id) in resolved:
+            event_stores = {event.from_store_id, event.to_store_id, self.request.store_id}
+            if entity_type == "box" and entity_id in self.boxes:
+                event_stores.add(self.boxes[entity_id].store_id)
+                for content in self.contents.get(entity_id, []):
+                    if event.event_type == ScanEventType.checkin:
+                        checkin_item_ids.add(content.item_id)
+                    keys.update((content.item_id, store_id) for store_id in event_stores if store_id)
+        for event, item_id in item_events:
+            keys.update((item_id, store_id) for store_id in (event.from_store_id, event.to_store_id, self.request.store_id) if store_id)
+
+        self.levels = load_stock_levels(db, checkin_item_ids)
+        self.ledger.load(keys)
+
+    # ------------------------------------------------------------------
+    # Validation helpers
+    # ------------------------------------------------------------------
+
+    def _store(self, store_id: Optional[int], label: str) -> int:
+        if not store_id:
+            raise StockError(f"{label} is required")
+        if store_id not in self.store_ids:
+            raise StockError(f"Store {store_id} not found")
+        return store_id
+
+    def _box(self, box_id: int, expected_status: str) -> Box:
+        box = self.boxes.get(box_id)
+        if not box:
+            raise StockError("Box not found")
+        if box.status != expected_status:
+            raise StockError(f"Box is {box.status}, expected {expected_status}")
+        return box
+
+    def _plan_box(self, box: Box, store_id: int) -> List[Tuple[int, int]]:
+        return self.ledger.plan_box(box.box_id, self.contents.get(box.box_id, []), store_id)
+
+    def _box_left(self, box: Box, store_id: int) -> int:
+        """Units of the box still in the store after this event (reserved ones included)"""
+        return self.ledger.box_quantity(box.box_id, [content.item_id for content in self.contents.get(box.box_id, [])], store_id)
+
+    def _transaction(self, event: ScanEventCreate, **fields) -> StockTransaction:
+        values = {
+            "employee_name": event.employee_name,
+            "employee_id": event.employee_id,
+            "department": event.department,
+            "reason": event.reason,
+            "notes": event.notes,
+            "created_by": self.username,
+        }
+        values.update(fields)
+        transaction = StockTransaction(**values)
+        self.db.add(transaction)
+        return transaction
+
+    # ------------------------------------------------------------------
+    # Event handlers
+    # ------------------------------------------------------------------
+
+    def apply(self, event: ScanEventCreate, entity_type: Optional[str], entity_id: Optional[int]) -> List[StockTransaction]:
+        if entity_type is None:
+            if event.event_type == ScanEventType.checkin:
+                raise StockError(f"Box with code '{event.code}' not found")
+            raise StockError(f"Code '{event.code}' not found")
+
+        if event.event_type == ScanEventType.checkin:
+            return self.checkin(event, entity_id)
+        if event.event_type == ScanEventType.stock_out:
+            if entity_type == "box":
+                return self.stock_out_box(event, entity_id)
+            return self.stock_out_item(event, entity_id)
+        if entity_type == "box":
+            return self.transfer_box(event, entity_id)
+        return self.transfer_item(event, entity_id)
+
+    def checkin(self, event: ScanEventCreate, box_id: int) -> List[StockTransaction]:
+        box = self._box(box_id, "pending_checkin")
+        store_id = self._store(event.to_store_id or self.request.store_id, "to_store_id (or session store_id)")
+
+        box.store_id = store_id
+        box.location_in_store = event.location_in_store
+        box.status = "checked_in"
+        box.checked_in_at = datetime.now()
+        box.checked_in_by = self.username
+
+        transactions = []
+        for content in self.contents.get(box_id, []):
+            # One inventory row per box, like PUT /api/boxes/{box_id}/checkin
+            self.ledger.add_row(
+                content.item_id, store_id, content.quantity,
+                levels=self.levels.get(content.item_id),
+                box_id=box.box_id, box_reference=box.box_code
+            )
+            transactions.append(self._transaction(
+                event,
+                transaction_type="box_checkin",
+                box_id=box.box_id,
+                item_id=content.item_id,
+                to_store_id=store_id,
+                quantity=content.quantity,
+                reference_number=box.box_code,
+                reference_type="BOX",
+            ))
+            self.markers.add((box.box_id, content.item_id, store_id))
+        return transactions
+
+    def stock_out_item(self, event: ScanEventCreate, item_id: int) -> List[StockTransaction]:
+        if not event.quantity:
+            raise StockError("quantity is required for item stock-out")
+        store_id = self._store(event.from_store_id or self.request.store_id, "from_store_id (or session store_id)")
+
+        self.stocked_out.extend(self.ledger.take(item_id, store_id, event.quantity))
+        return [self._transaction(
+            event,
+            transaction_type="stock_out",
+            item_id=item_id,
+            from_store_id=store_id,
+            quantity=event.quantity,
+            reference_number=event.reference_number,
+        )]
+
+    def stock_out_box(self, event: ScanEventCreate, box_id: int) -> List[StockTransaction]:
+        box = self._box(box_id, "checked_in")
+        store_id = self._store(event.from_store_id or box.store_id or self.request.store_id, "from_store_id")
+
+        planned = self._plan_box(box, store_id)
+        if not planned:
+            raise StockError(f"Box {box.box_code} has no stock left in store {store_id}")
+
+        transactions = []
+        for item_id, quantity in planned:
+            self.stocked_out.extend(self.ledger.take_from_box(box.box_id, item_id, store_id, quantity))
+            transactions.append(self._transaction(
+                event,
+                transaction_type="stock_out",
+                box_id=box.box_id,
+                item_id=item_id,
+                from_store_id=store_id,
+                quantity=quantity,
+                reference_number=box.box_code,
+                reference_type="BOX",
+            ))
+        # Reserved units stay in the box until they are issued or released
+        if not self._box_left(box, store_id):
+            box.status = "stocked_out"
+        return transactions
+
+    def transfer_item(self, event: ScanEventCreate, item_id: int) -> List[StockTransaction]:
+        if not event.quantity:
+            raise StockError("quantity is required for item transfer")
+        from_store_id = self._store(event.from_store_id or self.request.store_id, "from_store_id (or session store_id)")
+        to_store_id = self._store(event.to_store_id, "to_store_id")
+        if from_store_id == to_store_id:
+            raise StockError("from_store_id and to_store_id must be different")
+
+        taken = self.ledger.take(item_id, from_store_id, event.quantity)
+        self.ledger.receive(taken, to_store_id)
+        return [self._transaction(
+            event,
+            transaction_type="transfer_out",
+            item_id=item_id,
+            from_store_id=from_store_id,
+            to_store_id=to_store_id,
+            quantity=event.quantity,
+            reference_number=event.reference_number,
+        )]
+
+    def transfer_box(self, event: ScanEventCreate, box_id: int) -> List[StockTransaction]:
+        box = self._box(box_id, "checked_in")
+        from_store_id = self._store(box.store_id, "Box store")
+        if event.from_store_id and event.from_store_id != from_store_id:
+            raise StockError(f"Box {box.box_code} is in store {from_store_id}, not {event.from_store_id}")
+        to_store_id = self._store(event.to_store_id, "to_store_id")
+        if from_store_id == to_store_id:
+            raise StockError("from_store_id and to_store_id must be different")
+
+        planned = self._plan_box(box, from_store_id)
+        if not planned and self._box_left(box, from_store_id):
+            raise StockError(f"Box {box.box_code} has no unreserved stock in store {from_store_id}")
+
+        transactions = []
+        for item_id, quantity in planned:
+            taken = self.ledger.take_from_box(box.box_id, item_id, from_store_id, quantity)
+            self.ledger.receive(taken, to_store_id)
+            transactions.append(self._transaction(
+                event,
+                transaction_type="transfer_out",
+                box_id=box.box_id,
+                item_id=item_id,
+                from_store_id=from_store_id,
+                to_store_id=to_store_id,
+                quantity=quantity,
+                reference_number=box.box_code,
+                reference_type="BOX",
+            ))
+
+            # Keep the box reference visible in the destination store (same marker as single transfers)
+            if (box.box_id, item_id, to_store_id) not in self.markers:
+                transactions.append(self._transaction(
+                    event,
+                    transaction_type="box_checkin",
+                    box_id=box.box_id,
+                    item_id=item_id,
+                    to_store_id=to_store_id,
+                    quantity=0,
+                    reference_number=box.box_code,
+                    reference_type="BOX",
+                    notes=f"Box transferred from store {from_store_id}",
+                ))
+                self.markers.add((box.box_id, item_id, to_store_id))
+
+        # The box itself moves only once nothing of it is left behind (e.g. reserved units)
+        if not self._box_left(box, from_store_id):
+            box.store_id = to_store_id
+            if event.location_in_store is not None:
+                box.location_in_store = event.location_in_store
+        return transactions
+
+    def finish(self):
+        """
+        Apply all stock-outs of the session to BoxContent.remaining in one bulk
+        update and refresh stock alerts for the item/store pairs that changed
+        """
+        consume_box_contents(self.db, self.stocked_out)
+        mark_emptied_boxes(self.db, {row.box_id for row, _ in self.stocked_out if row.box_id})
+        update_stock_alerts(self.db, self.ledger.changed)
+
+
+def apply_scan_session(db: Session, request: ScanSessionCreate, username: str) -> ScanSessionResponse:
+    """
+    Apply a batch of offline scan events in one database transaction.
+
+    Events whose idempotency_key was already applied are reported as
+    duplicates without re-executing; previously failed keys are retried.
+    """
+    # Codes written by another worker since its last build are read from the database
+    code_index.ensure_codes(db, [event.code for event in request.events])
+
+    keys = {event.idempotency_key for event in request.events}
+    existing = {
+        row.idempotency_key: row
+        for row in db.query(ScanEvent).filter(ScanEvent.idempotency_key.in_(keys))
+    }
+
+    session = ScanSession(
+        client_session_id=request.client_session_id,
+        device_id=request.device_id,
+        store_id=request.store_id,
+        event_count=len(request.events),
+        created_by=username,
+    )
+    db.add(session)
+    db.flush()
+
+    # Split duplicates from events to apply, resolving codes against the index
+    to_apply = []
+    duplicates = []  # (index, key)
+    seen = set()
+    for index, event in enumerate(request.events):
+        previous = existing.get(event.idempotency_key)
+        if event.idempotency_key in seen or (previous is not None and previous.status == "applied"):
+            duplicates.append((index, event.idempotency_key))
+            continue
+        seen.add(event.idempotency_key)
+        to_apply.append((index, event, _pick_entity(event.code, event.event_type), previous))
+
+    batch = ScanBatch(db, request, username)
+    batch.preload([(event, entity) for _, event, entity, _ in to_apply])
+
+    applied = []  # (index, ScanEvent, transactions)
+    for index, event, (entity_type, entity_id), previous in to_apply:
+        try:
+            transactions = batch.apply(event, entity_type, entity_id)
+            event_status, message = "applied", None
+        except StockError as e:
+            transactions = []
+            event_status, message = "failed", str(e)
+
+        row = previous or ScanEvent(idempotency_key=event.idempotency_key)
+        row.session_id = session.session_id
+        row.event_type = event.event_type.value
+        row.code = event.code
+        row.entity_type = entity_type
+        row.entity_id = entity_id
+        row.quantity = event.quantity
+        row.from_store_id = event.from_store_id
+        row.to_store_id = event.to_store_id
+        row.status = event_status
+        row.message = message[:500] if message else None
+        row.scanned_at = event.scanned_at
+        if previous is None:
+            db.add(row)
+        applied.append((index, row, transactions))
+
+    batch.finish()
+
+    # One flush writes all inventory updates, transactions and events
+    db.flush()
+
+    results: List[Optional[ScanEventResult]] = [None] * len(request.events)
+    result_by_key: Dict[str, ScanEventResult] = {}
+    for index, row, transactions in applied:
+        row.transaction_ids = [t.transaction_id for t in transactions]
+        results[index] = result_by_key[row.idempotency_key] = _event_result(row)
+
+    for index, key in duplicates:
+        original = result_by_key.get(key)
+        if original is not None:
+            results[index] = original.model_copy(update={"status": "duplicate"})
+        else:
+            results[index] = _event_result(existing[key], "duplicate")
+
+    session.applied_count = sum(1 for r in results if r.status == "applied")
+    session.duplicate_count = sum(1 for r in results if r.status == "duplicate")
+    session.failed_count = sum(1 for r in results if r.status == "failed")
+
+    db.commit()
+
+    return ScanSessionResponse(
+        session_id=session.session_id,
+        client_session_id=session.client_session_id,
+        received=session.event_count,
+        applied=session.applied_count,
+        duplicates=session.duplicate_count,
+        failed=session.failed_count,
+        created_at=session.created_at,
+        results=results,
+    )
+
+
+# ============================================================================
+# SCAN ENDPOINTS
+# ============================================================================
+
+@router.post("/resolve", response_model=List[ScanResolution])
+def resolve_scans(
+    request: ScanResolveRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Resolve one or many scanned QR/barcodes in a single round trip.
+    Returns entity type, ID and current stock location per code.
+    """
+    return resolve_codes(db, request.codes, request.include_location, request.allow_prefix)
+
+@router.get("/resolve", response_model=ScanResolution)
+def resolve_scan(
+    code: str = Query(..., min_length=1, max_length=200),
+    allow_prefix: bool = Query(False),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Resolve a single scanned code
+    """
+    results = resolve_codes(db, [code], True, allow_prefix)
+    if not results:
+        return ScanResolution(code=code, found=False)
+    return results[0]
+
+@router.post("/reindex")
+def reindex_codes(
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Rebuild the scan code index from the database (admin only)
+    """
+    if current_user.role != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can rebuild the scan index"
+        )
+
+    return code_index.rebuild(db)
+
+@router.post("/sessions", response_model=ScanSessionResponse, status_code=status.HTTP_201_CREATED)
+def sync_scan_session(
+    request: ScanSessionCreate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Sync a queued batch of offline scan events (check-in, stock-out, transfer).
+    All events are applied in one transaction; the response has one result per event.
+    Re-sending a session is safe - already applied idempotency keys are not re-executed.
+    """
+    for attempt in range(2):
+        try:
+            return apply_scan_session(db, request, current_user.username)
+        except IntegrityError:
+            # Another sync inserted one of our idempotency keys first - retry once,
+            # the keys it applied are then reported as duplicates
+            db.rollback()
+            if attempt:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Scan session conflicts with a concurrent sync, please retry"
+                )
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Error syncing scan session: {str(e)}"
+            )
+
+@router.get("/sessions/{session_id}", response_model=ScanSessionResponse)
+def get_scan_session(
+    session_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Get a synced scan session with the current result of each of its events
+    """
+    session = db.query(ScanSession).filter(ScanSession.session_id == session_id).first()
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scan session not found"
+        )
+
+    events = db.query(ScanEvent).filter(
+        ScanEvent.session_id == session_id
+    ).order_by(ScanEvent.event_id.asc()).all()
+
+    return ScanSessionResponse(
+        session_id=session.session_id,
+        client_session_id=session.client_session_id,
+        received=session.event_count,
+        applied=session.applied_count,
+        duplicates=session.duplicate_count,
+        failed=session.failed_count,
+        created_at=session.created_at,
+        results=[_event_result(event) for event in events],
+    )
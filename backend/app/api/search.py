@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import Optional, List
+
+from app.database import get_db
+from app.schemas import SearchResult
+from app.auth import get_current_user
+from app.search_index import search_index, RESULT_TYPES
+
+router = APIRouter(prefix="/api/search", tags=["Search"])
+
+# ============================================================================
+# SEARCH ENDPOINTS
+# ============================================================================
+
+@router.get("/", response_model=List[SearchResult])
+def search(
+    q: str = Query(..., min_length=1, max_length=100, description="Search text (prefix match per word)"),
+    types: Optional[str] = Query(None, description="Comma-separated result types: item,box,po,item_type,transaction"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Unified type-ahead search across items, boxes, purchase orders,
+    item types and transaction references, ranked by relevance
+    """
+    type_filter = None
+    if types:
+        type_filter = {t.strip() for t in types.split(",") if t.strip()}
+        invalid = type_filter - set(RESULT_TYPES)
+        if invalid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid result type(s): {', '.join(sorted(invalid))}"
+            )
+
+    search_index.ensure_built(db)
+    return search_index.search(q, types=type_filter, limit=limit)
+
+@router.get("/stats")
+def get_search_stats(
+    current_user = Depends(get_current_user)
+):
+    """
+    Get search index statistics
+    """
+    return search_index.stats()
+
+@router.post("/reindex")
+def reindex(
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Rebuild the search index from the database (admin only)
+    """
+    if current_user.role != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can rebuild the search index"
+        )
+
+    return search_index.rebuild(db)
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, or_
-from typing import Optional, List
+from typing import Optional, List, Dict
+import json
 
 from app.database import get_db
-from app.models import Store, Plant
+from app.models import Store, Plant, Inventory
 from app.schemas import StoreCreate, StoreUpdate, StoreResponse
 from app.auth import get_current_user
+from app.reference_cache import STORES, reference_response, matches_search
 
 router = APIRouter(prefix="/api/stores", tags=["Stores"])
 
@@ -14,73 +16,62 @@ router = APIRouter(prefix="/api/stores", tags=["Stores"])
 # STORE ENDPOINTS
 # ============================================================================
 
+def store_usage(db: Session, store_ids: Optional[List[int]] = None) -> Dict[int, int]:
+    """Units in stock per store (one grouped query)"""
+    query = db.query(Inventory.store_id, func.sum(Inventory.quantity))
+    if store_ids is not None:
+        if not store_ids:
+            return {}
+        query = query.filter(Inventory.store_id.in_(store_ids))
+    return {store_id: int(quantity or 0) for store_id, quantity in query.group_by(Inventory.store_id)}
+
+
 @router.get("/", response_model=List[StoreResponse])
 async def get_stores(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     plant_id: Optional[int] = None,
     status: Optional[str] = Query(None, regex='^(active|inactive|maintenance)$'),
     store_type: Optional[str] = None,
     search: Optional[str] = None,
+    include_counts: bool = Query(True, description='Include current_items / utilization (one inventory query)'),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """
     Get all stores with filtering
+    (served from the reference cache, supports If-None-Match; stock figures
+    are read per request unless include_counts=false)
     """
-    query = db.query(Store)
-    
-    # Plant filter
-    if plant_id:
-        query = query.filter(Store.plant_id == plant_id)
-    
-    # Status filter
-    if status:
-        query = query.filter(Store.status == status)
-    
-    # Store type filter
-    if store_type:
-        query = query.filter(Store.store_type == store_type)
-    
-    # Search filter
-    if search:
-        search_pattern = f"%{search}%"
-        query = query.filter(
-            or_(
-                Store.store_name.like(search_pattern),
-                Store.store_code.like(search_pattern),
-                Store.location_details.like(search_pattern),
-                Store.store_manager.like(search_pattern)
-            )
-        )
-    
-    # Order by name
-    query = query.order_by(Store.store_name.asc())
-    
-    # Pagination
-    stores = query.offset(skip).limit(limit).all()
-    
-    # Add plant info and computed fields to each store
-    from app.models import Inventory
-    for store in stores:
-        plant = db.query(Plant).filter(Plant.plant_id == store.plant_id).first()
-        if plant:
-            store.plant_name = plant.plant_name
-            store.plant_code = plant.plant_code
-        
-        # Calculate current_items from inventory (use setattr for dynamic attribute)
-        current_items_count = db.query(func.sum(Inventory.quantity)).filter(
-            Inventory.store_id == store.store_id
-        ).scalar() or 0
-        setattr(store, 'current_items', int(current_items_count))
-        
-        # Calculate utilization percentage if capacity exists
-        if store.capacity and store.capacity > 0:
-            setattr(store, 'utilization_percentage', (store.current_items / store.capacity) * 100)
-        else:
-            setattr(store, 'utilization_percentage', 0.0)
-    
-    return stores
+    def select(rows):
+        rows = [
+            row for row in rows
+            if (not plant_id or row["plant_id"] == plant_id)
+            and (not status or row["status"] == status)
+            and (not store_type or row["store_type"] == store_type)
+            and matches_search(row, search, ("store_name", "store_code", "location_details", "store_manager"))
+        ]
+        return rows[skip:skip + limit]
+
+    usage = store_usage(db) if include_counts else {}
+
+    def finalize(rows):
+        for row in rows:
+            row["current_items"] = usage.get(row["store_id"], 0)
+            if row["capacity"] and row["capacity"] > 0:
+                row["utilization_percentage"] = (row["current_items"] / row["capacity"]) * 100
+        return rows
+
+    params = {
+        "skip": skip, "limit": limit, "plant_id": plant_id, "status": status,
+        "store_type": store_type, "search": search, "include_counts": include_counts,
+    }
+    return reference_response(
+        request, db, STORES, params, select,
+        extra_digest=lambda: json.dumps(sorted(usage.items())),
+        finalize=finalize,
+    )
 
 @router.get("/{store_id}", response_model=StoreResponse)
 async def get_store(
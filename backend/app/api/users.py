@@ -6,13 +6,12 @@ import secrets
 import string
 import os
 import base64
-import uuid
-from pathlib import Path
 from app.database import get_db
 from app.models import User
 from app.schemas import UserCreate, UserUpdate, UserResponse, PasswordChange
 from app.auth import get_current_active_user, get_password_hash, require_role, verify_password
-from app.email_service import email_service
+from app.email_outbox import queue_welcome_email, email_sender
+from app.images import ImageError, store_profile_photo
 # Activity logging disabled - ActivityLog model removed during reset
 
 router = APIRouter(prefix="/api/users", tags=["users"])
@@ -158,25 +157,24 @@ def create_user(
             detail=f"Failed to create user: {error_msg}"
         )
     
-    # Send welcome email if email is provided
+    # Send welcome email if email is provided (outbox - SMTP is not on the request path)
     if user.email:
-        print(f"[User API] Attempting to send welcome email to {user.email}")
         try:
-            email_sent = email_service.send_welcome_email(
+            email = queue_welcome_email(
+                db,
                 to_email=user.email,
                 username=user.username,
                 full_name=user.full_name,
-                temporary_password=temporary_password
+                temporary_password=temporary_password,
+                created_by=current_user.username,
             )
-            if email_sent:
-                print(f"[User API] [SUCCESS] Welcome email sent successfully to {user.email}")
-            else:
-                print(f"[User API] [WARNING] Welcome email failed to send to {user.email} (check email service logs)")
+            db.commit()
+            email_sender.wake()
+            print(f"[User API] Welcome email to {user.email} queued (email {email.email_id})")
         except Exception as e:
             # Log error but don't fail user creation
-            print(f"[User API] [ERROR] Exception sending welcome email: {str(e)}")
-            import traceback
-            print(f"[User API] Traceback: {traceback.format_exc()}")
+            db.rollback()
+            print(f"[User API] [ERROR] Could not queue welcome email: {str(e)}")
     
     # Activity logging disabled - ActivityLog model removed
     # log_activity(...)
@@ -372,8 +370,13 @@ def upload_profile_photo(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Upload profile photo"""
-    # Validate file type
+    """
+    Upload profile photo.
+    The image is validated by decoding it (not by the declared content type),
+    re-encoded without metadata and stored with 64/256px WebP/JPEG variants
+    (see app.images); UserResponse.profile_photo_variants lists their URLs.
+    """
+    # Reject obviously wrong files before reading them
     allowed_types = ["image/jpeg", "image/jpg", "image/png", "image/gif", "image/webp"]
     if file.content_type not in allowed_types:
         raise HTTPException(
@@ -381,30 +384,12 @@ def upload_profile_photo(
             detail="Invalid file type. Only JPEG, PNG, GIF, and WebP are allowed."
         )
     
-    # Validate file size (max 5MB)
-    file_content = file.file.read()
-    if len(file_content) > 5 * 1024 * 1024:  # 5MB
-        raise HTTPException(
-            status_code=400,
-            detail="File size too large. Maximum size is 5MB."
-        )
-    
-    # Create uploads directory if it doesn't exist
-    upload_dir = Path(__file__).parent.parent.parent / "uploads" / "profiles"
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Generate unique filename
-    file_ext = Path(file.filename).suffix or ".jpg"
-    filename = f"{current_user.user_id}_{uuid.uuid4().hex}{file_ext}"
-    file_path = upload_dir / filename
-    
-    # Save file
-    with open(file_path, "wb") as f:
-        f.write(file_content)
+    try:
+        profile_url = store_profile_photo(db, file.file)
+    except ImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Update user profile_photo
-    # Store relative path or URL
-    profile_url = f"/uploads/profiles/{filename}"
     current_user.profile_photo = profile_url
     db.commit()
     db.refresh(current_user)
@@ -63,11 +63,8 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
         return None
     return user
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user from JWT token"""
+def user_from_token(db: Session, token: str) -> User:
+    """Resolve an access token to an active user (raises 401/403)"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -93,6 +90,13 @@ async def get_current_user(
     
     return user
 
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> User:
+    """Get current authenticated user from JWT token"""
+    return user_from_token(db, token)
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
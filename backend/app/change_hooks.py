@@ -0,0 +1,105 @@
+"""
+Commit hooks for in-process indexes and caches.
+
+A watcher registers the models it cares about, a snapshot function and an
+apply function. Snapshots of inserted/updated/deleted rows are taken at flush
+time (primary keys are assigned, attributes are still loaded) and handed to the
+apply function only after the outermost transaction commits, so rolled back
+writes never leak into an index.
+
+Note: bulk ``query.update()`` / ``query.delete()`` statements bypass the ORM
+unit of work and are NOT seen here.
+"""
+from typing import Any, Callable, Iterable, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# (models, snapshot(obj) -> data, apply(changes) -> None)
+_watchers: List[Tuple[tuple, Callable[[Any], Any], Callable[[List[Tuple[str, Any]]], None]]] = []
+
+_PENDING_KEY = "change_hooks_pending"
+
+
+def watch(models: Iterable[type], snapshot: Callable[[Any], Any], apply: Callable[[List[Tuple[str, Any]]], None]):
+    """
+    Register a watcher.
+    apply() receives a list of ("upsert" | "delete", snapshot) tuples after commit.
+    """
+    _watchers.append((tuple(models), snapshot, apply))
+
+
+def on_commit(session: Session, callback: Callable[[], None]):
+    """
+    Run callback once the session's outermost transaction commits (dropped on
+    rollback) - for side effects of bulk statements the watchers cannot see
+    """
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    pending.append((_current_transaction(session), lambda changes: callback(), "call", None))
+
+
+def _current_transaction(session: Session):
+    return session.get_nested_transaction() or session.get_transaction()
+
+
+def _belongs_to(transaction, rolled_back) -> bool:
+    """True if transaction is rolled_back or one of its nested children"""
+    while transaction is not None:
+        if transaction is rolled_back:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session: Session, flush_context):
+    if not _watchers:
+        return
+
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    transaction = _current_transaction(session)
+
+    changed = [("upsert", obj) for obj in session.new]
+    changed += [("upsert", obj) for obj in session.dirty if session.is_modified(obj)]
+    changed += [("delete", obj) for obj in session.deleted]
+
+    for action, obj in changed:
+        for models, snapshot, apply in _watchers:
+            if isinstance(obj, models):
+                try:
+                    pending.append((transaction, apply, action, snapshot(obj)))
+                except Exception as e:
+                    print(f"[Change Hooks] Snapshot failed for {type(obj).__name__}: {e}")
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_changes(session: Session):
+    # after_commit also fires when a SAVEPOINT is released - wait for the outer commit
+    if session.get_nested_transaction() is not None:
+        return
+
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    # Group by apply function, preserving order of changes
+    grouped = {}
+    for _, apply, action, data in pending:
+        grouped.setdefault(apply, []).append((action, data))
+
+    for apply, changes in grouped.items():
+        try:
+            apply(changes)
+        except Exception as e:
+            # Never fail a committed request because an index could not be updated
+            print(f"[Change Hooks] Error applying {len(changes)} change(s): {e}")
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changes(session: Session, previous_transaction):
+    pending = session.info.get(_PENDING_KEY)
+    if not pending:
+        return
+    session.info[_PENDING_KEY] = [
+        entry for entry in pending if not _belongs_to(entry[0], previous_transaction)
+    ]
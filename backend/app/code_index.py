@@ -0,0 +1,258 @@
+"""
+In-memory code index for QR/barcode scan resolution.
+
+Maps every scannable code (item code, item QR code, item barcode, box code,
+box QR code) to the entity it identifies, so resolving a pallet of scans is a
+dictionary lookup per code instead of several unindexed queries per scan.
+Codes are normalized (stripped, upper-cased) and also kept in a sorted list
+for prefix lookups of truncated/partial scans.
+
+Built lazily on first use and refreshed from committed writes through
+app.change_hooks. Each worker process holds its own copy and does not see
+writes made by the others, so:
+- codes missing from the index are looked up in the database (one IN query
+  per entity type, see ensure_codes()) and added to it
+- once the index is older than INDEX_TTL_SECONDS, the next lookup starts a
+  reload in a background thread; lookups keep using the current copy until
+  the new one is swapped in
+"""
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app import change_hooks
+from app.database import SessionLocal
+from app.models import Item, Box
+
+INDEX_TTL_SECONDS = int(os.getenv("CODE_INDEX_TTL_SECONDS", "60"))
+
+EntityKey = Tuple[str, int]  # ("item" | "box", id)
+
+# Shortest prefix accepted for partial-code lookups
+MIN_PREFIX_LENGTH = 4
+
+
+def normalize_code(code: Optional[str]) -> str:
+    return (code or "").strip().upper()
+
+
+def _item_entry(item_id, item_code, item_name, qr_code, barcode) -> dict:
+    return {
+        "key": ("item", item_id),
+        "label": item_name or item_code,
+        "primary_code": item_code,
+        "codes": {normalize_code(c) for c in (item_code, qr_code, barcode) if c},
+    }
+
+
+def _box_entry(box_id, box_code, qr_code, supplier) -> dict:
+    return {
+        "key": ("box", box_id),
+        "label": f"{box_code} ({supplier})" if supplier else box_code,
+        "primary_code": box_code,
+        "codes": {normalize_code(c) for c in (box_code, qr_code) if c},
+    }
+
+
+class CodeIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()  # One reload at a time
+        self._pending: Optional[List[Tuple[str, dict]]] = None  # Changes committed during a reload
+        self._built = False
+        self._built_at = 0.0
+        self._by_code: Dict[str, Set[EntityKey]] = {}
+        self._codes: List[str] = []  # Sorted, for prefix lookups
+        self._entries: Dict[EntityKey, dict] = {}
+
+    def ensure_built(self, db: Session):
+        if self._built:
+            if time.monotonic() - self._built_at >= INDEX_TTL_SECONDS:
+                self._reload_in_background()
+            return
+        # First lookup in this process: nothing to answer from yet
+        with self._reload_lock:
+            if not self._built:
+                self._reload(db)
+
+    def ensure_codes(self, db: Session, codes: Iterable[str]):
+        """
+        Build the index if needed, then load the entities of codes it does not
+        know from the database (written by another process since the last build)
+        """
+        self.ensure_built(db)
+        with self._lock:
+            missing = {code.strip() for code in codes if code and code.strip()}
+            missing = {code for code in missing if normalize_code(code) not in self._by_code}
+        if not missing:
+            return
+
+        # Stored codes may not be upper case (case-sensitive collations)
+        candidates = missing | {normalize_code(code) for code in missing}
+        items = db.query(Item.item_id, Item.item_code, Item.item_name, Item.qr_code, Item.barcode).filter(
+            or_(Item.item_code.in_(candidates), Item.qr_code.in_(candidates), Item.barcode.in_(candidates))
+        ).all()
+        boxes = db.query(Box.box_id, Box.box_code, Box.qr_code, Box.supplier).filter(
+            or_(Box.box_code.in_(candidates), Box.qr_code.in_(candidates))
+        ).all()
+        if not items and not boxes:
+            return
+
+        self.apply_changes(
+            [("upsert", _item_entry(*row)) for row in items] + [("upsert", _box_entry(*row)) for row in boxes]
+        )
+        print(f"[Code Index] Loaded {len(items)} item(s) and {len(boxes)} box(es) for unknown codes")
+
+    def rebuild(self, db: Session) -> dict:
+        with self._reload_lock:
+            self._reload(db)
+        return self.stats()
+
+    def _reload_in_background(self):
+        if not self._reload_lock.acquire(blocking=False):
+            return  # Already reloading
+        threading.Thread(target=self._background_reload, name="code-index-reload", daemon=True).start()
+
+    def _background_reload(self):
+        db = SessionLocal()
+        try:
+            self._reload(db)
+        except Exception as e:
+            self._built_at = time.monotonic()  # Retry after another TTL
+            print(f"[Code Index] Reload failed: {e}")
+        finally:
+            db.close()
+            self._reload_lock.release()
+
+    def _reload(self, db: Session):
+        """Load a new copy without holding the lock, then swap it in (caller holds _reload_lock)"""
+        with self._lock:
+            self._pending = []
+        try:
+            fresh = CodeIndex()
+            fresh._load(db)
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            # Writes committed while loading may be missing from the new copy
+            fresh._apply(self._pending)
+            self._pending = None
+            self._by_code = fresh._by_code
+            self._codes = fresh._codes
+            self._entries = fresh._entries
+            self._built = True
+            self._built_at = time.monotonic()
+        print(f"[Code Index] Built index: {len(self._entries)} entities, {len(self._codes)} codes")
+
+    def _load(self, db: Session):
+        for row in db.query(Item.item_id, Item.item_code, Item.item_name, Item.qr_code, Item.barcode):
+            self._put(_item_entry(*row), sort=False)
+        for row in db.query(Box.box_id, Box.box_code, Box.qr_code, Box.supplier):
+            self._put(_box_entry(*row), sort=False)
+        self._codes.sort()
+
+    def _put(self, entry: dict, sort: bool = True):
+        key = entry["key"]
+        self._remove(key)
+        for code in entry["codes"]:
+            keys = self._by_code.get(code)
+            if keys is None:
+                keys = self._by_code[code] = set()
+                if sort:
+                    insort(self._codes, code)
+                else:
+                    self._codes.append(code)  # Sorted once by _load()
+            keys.add(key)
+        self._entries[key] = entry
+
+    def _remove(self, key: EntityKey):
+        entry = self._entries.pop(key, None)
+        if not entry:
+            return
+        for code in entry["codes"]:
+            keys = self._by_code.get(code)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._by_code[code]
+                index = bisect_left(self._codes, code)
+                if index < len(self._codes) and self._codes[index] == code:
+                    del self._codes[index]
+
+    def apply_changes(self, changes: List[Tuple[str, dict]]):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.extend(changes)  # Replayed onto the copy being loaded
+            if self._built:
+                self._apply(changes)
+
+    def _apply(self, changes: List[Tuple[str, dict]]):
+        for action, entry in changes:
+            if entry is None:
+                continue
+            if action == "delete":
+                self._remove(entry["key"])
+            else:
+                self._put(entry)
+
+    def lookup(self, code: str, allow_prefix: bool = False, max_prefix_matches: int = 5) -> Tuple[Optional[str], List[dict]]:
+        """
+        Resolve one code.
+        Returns (matched_by, entries) where matched_by is "exact", "prefix" or None.
+        """
+        normalized = normalize_code(code)
+        if not normalized:
+            return None, []
+
+        with self._lock:
+            keys = self._by_code.get(normalized)
+            if keys:
+                return "exact", [self._entries[k] for k in sorted(keys)]
+
+            if not allow_prefix or len(normalized) < MIN_PREFIX_LENGTH:
+                return None, []
+
+            start = bisect_left(self._codes, normalized)
+            matched: List[EntityKey] = []
+            for candidate in self._codes[start:]:
+                if not candidate.startswith(normalized):
+                    break
+                for k in sorted(self._by_code[candidate]):
+                    if k not in matched:
+                        matched.append(k)
+                if len(matched) >= max_prefix_matches:
+                    break
+            if not matched:
+                return None, []
+            return "prefix", [self._entries[k] for k in matched[:max_prefix_matches]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "built": self._built,
+                "entities": len(self._entries),
+                "codes": len(self._codes),
+            }
+
+
+def _snapshot(obj) -> Optional[dict]:
+    if isinstance(obj, Item):
+        return _item_entry(obj.item_id, obj.item_code, obj.item_name, obj.qr_code, obj.barcode)
+    if isinstance(obj, Box):
+        return _box_entry(obj.box_id, obj.box_code, obj.qr_code, obj.supplier)
+    return None
+
+
+# Singleton instance
+code_index = CodeIndex()
+
+change_hooks.watch([Item, Box], _snapshot, code_index.apply_changes)
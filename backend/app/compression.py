@@ -0,0 +1,196 @@
+"""
+Response compression (Brotli, else gzip).
+
+Large JSON lists (1000 inventory rows are several hundred KB) compress
+about 10x, which matters most for the mobile scanners. Clients that accept
+"br" (every current browser over HTTPS) get Brotli, others that accept
+"gzip" get gzip. Sent as they are:
+- responses smaller than COMPRESSION_MIN_SIZE bytes
+- already encoded or partial (206) bodies
+- Server-Sent Events, images, audio/video and archives (EXCLUDED_CONTENT_TYPES)
+- files sent by the server itself (http.response.pathsend)
+
+Streaming bodies are compressed chunk by chunk (flushed after every chunk),
+and chunks of COMPRESSION_THREAD_MIN_SIZE bytes or more are compressed in a
+worker thread so the event loop is not blocked.
+
+This is a plain ASGI middleware built on Starlette's public Headers /
+MutableHeaders only, so it does not depend on GZipMiddleware internals.
+"""
+import os
+import zlib
+
+import anyio.to_thread
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_THREAD_MIN_SIZE = 128 * 1024
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# 4-5 compresses JSON better than gzip -6 at a similar speed; 11 is for static assets
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Media types that are already compressed or must not be buffered ("type/*" matches the whole type)
+EXCLUDED_CONTENT_TYPES = {
+    "application/grpc",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "audio/*",
+    "font/woff",
+    "font/woff2",
+    "image/avif",
+    "image/gif",
+    "image/jpeg",
+    "image/png",
+    "image/webp",
+    "text/event-stream",
+    "video/*",
+}
+
+
+def accepts_encoding(accept_encoding: str, encoding: str) -> bool:
+    """True if the Accept-Encoding header lists the encoding without q=0"""
+    for entry in accept_encoding.split(","):
+        name, _, params = entry.strip().partition(";")
+        if name.strip().lower() != encoding:
+            continue
+        quality = params.strip().lower()
+        return not (quality.startswith("q=") and quality[2:].strip() in ("0", "0.0", "0.00", "0.000"))
+    return False
+
+
+def is_excluded_content_type(content_type: str) -> bool:
+    media_type = content_type.partition(";")[0].strip().lower()
+    return (
+        media_type in EXCLUDED_CONTENT_TYPES
+        or media_type.partition("/")[0] + "/*" in EXCLUDED_CONTENT_TYPES
+        or media_type.startswith("application/grpc+")
+    )
+
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        self.level = level
+        self._compressor = None  # Created with the first compressed body
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        data = self._compressor.compress(body)
+        return data + self._compressor.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    def __init__(self, quality: int):
+        self.quality = quality
+        self._compressor = None  # Created with the first compressed body
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=self.quality)
+        data = self._compressor.process(body)
+        return data + (self._compressor.flush() if more_body else self._compressor.finish())
+
+
+class CompressionResponder:
+    """Compresses the response of one request (encoding None: only adds Vary)"""
+
+    def __init__(self, app: ASGIApp, encoding, encoder, minimum_size: int, thread_minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.encoder = encoder
+        self.minimum_size = minimum_size
+        self.thread_minimum_size = thread_minimum_size
+        self.send = None
+        self.initial_message = None
+        self.started = False
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # Held back until the first body chunk decides the headers
+            headers = Headers(raw=message["headers"])
+            self.initial_message = message
+            self.passthrough = (
+                message["status"] == 206
+                or "content-encoding" in headers
+                or is_excluded_content_type(headers.get("content-type", ""))
+            )
+            if self.passthrough:
+                await self.send(message)
+
+        elif self.passthrough or self.initial_message is None:
+            await self.send(message)
+
+        elif message_type == "http.response.body" and not self.started:
+            self.started = True
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+
+            if self.encoding is None or (len(body) < self.minimum_size and not more_body):
+                self.passthrough = True
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+
+            message["body"] = await self.compress(body, more_body)
+            headers["Content-Encoding"] = self.encoding
+            if more_body or self.initial_message.get("trailers", False):
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(message["body"]))
+            await self.send(self.initial_message)
+            await self.send(message)
+
+        elif message_type == "http.response.body":
+            message["body"] = await self.compress(message.get("body", b""), message.get("more_body", False))
+            await self.send(message)
+
+        else:
+            if message_type == "http.response.pathsend" and not self.started:
+                # File sent by the server itself: never compressed
+                self.started = self.passthrough = True
+                await self.send(self.initial_message)
+            await self.send(message)
+
+    async def compress(self, body: bytes, more_body: bool) -> bytes:
+        if len(body) >= self.thread_minimum_size:
+            # Compressing large bodies inline would block the event loop
+            return await anyio.to_thread.run_sync(self.encoder.compress, body, more_body)
+        return self.encoder.compress(body, more_body)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE, gzip_level: int = GZIP_LEVEL,
+                 brotli_quality: int = BROTLI_QUALITY, thread_minimum_size: int = COMPRESSION_THREAD_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.thread_minimum_size = thread_minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("Accept-Encoding", "")
+        if accepts_encoding(accept_encoding, "br"):
+            encoding, encoder = "br", BrotliEncoder(self.brotli_quality)
+        elif accepts_encoding(accept_encoding, "gzip"):
+            encoding, encoder = "gzip", GzipEncoder(self.gzip_level)
+        else:
+            encoding, encoder = None, None
+
+        responder = CompressionResponder(self.app, encoding, encoder, self.minimum_size, self.thread_minimum_size)
+        await responder(scope, receive, send)
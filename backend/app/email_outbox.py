@@ -0,0 +1,260 @@
+"""
+Email outbox: persistent queue of outgoing emails and the background sender.
+
+Request handlers call queue_email() inside their own transaction, so an email
+is only sent if the write that caused it commits, and SMTP latency never
+blocks a request. The sender thread claims due messages in batches (a
+conditional UPDATE with a claim token, safe with several app processes),
+renders them from the cached templates and delivers the whole batch over one
+reused SmtpConnection. Failures are retried with exponential backoff up to
+max_attempts; permanent SMTP errors (5xx, refused recipients) fail at once.
+
+Delivery is at least once: a process killed between handing a batch to the
+server and committing it sends that batch again after STALE_SENDING_MINUTES.
+"""
+import os
+import smtplib
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.email_service import EmailService, SmtpConnection, email_service
+from app.models import EmailOutbox
+
+POLL_INTERVAL_SECONDS = float(os.getenv("EMAIL_POLL_SECONDS", "5"))
+BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+RETRY_BACKOFF_SECONDS = 60
+STALE_SENDING_MINUTES = 15
+MAX_ERROR_LENGTH = 2000
+
+
+def queue_email(
+    db: Session,
+    to_email: str,
+    template: str,
+    context: dict,
+    sensitive: bool = False,
+    created_by: Optional[str] = None,
+) -> EmailOutbox:
+    """Add an email to the outbox (the caller commits, then may call email_sender.wake())"""
+    email = EmailOutbox(
+        to_email=to_email,
+        template=template,
+        context=context,
+        sensitive=sensitive,
+        status="queued",
+        attempts=0,
+        next_attempt_at=datetime.now(),
+        created_by=created_by,
+        created_at=datetime.now(),
+    )
+    db.add(email)
+    return email
+
+
+def queue_welcome_email(
+    db: Session,
+    to_email: str,
+    username: str,
+    full_name: Optional[str],
+    temporary_password: str,
+    login_url: str = 'http://localhost:3000/login',
+    created_by: Optional[str] = None,
+) -> EmailOutbox:
+    return queue_email(db, to_email, "welcome", {
+        "name": full_name or username,
+        "username": username,
+        "temporary_password": temporary_password,
+        "login_url": login_url,
+    }, sensitive=True, created_by=created_by)
+
+
+def _is_connection_error(error: Exception) -> bool:
+    """Server unreachable or rejecting the session (not this message)"""
+    if isinstance(error, (smtplib.SMTPConnectError, smtplib.SMTPServerDisconnected,
+                          smtplib.SMTPAuthenticationError, smtplib.SMTPHeloError)):
+        return True
+    # Socket errors (SMTPException is itself an OSError subclass)
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def _is_permanent(error: Exception) -> bool:
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500 \
+        and not isinstance(error, smtplib.SMTPServerDisconnected)
+
+
+class EmailSender:
+    def __init__(self, service: EmailService, poll_interval: float = POLL_INTERVAL_SECONDS, batch_size: int = BATCH_SIZE):
+        self.service = service
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.connection = SmtpConnection(service)
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.batches = 0
+        self.last_batch_ms: Optional[int] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        if not self.service.is_configured():
+            print("[Email Outbox] SMTP not configured (SMTP_USERNAME / SMTP_PASSWORD) - emails stay queued")
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="email-sender", daemon=True)
+        self._thread.start()
+        print("[Email Outbox] Sender started")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+        self.connection.close()
+
+    def wake(self):
+        """Deliver queued messages now instead of at the next poll"""
+        self._wake.set()
+
+    def _run(self):
+        try:
+            self.requeue_stale()
+        except Exception as e:
+            print(f"[Email Outbox] Could not requeue stale emails: {e}")
+        while not self._stop.is_set():
+            try:
+                while not self._stop.is_set() and self.send_pending():
+                    pass
+                self.connection.close_if_idle()
+            except Exception as e:
+                print(f"[Email Outbox] Sender error: {e}")
+                self.connection.close()
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def requeue_stale(self):
+        """Put messages left 'sending' by a stopped process back in the queue"""
+        db = SessionLocal()
+        try:
+            requeued = db.query(EmailOutbox).filter(
+                EmailOutbox.status == "sending",
+                EmailOutbox.claimed_at < datetime.now() - timedelta(minutes=STALE_SENDING_MINUTES)
+            ).update({EmailOutbox.status: "queued", EmailOutbox.claim_token: None}, synchronize_session=False)
+            db.commit()
+            if requeued:
+                print(f"[Email Outbox] Requeued {requeued} stale emails")
+        finally:
+            db.close()
+
+    def send_pending(self) -> int:
+        """Claim and deliver one batch of due messages. Returns the batch size (0 = nothing due)."""
+        db = SessionLocal()
+        try:
+            now = datetime.now()
+            due_ids = [
+                email_id for (email_id,) in db.query(EmailOutbox.email_id).filter(
+                    EmailOutbox.status == "queued",
+                    EmailOutbox.next_attempt_at <= now
+                ).order_by(EmailOutbox.next_attempt_at.asc(), EmailOutbox.email_id.asc()).limit(self.batch_size)
+            ]
+            if not due_ids:
+                return 0
+
+            token = str(uuid.uuid4())
+            db.query(EmailOutbox).filter(
+                EmailOutbox.email_id.in_(due_ids),
+                EmailOutbox.status == "queued"
+            ).update({
+                EmailOutbox.status: "sending",
+                EmailOutbox.claim_token: token,
+                EmailOutbox.claimed_at: now,
+                EmailOutbox.attempts: EmailOutbox.attempts + 1,
+            }, synchronize_session=False)
+            db.commit()
+            batch = db.query(EmailOutbox).filter(EmailOutbox.claim_token == token).order_by(EmailOutbox.email_id).all()
+
+            started = time.perf_counter()
+            for position, email in enumerate(batch):
+                if not self._deliver(email):
+                    # Server down: postpone the rest instead of timing out once per message
+                    self._postpone(batch[position + 1:])
+                    break
+            db.commit()
+
+            self.batches += 1
+            self.last_batch_ms = int((time.perf_counter() - started) * 1000)
+            return len(batch)
+        finally:
+            db.close()
+
+    def _deliver(self, email: EmailOutbox) -> bool:
+        """Send one claimed message. Returns False if the SMTP server could not be reached."""
+        try:
+            subject, text_body, html_body = self.service.render(email.template, email.context or {})
+            self.connection.send(self.service.build_message(email.to_email, subject, text_body, html_body))
+        except Exception as e:
+            email.last_error = f"{type(e).__name__}: {e}"[:MAX_ERROR_LENGTH]
+            email.claim_token = None
+            connection_error = _is_connection_error(e)
+            if connection_error:
+                self.connection.close()
+            # Bad template / context can never succeed
+            permanent = not connection_error and (_is_permanent(e) or isinstance(e, (ValueError, KeyError)))
+            if permanent or email.attempts >= email.max_attempts:
+                email.status = "failed"
+                self.failed += 1
+                self._finish(email)
+                print(f"[Email Outbox] [ERROR] Email {email.email_id} to {email.to_email} failed: {e}")
+            else:
+                # Retry with exponential backoff
+                email.status = "queued"
+                email.next_attempt_at = datetime.now() + timedelta(seconds=RETRY_BACKOFF_SECONDS * 2 ** (email.attempts - 1))
+                self.retried += 1
+                print(f"[Email Outbox] Email {email.email_id} to {email.to_email} will be retried: {e}")
+            return not connection_error
+
+        email.status = "sent"
+        email.sent_at = datetime.now()
+        email.last_error = None
+        email.claim_token = None
+        self.sent += 1
+        self._finish(email)
+        return True
+
+    def _postpone(self, emails):
+        """Hand claimed but unattempted messages back to the queue (the attempt is not counted)"""
+        retry_at = datetime.now() + timedelta(seconds=RETRY_BACKOFF_SECONDS)
+        for email in emails:
+            email.status = "queued"
+            email.attempts -= 1
+            email.claim_token = None
+            email.next_attempt_at = retry_at
+
+    def _finish(self, email: EmailOutbox):
+        if email.sensitive:
+            email.context = None
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "batches": self.batches,
+            "last_batch_ms": self.last_batch_ms,
+            "connections_opened": self.connection.connections_opened,
+        }
+
+
+# Singleton instance
+email_sender = EmailSender(email_service)
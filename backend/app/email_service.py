@@ -1,15 +1,33 @@
+"""
+Email rendering and SMTP delivery.
+
+Messages are not sent on the request path: handlers add them to the
+email_outbox table (app.email_outbox.queue_email) and the outbox sender
+delivers them in batches over one reused SmtpConnection.
+"""
 import smtplib
 import os
+import time
+from functools import lru_cache
+from html import escape
 from pathlib import Path
+from string import Template
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Optional
+from email.utils import formatdate, make_msgid
+from typing import Optional, Tuple
 from dotenv import load_dotenv
 
 # Load .env file from backend directory
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+# Template files live in app/email_templates/<name>.txt and <name>.html
+TEMPLATE_DIR = Path(__file__).parent / 'email_templates'
+EMAIL_SUBJECTS = {
+    'welcome': 'Welcome to HR Inventory System - $from_name',
+}
+
 class EmailService:
     def __init__(self):
         # Load .env again to ensure it's loaded
@@ -54,6 +72,9 @@ class EmailService:
         self.smtp_password = os.getenv('SMTP_PASSWORD', '').replace(' ', '').strip()
         self.from_email = os.getenv('FROM_EMAIL', self.smtp_username).strip()
         self.from_name = os.getenv('FROM_NAME', 'HR Inventory System')
+        # Local test servers (e.g. aiosmtpd) speak plain SMTP without login
+        self.smtp_use_tls = os.getenv('SMTP_USE_TLS', 'true').lower() in ('1', 'true', 'yes')
+        self.smtp_require_auth = os.getenv('SMTP_REQUIRE_AUTH', 'true').lower() in ('1', 'true', 'yes')
         
         # Debug logging
         print(f"[Email Service] Final values:")
@@ -63,217 +84,118 @@ class EmailService:
         print(f"[Email Service]   SMTP Password: {'SET' if self.smtp_password else 'NOT SET'}")
         print(f"[Email Service]   From Email: {self.from_email}")
     
-    def send_welcome_email(
-        self,
-        to_email: str,
-        username: str,
-        full_name: Optional[str],
-        temporary_password: str,
-        login_url: str = 'http://localhost:3000/login'
-    ) -> bool:
+    def is_configured(self) -> bool:
+        """True if messages can be handed to the SMTP server"""
+        if not self.smtp_require_auth:
+            return bool(self.smtp_server)
+        if not self.smtp_username or not self.smtp_password:
+            return False
+        # SMTP_USERNAME should be a valid email address
+        return '@' in self.smtp_username
+    
+    def render(self, template: str, context: dict) -> Tuple[str, str, str]:
         """
-        Send welcome email with temporary password to new user
+        Render an email template -> (subject, text body, html body).
+        Template files are read and compiled once (see _load_template).
         """
-        if not to_email:
-            return False
-        
-        try:
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = f'Welcome to HR Inventory System - {self.from_name}'
-            msg['From'] = f'{self.from_name} <{self.from_email}>'
-            msg['To'] = to_email
-            
-            # Create HTML email body
-            html_body = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="UTF-8">
-                <style>
-                    body {{
-                        font-family: Arial, sans-serif;
-                        line-height: 1.6;
-                        color: #333;
-                        max-width: 600px;
-                        margin: 0 auto;
-                        padding: 20px;
-                    }}
-                    .header {{
-                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        color: white;
-                        padding: 30px;
-                        text-align: center;
-                        border-radius: 10px 10px 0 0;
-                    }}
-                    .content {{
-                        background: #f9f9f9;
-                        padding: 30px;
-                        border-radius: 0 0 10px 10px;
-                    }}
-                    .credentials {{
-                        background: white;
-                        border: 2px solid #667eea;
-                        border-radius: 8px;
-                        padding: 20px;
-                        margin: 20px 0;
-                    }}
-                    .credential-item {{
-                        margin: 10px 0;
-                        padding: 10px;
-                        background: #f0f0f0;
-                        border-radius: 5px;
-                    }}
-                    .credential-label {{
-                        font-weight: bold;
-                        color: #667eea;
-                    }}
-                    .credential-value {{
-                        font-family: monospace;
-                        font-size: 16px;
-                        color: #333;
-                        margin-top: 5px;
-                    }}
-                    .button {{
-                        display: inline-block;
-                        padding: 12px 30px;
-                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        color: white;
-                        text-decoration: none;
-                        border-radius: 5px;
-                        margin: 20px 0;
-                    }}
-                    .footer {{
-                        margin-top: 30px;
-                        padding-top: 20px;
-                        border-top: 1px solid #ddd;
-                        text-align: center;
-                        color: #666;
-                        font-size: 12px;
-                    }}
-                    .warning {{
-                        background: #fff3cd;
-                        border-left: 4px solid #ffc107;
-                        padding: 15px;
-                        margin: 20px 0;
-                        border-radius: 4px;
-                    }}
-                </style>
-            </head>
-            <body>
-                <div class="header">
-                    <h1>Welcome to HR Inventory System</h1>
-                    <p>Jabil Malaysia</p>
-                </div>
-                
-                <div class="content">
-                    <p>Hello {full_name or username},</p>
-                    
-                    <p>Your account has been created successfully. Please use the following credentials to log in:</p>
-                    
-                    <div class="credentials">
-                        <div class="credential-item">
-                            <div class="credential-label">Username:</div>
-                            <div class="credential-value">{username}</div>
-                        </div>
-                        <div class="credential-item">
-                            <div class="credential-label">Temporary Password:</div>
-                            <div class="credential-value">{temporary_password}</div>
-                        </div>
-                    </div>
-                    
-                    <div class="warning">
-                        <strong>[IMPORTANT]</strong> Please change your password after your first login for security purposes.
-                    </div>
-                    
-                    <p style="text-align: center;">
-                        <a href="{login_url}" class="button">Login Now</a>
-                    </p>
-                    
-                    <p>If you have any questions or need assistance, please contact your system administrator.</p>
-                    
-                    <div class="footer">
-                        <p>This is an automated email from HR Inventory System - Jabil Malaysia</p>
-                        <p>Please do not reply to this email.</p>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-            
-            # Create plain text version
-            text_body = f"""
-Welcome to HR Inventory System - Jabil Malaysia
-
-Hello {full_name or username},
-
-Your account has been created successfully. Please use the following credentials to log in:
-
-Username: {username}
-Temporary Password: {temporary_password}
+        if template not in EMAIL_SUBJECTS:
+            raise ValueError(f"Unknown email template: {template}")
+        context = {"from_name": self.from_name, **context}
+        html_context = {key: escape(str(value)) for key, value in context.items()}
+        return (
+            Template(EMAIL_SUBJECTS[template]).substitute(context),
+            _load_template(f"{template}.txt").substitute(context),
+            _load_template(f"{template}.html").substitute(html_context),
+        )
+    
+    def build_message(self, to_email: str, subject: str, text_body: str, html_body: str) -> MIMEMultipart:
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = f'{self.from_name} <{self.from_email}>'
+        msg['To'] = to_email
+        msg['Date'] = formatdate(localtime=True)
+        msg['Message-ID'] = make_msgid()
+        msg.attach(MIMEText(text_body, 'plain'))
+        msg.attach(MIMEText(html_body, 'html'))
+        return msg
 
-[IMPORTANT] Please change your password after your first login for security purposes.
 
-Login URL: {login_url}
+@lru_cache(maxsize=None)
+def _load_template(filename: str) -> Template:
+    return Template((TEMPLATE_DIR / filename).read_text(encoding='utf-8'))
 
-If you have any questions or need assistance, please contact your system administrator.
 
----
-This is an automated email from HR Inventory System - Jabil Malaysia
-Please do not reply to this email.
-            """
-            
-            # Attach parts
-            part1 = MIMEText(text_body, 'plain')
-            part2 = MIMEText(html_body, 'html')
-            
-            msg.attach(part1)
-            msg.attach(part2)
-            
-            # Send email
-            if not self.smtp_username or not self.smtp_password:
-                print(f"[Email Service] SMTP credentials not configured. Would send email to {to_email}")
-                print(f"[Email Service] Username: {username}, Password: {temporary_password}")
-                print(f"[Email Service] Please configure SMTP_USERNAME and SMTP_PASSWORD in .env file")
-                return False
-            
-            # Validate email configuration
-            if '@' not in self.smtp_username:
-                print(f"[Email Service] Invalid SMTP_USERNAME format: {self.smtp_username}")
-                print(f"[Email Service] SMTP_USERNAME should be a valid email address")
-                return False
-            
-            print(f"[Email Service] Attempting to send email to {to_email} via {self.smtp_server}:{self.smtp_port}")
-            print(f"[Email Service] Using SMTP account: {self.smtp_username}")
-            print(f"[Email Service] From: {self.from_name} <{self.from_email}>")
-            print(f"[Email Service] To: {to_email}")
-            print(f"[Email Service] Subject: Welcome to HR Inventory System - {self.from_name}")
-            
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                print(f"[Email Service] Connected to SMTP server")
+class SmtpConnection:
+    """
+    One long-lived SMTP connection (STARTTLS and login once), reused for every
+    message the outbox sender delivers. A connection idle for longer than
+    KEEPALIVE_SECONDS is checked with NOOP before use, a dropped one is
+    reopened, and one idle for IDLE_TIMEOUT_SECONDS is closed (servers drop
+    idle clients anyway). Not thread-safe: owned by the sender thread.
+    """
+    KEEPALIVE_SECONDS = 30
+    IDLE_TIMEOUT_SECONDS = int(os.getenv('SMTP_IDLE_TIMEOUT_SECONDS', '120'))
+    
+    def __init__(self, service: 'EmailService', timeout: float = 30):
+        self.service = service
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+    
+    def _connect(self):
+        service = self.service
+        server = smtplib.SMTP(service.smtp_server, service.smtp_port, timeout=self.timeout)
+        try:
+            if service.smtp_use_tls:
                 server.starttls()
-                print(f"[Email Service] TLS started")
-                server.login(self.smtp_username, self.smtp_password)
-                print(f"[Email Service] Logged in successfully")
-                server.send_message(msg)
-                print(f"[Email Service] Message sent to SMTP server")
-            
-            print(f"[Email Service] [SUCCESS] Welcome email sent successfully to {to_email}")
-            return True
-            
-        except smtplib.SMTPAuthenticationError as e:
-            print(f"[Email Service] [ERROR] SMTP Authentication Error: {str(e)}")
-            print(f"[Email Service] Check your SMTP_USERNAME and SMTP_PASSWORD in .env file")
-            print(f"[Email Service] For Gmail, make sure you're using App Password, not regular password")
-            return False
-        except smtplib.SMTPException as e:
-            print(f"[Email Service] [ERROR] SMTP Error: {str(e)}")
+            if service.smtp_username and service.smtp_password:
+                server.login(service.smtp_username, service.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        self._last_used = time.monotonic()
+        self.connections_opened += 1
+        print(f"[Email Service] Connected to {service.smtp_server}:{service.smtp_port}")
+    
+    def _alive(self) -> bool:
+        if self._server is None:
             return False
-        except Exception as e:
-            print(f"[Email Service] [ERROR] Error sending email to {to_email}: {str(e)}")
-            import traceback
-            print(f"[Email Service] Traceback: {traceback.format_exc()}")
+        if time.monotonic() - self._last_used < self.KEEPALIVE_SECONDS:
+            return True
+        try:
+            return self._server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
             return False
+    
+    def send(self, msg: MIMEMultipart):
+        """Send one message, reconnecting once if the server dropped the connection"""
+        for attempt in range(2):
+            if not self._alive():
+                self.close()
+                self._connect()
+            try:
+                self._server.send_message(msg)
+                self._last_used = time.monotonic()
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self.close()
+                if attempt:
+                    raise
+    
+    def close_if_idle(self):
+        if self._server is not None and time.monotonic() - self._last_used > self.IDLE_TIMEOUT_SECONDS:
+            self.close()
+    
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            self._server.close()
+        self._server = None
 
 # Singleton instance
 email_service = EmailService()
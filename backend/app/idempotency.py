@@ -0,0 +1,86 @@
+"""
+Idempotency-Key support for write endpoints.
+
+The first request with a given key stores its response in the
+idempotency_keys table inside the same database transaction as the write
+itself, so either both are committed or neither is. A retry with the same
+key replays the stored response instead of executing again; reusing a key
+for a different request body is rejected. Keys are scoped per user, so one
+user can never be handed the stored response of another user's write.
+"""
+import hashlib
+import json
+from typing import Any, Optional
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.models import IdempotencyKey
+
+MAX_KEY_LENGTH = 100
+
+# Response header set on replayed responses
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def validate_key(key: Optional[str]) -> Optional[str]:
+    """Normalize the Idempotency-Key header (None if not sent)"""
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"
+        )
+    return key
+
+
+def request_hash(payload: BaseModel) -> str:
+    """Stable SHA-256 fingerprint of a request body"""
+    body = json.dumps(payload.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def replay(db: Session, scope: str, key: str, fingerprint: str, username: str) -> Optional[JSONResponse]:
+    """
+    Return the stored response for (scope, user, key), or None if the key is
+    new for this user. Raises 409 if the key was used for a different request body.
+    """
+    record = db.query(IdempotencyKey).filter(
+        IdempotencyKey.scope == scope,
+        IdempotencyKey.created_by == username,
+        IdempotencyKey.idempotency_key == key
+    ).first()
+    if not record:
+        return None
+
+    if record.request_hash != fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Idempotency-Key was already used for a different request"
+        )
+
+    return JSONResponse(
+        status_code=record.status_code,
+        content=record.response_body,
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+def remember(db: Session, scope: str, key: str, fingerprint: str, status_code: int, body: Any, username: str):
+    """
+    Store the response for (scope, user, key). Call before committing the
+    write so both land in the same transaction; a concurrent request of the
+    same user with the same key then fails on the unique constraint at commit.
+    """
+    db.add(IdempotencyKey(
+        scope=scope,
+        idempotency_key=key,
+        request_hash=fingerprint,
+        status_code=status_code,
+        response_body=body,
+        created_by=username,
+    ))
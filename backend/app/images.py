@@ -0,0 +1,159 @@
+"""
+Profile photo pipeline.
+
+An upload is copied to a temporary file in chunks (size limit enforced while
+copying, SHA-256 computed on the way), then decoded and re-encoded with
+Pillow on a small dedicated thread pool so concurrent uploads cannot occupy
+every request worker with CPU-heavy image work.
+
+Each photo is stored as a normalised original (EXIF rotation applied,
+metadata stripped, at most ORIGINAL_MAX_SIZE px) plus square variants of
+VARIANT_SIZES px in WebP and JPEG, in the content-addressed store
+(app.upload_store) under the SHA-256 of the uploaded bytes:
+    <shard>/<sha256>.jpg           normalised original (User.profile_photo)
+    <shard>/<sha256>_<size>.webp   variant
+    <shard>/<sha256>_<size>.jpg    variant (fallback for old browsers)
+so identical uploads reuse the same files and every name is immutable
+(served with Cache-Control: immutable by app.uploads).
+"""
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from sqlalchemy.orm import Session
+
+from app.upload_store import PROFILE_PHOTO_DIR, blob_path, blob_url, digest_from_url, register_blob
+
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024  # 5MB
+MAX_PIXELS = 40_000_000  # Reject decompression bombs before decoding
+CHUNK_SIZE = 64 * 1024
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "GIF", "WEBP"}
+ORIGINAL_MAX_SIZE = 1024
+VARIANT_SIZES = (64, 256)
+VARIANT_FORMATS = {"webp": ("WEBP", {"quality": 80, "method": 4}), "jpg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True})}
+
+# Image decoding / encoding runs here, off the request worker pool
+image_executor = ThreadPoolExecutor(max_workers=int(os.getenv("IMAGE_WORKERS", "2")), thread_name_prefix="image")
+
+
+class ImageError(ValueError):
+    """Upload is not an acceptable image (the message is shown to the user)"""
+
+
+def copy_upload(source: BinaryIO, max_bytes: int = MAX_UPLOAD_BYTES):
+    """
+    Copy an upload to a temporary file chunk by chunk, stopping as soon as it
+    exceeds max_bytes. Returns (temporary path, sha256 hex digest); the caller
+    deletes the file.
+    """
+    PROFILE_PHOTO_DIR.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=PROFILE_PHOTO_DIR, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as target:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ImageError(f"File size too large. Maximum size is {max_bytes // (1024 * 1024)}MB.")
+                digest.update(chunk)
+                target.write(chunk)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    if size == 0:
+        os.unlink(temp_path)
+        raise ImageError("Uploaded file is empty.")
+    return temp_path, digest.hexdigest()
+
+
+def _encode(image: Image.Image, image_format: str, options: dict) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def _write_once(path: Path, data: bytes) -> int:
+    """Write a content-addressed file (kept if it already exists). Returns its size."""
+    if path.exists():
+        return path.stat().st_size
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".variant-")
+    with os.fdopen(fd, "wb") as target:
+        target.write(data)
+    os.replace(temp_path, path)
+    return len(data)
+
+
+def _process(temp_path: str, digest: str) -> Tuple[int, int]:
+    """Decode and write the original and variants. Returns (total bytes, file count)."""
+    try:
+        with Image.open(temp_path) as image:
+            if image.format not in ALLOWED_FORMATS:
+                raise ImageError("Invalid file type. Only JPEG, PNG, GIF, and WebP are allowed.")
+            if image.width * image.height > MAX_PIXELS:
+                raise ImageError("Image dimensions are too large.")
+            image.seek(0)  # First frame of animated GIF / WebP
+            image = ImageOps.exif_transpose(image)
+            if image.mode != "RGB":
+                # Flatten transparency onto white (avatars are shown on light and dark backgrounds alike)
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                rgba = image.convert("RGBA")
+                background.paste(rgba, mask=rgba.getchannel("A"))
+                image = background
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ImageError("File is not a valid image.") from e
+
+    original = image.copy()
+    original.thumbnail((ORIGINAL_MAX_SIZE, ORIGINAL_MAX_SIZE), Image.LANCZOS)
+    total = _write_once(blob_path(digest, ".jpg"), _encode(original, *VARIANT_FORMATS["jpg"]))
+    files = 1
+
+    for size in VARIANT_SIZES:
+        # Square, centre-cropped - avatars are always shown round / square
+        variant = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        for extension, (image_format, options) in VARIANT_FORMATS.items():
+            total += _write_once(blob_path(digest, f"_{size}.{extension}"), _encode(variant, image_format, options))
+            files += 1
+
+    return total, files
+
+
+def store_profile_photo(db: Session, source: BinaryIO) -> str:
+    """
+    Stream, validate and re-encode an uploaded profile photo with its
+    variants, and register the blob (the caller commits together with the
+    User.profile_photo change). Returns the URL; raises ImageError.
+    """
+    temp_path, digest = copy_upload(source)
+    try:
+        size_bytes, file_count = image_executor.submit(_process, temp_path, digest).result()
+    finally:
+        os.unlink(temp_path)
+
+    url = blob_url(digest, ".jpg")
+    register_blob(db, digest, url, size_bytes, file_count)
+    return url
+
+
+def photo_variant_urls(profile_photo: Optional[str]) -> Optional[Dict[str, Dict[str, str]]]:
+    """
+    Variant URLs of a processed profile photo, e.g. {"64": {"webp": ..., "jpg": ...}, "256": {...}}.
+    None for photos uploaded before the pipeline existed (only the original is available).
+    """
+    digest = digest_from_url(profile_photo)
+    if not digest:
+        return None
+    return {
+        str(size): {extension: blob_url(digest, f"_{size}.{extension}") for extension in VARIANT_FORMATS}
+        for size in VARIANT_SIZES
+    }
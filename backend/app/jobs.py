@@ -0,0 +1,306 @@
+"""
+In-process background job runner backed by the jobs table.
+
+Handlers are registered with @job(name, interval_seconds=...). Work is queued
+as rows in the jobs table - by request handlers through enqueue(), or by the
+runner itself for periodic jobs - and executed by a daemon thread off the
+request path, each job with its own database session.
+
+Jobs are claimed with a conditional UPDATE (status 'queued' -> 'running'), so
+several app processes can share one table without running a job twice.
+Failed jobs are retried with exponential backoff up to max_attempts. Jobs
+left 'running' by a process that died are put back in the queue by whichever
+runner is still alive (checked every STALE_CHECK_SECONDS).
+Execution time is stored per job (duration_ms) and aggregated in memory per
+job name for GET /api/jobs/metrics.
+"""
+import os
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Job
+
+POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+RETRY_BACKOFF_SECONDS = 30
+STALE_RUNNING_MINUTES = 30  # 'running' jobs older than this were lost (process restarted)
+STALE_CHECK_SECONDS = 60  # How often the runner looks for jobs lost by another process
+MAX_ERROR_LENGTH = 4000
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+@dataclass
+class JobDefinition:
+    name: str
+    handler: Callable[[Session, dict], Optional[dict]]
+    interval_seconds: Optional[int] = None  # Periodic jobs are queued by the runner
+    max_attempts: int = 3
+    scrub_payload: bool = False  # Drop the payload once finished (e.g. contains a password)
+
+
+@dataclass
+class JobMetrics:
+    runs: int = 0
+    failures: int = 0
+    total_ms: int = 0
+    max_ms: int = 0
+    last_ms: Optional[int] = None
+    last_status: Optional[str] = None
+    last_finished_at: Optional[datetime] = None
+
+    def record(self, status: str, duration_ms: int):
+        self.runs += 1
+        if status != "succeeded":
+            self.failures += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.last_ms = duration_ms
+        self.last_status = status
+        self.last_finished_at = datetime.now()
+
+    def as_dict(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "avg_ms": round(self.total_ms / self.runs, 1) if self.runs else None,
+            "max_ms": self.max_ms if self.runs else None,
+            "last_ms": self.last_ms,
+            "last_status": self.last_status,
+            "last_finished_at": self.last_finished_at,
+        }
+
+
+JOB_DEFINITIONS: Dict[str, JobDefinition] = {}
+
+
+def job(name: str, interval_seconds: Optional[int] = None, max_attempts: int = 3, scrub_payload: bool = False):
+    """Register a job handler: handler(db, payload) -> result dict (the runner commits)"""
+    def decorator(handler):
+        JOB_DEFINITIONS[name] = JobDefinition(
+            name=name,
+            handler=handler,
+            interval_seconds=interval_seconds,
+            max_attempts=max_attempts,
+            scrub_payload=scrub_payload,
+        )
+        return handler
+    return decorator
+
+
+def enqueue(
+    db: Session,
+    name: str,
+    payload: Optional[dict] = None,
+    run_after: Optional[datetime] = None,
+    created_by: Optional[str] = None,
+) -> Job:
+    """
+    Queue a job (added to the session - the caller commits, so the job only
+    runs if the surrounding write is committed)
+    """
+    definition = JOB_DEFINITIONS.get(name)
+    if not definition:
+        raise ValueError(f"Unknown job: {name}")
+
+    new_job = Job(
+        job_name=name,
+        status="queued",
+        payload=payload,
+        attempts=0,
+        max_attempts=definition.max_attempts,
+        run_after=run_after or datetime.now(),
+        created_by=created_by,
+        created_at=datetime.now(),
+    )
+    db.add(new_job)
+    return new_job
+
+
+class JobRunner:
+    def __init__(self, poll_interval: float = POLL_INTERVAL_SECONDS):
+        self.poll_interval = poll_interval
+        self.metrics: Dict[str, JobMetrics] = {}
+        self._next_runs: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="job-runner", daemon=True)
+        self._thread.start()
+        print(f"[Jobs] Runner started ({len(JOB_DEFINITIONS)} job types)")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def wake(self):
+        """Check for queued jobs now instead of at the next poll"""
+        self._wake.set()
+
+    def _run(self):
+        last_stale_check = None
+        while not self._stop.is_set():
+            # A crashed process leaves its jobs 'running', which would block their periodic schedule
+            if last_stale_check is None or time.monotonic() - last_stale_check >= STALE_CHECK_SECONDS:
+                last_stale_check = time.monotonic()
+                try:
+                    self.requeue_stale()
+                except Exception as e:
+                    print(f"[Jobs] Could not requeue stale jobs: {e}")
+            try:
+                self.schedule_periodic()
+                while not self._stop.is_set() and self.run_next():
+                    pass
+            except Exception as e:
+                print(f"[Jobs] Runner error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def requeue_stale(self):
+        """Put jobs left 'running' by a stopped or crashed process back in the queue"""
+        db = SessionLocal()
+        try:
+            requeued = db.query(Job).filter(
+                Job.status == "running",
+                Job.started_at < datetime.now() - timedelta(minutes=STALE_RUNNING_MINUTES)
+            ).update({Job.status: "queued"}, synchronize_session=False)
+            db.commit()
+            if requeued:
+                print(f"[Jobs] Requeued {requeued} stale running jobs")
+        finally:
+            db.close()
+
+    def schedule_periodic(self):
+        """Queue periodic jobs that are due and not already queued or running"""
+        now = datetime.now()
+        due = [
+            definition for definition in JOB_DEFINITIONS.values()
+            if definition.interval_seconds and self._next_runs.get(definition.name, now) <= now
+        ]
+        if not due:
+            return
+
+        db = SessionLocal()
+        try:
+            names = [definition.name for definition in due]
+            active = {
+                name for (name,) in db.query(Job.job_name).filter(
+                    Job.job_name.in_(names),
+                    Job.status.in_(ACTIVE_STATUSES)
+                ).distinct()
+            }
+            last_created = dict(
+                db.query(Job.job_name, func.max(Job.created_at)).filter(
+                    Job.job_name.in_(names)
+                ).group_by(Job.job_name).all()
+            )
+            for definition in due:
+                interval = timedelta(seconds=definition.interval_seconds)
+                last = last_created.get(definition.name)
+                if definition.name in active:
+                    continue
+                if last and last + interval > now:
+                    # Ran recently (e.g. before a restart or by another process)
+                    self._next_runs[definition.name] = last + interval
+                    continue
+                enqueue(db, definition.name, created_by="scheduler")
+                self._next_runs[definition.name] = now + interval
+            db.commit()
+        finally:
+            db.close()
+
+    def run_next(self) -> bool:
+        """Claim and run the oldest due job. Returns False if none was due."""
+        db = SessionLocal()
+        try:
+            now = datetime.now()
+            candidates = db.query(Job.job_id).filter(
+                Job.status == "queued",
+                Job.run_after <= now
+            ).order_by(Job.run_after.asc(), Job.job_id.asc()).limit(5).all()
+
+            for (job_id,) in candidates:
+                claimed = db.query(Job).filter(
+                    Job.job_id == job_id,
+                    Job.status == "queued"
+                ).update({
+                    Job.status: "running",
+                    Job.started_at: now,
+                    Job.attempts: Job.attempts + 1,
+                }, synchronize_session=False)
+                db.commit()
+                if claimed == 1:
+                    self._execute(db, job_id)
+                    return True
+            return False
+        finally:
+            db.close()
+
+    def _execute(self, db: Session, job_id: int):
+        current = db.query(Job).filter(Job.job_id == job_id).first()
+        definition = JOB_DEFINITIONS.get(current.job_name)
+
+        started = time.perf_counter()
+        try:
+            if not definition:
+                raise ValueError(f"No handler registered for job {current.job_name}")
+            result = definition.handler(db, current.payload or {})
+            db.commit()
+            status, error = "succeeded", None
+        except Exception as e:
+            db.rollback()
+            result = None
+            status = "failed"
+            error = f"{e}\n{traceback.format_exc()}"[:MAX_ERROR_LENGTH]
+            print(f"[Jobs] {current.job_name} (job {job_id}) failed: {e}")
+        duration_ms = int((time.perf_counter() - started) * 1000)
+
+        current = db.query(Job).filter(Job.job_id == job_id).first()
+        current.duration_ms = duration_ms
+        current.result = result
+        current.error = error
+        if status == "failed" and definition and current.attempts < current.max_attempts:
+            # Retry with exponential backoff
+            current.status = "queued"
+            current.run_after = datetime.now() + timedelta(seconds=RETRY_BACKOFF_SECONDS * 2 ** (current.attempts - 1))
+        else:
+            current.status = status
+            current.finished_at = datetime.now()
+            if definition and definition.scrub_payload:
+                current.payload = None
+        db.commit()
+
+        with self._lock:
+            self.metrics.setdefault(current.job_name, JobMetrics()).record(status, duration_ms)
+
+    def stats(self) -> List[dict]:
+        """Registered jobs with their schedule and in-process execution metrics"""
+        with self._lock:
+            return [
+                {
+                    "job_name": definition.name,
+                    "interval_seconds": definition.interval_seconds,
+                    "next_run_at": self._next_runs.get(definition.name),
+                    **self.metrics.get(definition.name, JobMetrics()).as_dict(),
+                }
+                for definition in sorted(JOB_DEFINITIONS.values(), key=lambda d: d.name)
+            ]
+
+
+# Singleton instance
+job_runner = JobRunner()
@@ -0,0 +1,72 @@
+"""
+Typed JSON column types for item type configuration.
+
+ItemType keeps its size and colour lists in JSON columns. Older code stored
+the JSON *text* of these values (a JSON string such as "[\\"S\\",\\"M\\"]")
+instead of the values themselves; migrations/normalize_item_type_json.sql
+rewrites those rows. These types normalise and validate the value once, when
+a row is loaded or written - the ORM keeps the result on the instance - so
+request code only ever sees a list of strings, never text to parse.
+
+Per-size stock levels live in the type_size_thresholds table;
+stock_levels() validates the {size: {"min": int, "max": int}} dicts written
+through ItemType.size_stock_levels.
+"""
+import json
+from typing import Dict, List, Optional
+
+from sqlalchemy.types import JSON, TypeDecorator
+
+StockLevels = Dict[str, Dict[str, int]]
+
+
+def _decode(value):
+    # Rows written before the normalisation hold (possibly repeatedly) encoded text
+    while isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    return value
+
+
+def string_list(value) -> List[str]:
+    """["S", "M"] from a list / legacy JSON text; anything else is an empty list"""
+    value = _decode(value)
+    if not isinstance(value, (list, tuple)):
+        return []
+    return [str(entry).strip() for entry in value if entry is not None and str(entry).strip()]
+
+
+def stock_levels(value) -> Optional[StockLevels]:
+    """{size: {"min": int, "max": int}}, dropping malformed entries; None when empty"""
+    value = _decode(value)
+    if not isinstance(value, dict):
+        return None
+    levels = {}
+    for size, level in value.items():
+        if hasattr(level, "model_dump"):
+            level = level.model_dump()  # SizeStockLevel from a request body
+        if not isinstance(level, dict):
+            continue
+        try:
+            levels[str(size)] = {"min": int(level["min"]), "max": int(level["max"])}
+        except (KeyError, TypeError, ValueError):
+            continue
+    return levels or None
+
+
+class StringListJSON(TypeDecorator):
+    """JSON array of strings; NULL reads as []"""
+    impl = JSON
+    cache_ok = True
+
+    def __init__(self):
+        super().__init__(none_as_null=True)
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else string_list(value)
+
+    def process_result_value(self, value, dialect):
+        return string_list(value)
+
@@ -0,0 +1,451 @@
+"""
+QR code label rendering.
+
+label_renderer.render() returns the image of each code for a (size, format),
+taking rendered images from an in-memory LRU cache (LabelCache) and rendering
+only the misses - in a process pool, since QR encoding and rasterising are
+CPU bound and hold the GIL. Small batches are rendered inline: handing a few
+codes to another process costs more than rendering them.
+
+Formats:
+    png  size x size px, modules scaled by a whole number so they stay crisp
+    svg  vector path, scales to any print size
+A batch is packed for printing by build_pdf() (one label per page: the QR
+code with the code printed below it) or build_zip() (one file per code plus,
+for PNG, a sprite sheet and its index).
+
+Box / item labels (label_renderer.render_labels) put a QR code next to the
+code and a few description lines, for a LABEL_LAYOUTS layout (A4 label
+sheets or thermal label rolls). Each worker caches the layout's template
+(geometry, fonts, blank label) so only the QR code and text are drawn per
+label; finished labels go through the same LRU cache as QR images, and
+build_sheet_pdf() places them on pages.
+
+This module only imports qrcode and Pillow: pool workers are spawned fresh
+and import it on their own.
+"""
+import io
+import json
+import math
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import repeat
+from multiprocessing import get_context
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import qrcode
+from qrcode.image.svg import SvgPathImage
+from PIL import Image, ImageDraw, ImageFont
+
+FORMATS = ("png", "svg")
+MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml", "pdf": "application/pdf", "zip": "application/zip"}
+
+QUIET_ZONE = 4  # Modules of white border required by the QR spec
+PDF_DPI = 300
+CAPTION_MAX_CHARS = 40
+
+LABEL_WORKERS = int(os.getenv("LABEL_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Batches with at most this many cache misses are rendered in the calling thread
+INLINE_RENDER_LIMIT = int(os.getenv("LABEL_INLINE_RENDER_LIMIT", "16"))
+CACHE_ENTRIES = int(os.getenv("QR_CACHE_ENTRIES", "5000"))
+CACHE_MAX_BYTES = int(os.getenv("QR_CACHE_MAX_MB", "32")) * 1024 * 1024
+
+CacheKey = Tuple[Hashable, ...]  # (code, size, format) or (label, layout, "label")
+
+# Printed label: (QR data, title, description lines)
+LabelSpec = Tuple[str, str, Tuple[str, ...]]
+
+
+@dataclass(frozen=True)
+class LabelLayout:
+    page_mm: Tuple[float, float]  # (width, height)
+    columns: int
+    rows: int
+    dpi: int
+    margin_mm: float = 0.0
+
+    @property
+    def page_px(self) -> Tuple[int, int]:
+        return tuple(round(mm / 25.4 * self.dpi) for mm in self.page_mm)
+
+    @property
+    def label_px(self) -> Tuple[int, int]:
+        margin = round(self.margin_mm / 25.4 * self.dpi)
+        width, height = self.page_px
+        return (width - 2 * margin) // self.columns, (height - 2 * margin) // self.rows
+
+
+LABEL_LAYOUTS = {
+    # 24 labels of 70 x 37 mm per A4 sheet, office laser printers
+    "a4": LabelLayout(page_mm=(210, 297), columns=3, rows=8, dpi=300),
+    # 100 x 50 mm direct thermal roll, one label per page
+    "thermal": LabelLayout(page_mm=(100, 50), columns=1, rows=1, dpi=203),
+}
+
+
+def _qr_image(code: str, size: int) -> Image.Image:
+    """Bilevel QR image of about size x size px (larger if the code needs more modules)"""
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=QUIET_ZONE)
+    qr.add_data(code)
+    qr.make(fit=True)
+
+    matrix = qr.get_matrix()  # Includes the quiet zone
+    modules = len(matrix)
+    image = Image.new("1", (modules, modules))
+    image.putdata([0 if dark else 1 for row in matrix for dark in row])
+    scale = max(1, size // modules)
+    image = image.resize((modules * scale, modules * scale), Image.NEAREST)
+    if image.width < size:
+        # Centre in the requested size; the extra margin only widens the quiet zone
+        canvas = Image.new("1", (size, size), 1)
+        offset = (size - image.width) // 2
+        canvas.paste(image, (offset, offset))
+        image = canvas
+    return image
+
+
+def render_qr(code: str, size: int, image_format: str) -> bytes:
+    """Render one QR code (runs in the pool workers)"""
+    if image_format == "svg":
+        qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=QUIET_ZONE)
+        qr.add_data(code)
+        qr.make(fit=True)
+        return qr.make_image(image_factory=SvgPathImage).to_string(encoding="unicode").encode()
+
+    buffer = io.BytesIO()
+    _qr_image(code, size).save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def _render_chunk(codes: List[str], size: int, image_format: str) -> List[bytes]:
+    return [render_qr(code, size, image_format) for code in codes]
+
+
+@dataclass
+class _LabelTemplate:
+    blank: Image.Image
+    padding: int
+    qr_size: int
+    text_x: int
+    text_width: int
+    title_fonts: Tuple[ImageFont.FreeTypeFont, ...]  # Largest first, shrunk to fit long codes
+    title_height: int
+    body_font: ImageFont.FreeTypeFont
+    max_lines: int
+
+
+@lru_cache(maxsize=None)
+def _label_template(layout_name: str) -> _LabelTemplate:
+    """Geometry, fonts and blank image of a layout (built once per process)"""
+    width, height = LABEL_LAYOUTS[layout_name].label_px
+    padding = max(4, height // 16)
+    qr_size = height - 2 * padding
+    text_x = padding + qr_size + padding
+    title_size = max(10, height // 7)
+    body_size = max(8, height // 11)
+    title_fonts = tuple(
+        ImageFont.load_default(size=size) for size in range(title_size, body_size - 1, -max(1, title_size // 10))
+    )
+    body_font = ImageFont.load_default(size=body_size)
+    title_height = int(title_size * 1.4)
+    max_lines = max(1, (height - 2 * padding - title_height) // int(body_size * 1.3))
+    return _LabelTemplate(
+        blank=Image.new("1", (width, height), 1),
+        padding=padding,
+        qr_size=qr_size,
+        text_x=text_x,
+        text_width=width - text_x - padding,
+        title_fonts=title_fonts,
+        title_height=title_height,
+        body_font=body_font,
+        max_lines=max_lines,
+    )
+
+
+def _fit_text(text: str, font: ImageFont.FreeTypeFont, width: int) -> str:
+    if font.getlength(text) <= width:
+        return text
+    while text and font.getlength(text + "…") > width:
+        text = text[:-1]
+    return text + "…"
+
+
+def render_label(spec: LabelSpec, layout_name: str) -> bytes:
+    """Render one box / item label as a bilevel PNG (runs in the pool workers)"""
+    qr_data, title, lines = spec
+    template = _label_template(layout_name)
+    label = template.blank.copy()
+
+    qr_image = _qr_image(qr_data, template.qr_size)
+    if qr_image.width > template.qr_size:
+        # Very long data: shrink rather than overflow (still scannable at print DPI)
+        qr_image = qr_image.resize((template.qr_size, template.qr_size), Image.NEAREST)
+    label.paste(qr_image, (template.padding, template.padding))
+
+    draw = ImageDraw.Draw(label)
+    title_font = next(
+        (font for font in template.title_fonts if font.getlength(title) <= template.text_width),
+        template.title_fonts[-1]
+    )
+    y = template.padding
+    draw.text((template.text_x, y), _fit_text(title, title_font, template.text_width), fill=0, font=title_font)
+    y += template.title_height
+    for line in lines[:template.max_lines]:
+        draw.text((template.text_x, y), _fit_text(line, template.body_font, template.text_width), fill=0, font=template.body_font)
+        y += int(template.body_font.size * 1.3)
+
+    buffer = io.BytesIO()
+    # Intermediate image (cached, then placed on a PDF page): fast compression over size
+    label.save(buffer, "PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def _render_label_chunk(specs: List[LabelSpec], layout_name: str) -> List[bytes]:
+    return [render_label(spec, layout_name) for spec in specs]
+
+
+class LabelCache:
+    """Thread-safe LRU of rendered images, bounded by entry count and total bytes"""
+
+    def __init__(self, max_entries: int = CACHE_ENTRIES, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: CacheKey) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: CacheKey, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = data
+            self._bytes += len(data)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class LabelRenderer:
+    """Cached QR rendering with a lazily started process pool"""
+
+    def __init__(self, workers: int = LABEL_WORKERS, inline_limit: int = INLINE_RENDER_LIMIT):
+        self.workers = workers
+        self.inline_limit = inline_limit
+        self.cache = LabelCache()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: forking a threaded server process can deadlock the child
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+                print(f"[Labels] Started {self.workers} render worker(s)")
+            return self._pool
+
+    def _render_misses(self, chunk_function: Callable, items: list, *args) -> List[bytes]:
+        if self.workers < 1 or len(items) <= self.inline_limit:
+            return chunk_function(items, *args)
+
+        # A few chunks per worker: balances the load without a round trip per item
+        chunk_size = max(1, math.ceil(len(items) / (self.workers * 4)))
+        chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+        try:
+            results = self._get_pool().map(chunk_function, chunks, *(repeat(arg) for arg in args))
+            return [data for chunk in results for data in chunk]
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a new pool next time
+            print("[Labels] Render pool broken, rendering inline")
+            with self._pool_lock:
+                self._pool = None
+            return chunk_function(items, *args)
+
+    def _render_cached(self, items: Sequence[Hashable], cache_key: Callable[[Hashable], CacheKey],
+                       chunk_function: Callable, *args) -> Tuple[List[bytes], int]:
+        results: Dict[Hashable, bytes] = {}
+        missing = []
+        for item in dict.fromkeys(items):
+            data = self.cache.get(cache_key(item))
+            if data is None:
+                missing.append(item)
+            else:
+                results[item] = data
+        cached = len(results)
+
+        if missing:
+            for item, data in zip(missing, self._render_misses(chunk_function, missing, *args)):
+                self.cache.put(cache_key(item), data)
+                results[item] = data
+
+        return [results[item] for item in items], cached
+
+    def render(self, codes: Sequence[str], size: int, image_format: str) -> Tuple[List[bytes], int]:
+        """
+        Images for codes (same order, duplicates allowed).
+        Returns (images, number served from the cache).
+        """
+        if image_format not in FORMATS:
+            raise ValueError(f"Unsupported label format: {image_format}")
+        return self._render_cached(
+            codes, lambda code: (code, size, image_format), _render_chunk, size, image_format
+        )
+
+    def render_labels(self, specs: Sequence[LabelSpec], layout_name: str) -> Tuple[List[bytes], int]:
+        """
+        PNG labels for specs in a LABEL_LAYOUTS layout (same order).
+        Returns (labels, number served from the cache).
+        """
+        if layout_name not in LABEL_LAYOUTS:
+            raise ValueError(f"Unknown label layout: {layout_name}")
+        return self._render_cached(
+            specs, lambda spec: (spec, layout_name, "label"), _render_label_chunk, layout_name
+        )
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+def _caption(code: str) -> str:
+    return code if len(code) <= CAPTION_MAX_CHARS else code[:CAPTION_MAX_CHARS - 1] + "…"
+
+
+def build_pdf(codes: Sequence[str], png_images: Sequence[bytes], size: int) -> bytes:
+    """One page per label: the QR code with its code printed below"""
+    font = ImageFont.load_default(size=max(12, size // 12))
+    caption_height = int(font.size * 1.6)
+    pages = []
+    for code, data in zip(codes, png_images):
+        qr_image = Image.open(io.BytesIO(data))
+        # Bilevel pages: ~10x smaller PDFs than greyscale, and what label printers print anyway
+        page = Image.new("1", (qr_image.width, qr_image.height + caption_height), 1)
+        page.paste(qr_image, (0, 0))
+        draw = ImageDraw.Draw(page)
+        draw.text((page.width // 2, qr_image.height + caption_height // 2), _caption(code), fill=0, font=font, anchor="mm")
+        pages.append(page)
+
+    buffer = io.BytesIO()
+    pages[0].save(buffer, "PDF", save_all=True, append_images=pages[1:], resolution=PDF_DPI)
+    return buffer.getvalue()
+
+
+def _file_names(codes: Sequence[str], extension: str) -> List[str]:
+    names = []
+    used = set()
+    for code in codes:
+        base = re.sub(r"[^A-Za-z0-9._-]", "_", code)[:100] or "label"
+        name = f"{base}.{extension}"
+        counter = 1
+        while name in used:
+            counter += 1
+            name = f"{base}-{counter}.{extension}"
+        used.add(name)
+        names.append(name)
+    return names
+
+
+def build_zip(codes: Sequence[str], images: Sequence[bytes], image_format: str) -> bytes:
+    """
+    One file per code. PNG batches also get sprite.png (all codes on one
+    sheet, row by row) and sprite.json with each code's position.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        # PNGs are already compressed
+        compression = zipfile.ZIP_STORED if image_format == "png" else zipfile.ZIP_DEFLATED
+        for name, data in zip(_file_names(codes, image_format), images):
+            archive.writestr(name, data, compress_type=compression)
+
+        if image_format == "png":
+            sprite, index = _sprite_sheet(codes, images)
+            archive.writestr("sprite.png", sprite, compress_type=zipfile.ZIP_STORED)
+            archive.writestr("sprite.json", json.dumps(index, indent=2), compress_type=zipfile.ZIP_DEFLATED)
+    return buffer.getvalue()
+
+
+def _sprite_sheet(codes: Sequence[str], png_images: Sequence[bytes]) -> Tuple[bytes, List[dict]]:
+    decoded = [Image.open(io.BytesIO(data)) for data in png_images]
+    cell = max(max(image.width, image.height) for image in decoded)
+    columns = math.ceil(math.sqrt(len(decoded)))
+    rows = math.ceil(len(decoded) / columns)
+
+    sheet = Image.new("1", (columns * cell, rows * cell), 1)
+    index = []
+    for position, (code, image) in enumerate(zip(codes, decoded)):
+        x, y = (position % columns) * cell, (position // columns) * cell
+        sheet.paste(image, (x, y))
+        index.append({"code": code, "x": x, "y": y, "width": image.width, "height": image.height})
+
+    buffer = io.BytesIO()
+    sheet.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue(), index
+
+
+def build_sheet_pdf(label_images: Sequence[bytes], layout_name: str) -> bytes:
+    """Place rendered labels on pages of the layout, left to right, top to bottom"""
+    layout = LABEL_LAYOUTS[layout_name]
+    page_size = layout.page_px
+    label_width, label_height = layout.label_px
+    # Spread the leftover pixels of the integer grid evenly around it
+    left = (page_size[0] - label_width * layout.columns) // 2
+    top = (page_size[1] - label_height * layout.rows) // 2
+    per_page = layout.columns * layout.rows
+
+    pages = []
+    for start in range(0, len(label_images), per_page):
+        page = Image.new("1", page_size, 1)
+        for position, data in enumerate(label_images[start:start + per_page]):
+            column, row = position % layout.columns, position // layout.columns
+            page.paste(Image.open(io.BytesIO(data)), (left + column * label_width, top + row * label_height))
+        pages.append(page)
+
+    buffer = io.BytesIO()
+    pages[0].save(buffer, "PDF", save_all=True, append_images=pages[1:], resolution=layout.dpi)
+    return buffer.getvalue()
+
+
+# Singleton instance
+label_renderer = LabelRenderer()
@@ -5,7 +5,13 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
 from app.database import engine, Base
 # Import routes
-from app.api import auth, users, categories, item_types, plants, stores, boxes, item_batches, items, notifications
+from app.api import auth, users, categories, item_types, plants, stores, boxes, item_batches, items, notifications, search, scan, issuances, reservations, jobs, labels
+from app.jobs import job_runner
+from app.email_outbox import email_sender
+from app.labels import label_renderer
+from app.uploads import UPLOADS_DIR, OriginMatcher, serve_upload
+from app.compression import CompressionMiddleware
+import app.tasks  # noqa: F401 - registers background jobs
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -44,6 +50,9 @@ app.add_middleware(
     expose_headers=["*"],  # Expose all headers including CORS headers
 )
 
+# Brotli / gzip for responses above COMPRESSION_MIN_SIZE bytes (app/compression.py)
+app.add_middleware(CompressionMiddleware)
+
 # Global exception handler to ensure CORS headers are always sent
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -78,129 +87,20 @@ except Exception as e:
     import traceback
     traceback.print_exc()
 
-# Mount static files for uploads
-uploads_dir = Path(__file__).parent.parent / "uploads"
-uploads_dir.mkdir(exist_ok=True)
-
-# Custom static file handler with CORS
-from fastapi.responses import FileResponse
+# Serve uploads with CORS, ETag/304 and Range support (app/uploads.py)
+UPLOADS_DIR.mkdir(exist_ok=True)
+upload_origins = OriginMatcher(cors_origins)
 
-@app.get("/uploads/{file_path:path}")
+@app.api_route("/uploads/{file_path:path}", methods=["GET", "HEAD"])
 async def serve_uploaded_file(file_path: str, request: Request):
-    """Serve uploaded files with CORS headers"""
-    # Decode URL-encoded file path
-    from urllib.parse import unquote
-    file_path = unquote(file_path)
-    
-    file_full_path = uploads_dir / file_path
-    
-    # Security check - ensure file is within uploads directory
-    try:
-        file_full_path.resolve().relative_to(uploads_dir.resolve())
-    except ValueError:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    if not file_full_path.exists():
-        raise HTTPException(status_code=404, detail="File not found")
-    
-    # Get origin from request (check both 'origin' and 'referer' headers)
-    origin = request.headers.get("origin")
-    referer = request.headers.get("referer")
-    
-    # Debug logging
-    print(f"[Upload Handler] Request for: {file_path}")
-    print(f"[Upload Handler] Origin header: {origin}")
-    print(f"[Upload Handler] Referer header: {referer}")
-    
-    if not origin:
-        # Try to extract from referer if origin not present
-        if referer:
-            try:
-                from urllib.parse import urlparse
-                parsed = urlparse(referer)
-                origin = f"{parsed.scheme}://{parsed.netloc}"
-                print(f"[Upload Handler] Extracted origin from referer: {origin}")
-            except Exception as e:
-                print(f"[Upload Handler] Error extracting origin from referer: {e}")
-    
-    # Prepare response headers - ALWAYS include CORS headers
-    # Check if origin matches any allowed origin (case-insensitive, with/without www)
-    allowed_origin = None
-    if origin:
-        # Check exact match first
-        if origin in cors_origins:
-            allowed_origin = origin
-            print(f"[Upload Handler] Origin matched exactly: {origin}")
-        else:
-            # Check variations (with/without www, http/https)
-            origin_lower = origin.lower()
-            for allowed in cors_origins:
-                allowed_lower = allowed.lower()
-                # Match exact, or match with/without www
-                if (origin_lower == allowed_lower or 
-                    origin_lower.replace('www.', '') == allowed_lower.replace('www.', '') or
-                    origin_lower == allowed_lower.replace('www.', '') or
-                    origin_lower.replace('www.', '') == allowed_lower):
-                    allowed_origin = origin
-                    print(f"[Upload Handler] Origin matched variation: {origin} (allowed: {allowed})")
-                    break
-    
-    # If no match found, default to main frontend domain
-    if not allowed_origin:
-        allowed_origin = "https://jabilinventory.store"
-        print(f"[Upload Handler] No origin match, using default: {allowed_origin}")
-    
-    # ALWAYS set CORS headers - critical for images to load
-    headers = {
-        "Access-Control-Allow-Origin": allowed_origin,
-        "Access-Control-Allow-Credentials": "true",
-        "Access-Control-Allow-Methods": "GET, OPTIONS, HEAD",
-        "Access-Control-Allow-Headers": "*",
-        "Vary": "Origin"  # Important for CORS caching
-    }
-    
-    print(f"[Upload Handler] Setting CORS headers: {headers}")
-    
-    return FileResponse(
-        path=str(file_full_path),
-        headers=headers
-    )
+    """Serve uploaded files with CORS and cache validation headers"""
+    return serve_upload(file_path, request, upload_origins)
 
 @app.options("/uploads/{file_path:path}")
 async def options_uploaded_file(file_path: str, request: Request):
     """Handle OPTIONS request for CORS preflight"""
-    origin = request.headers.get("origin")
-    
-    # Check if origin matches any allowed origin
-    allowed_origin = None
-    if origin:
-        if origin in cors_origins:
-            allowed_origin = origin
-        else:
-            # Check variations (with/without www, http/https)
-            origin_lower = origin.lower()
-            for allowed in cors_origins:
-                allowed_lower = allowed.lower()
-                if (origin_lower == allowed_lower or 
-                    origin_lower.replace('www.', '') == allowed_lower.replace('www.', '') or
-                    origin_lower == allowed_lower.replace('www.', '') or
-                    origin_lower.replace('www.', '') == allowed_lower):
-                    allowed_origin = origin
-                    break
-    
-    # If no match found, default to main frontend domain
-    if not allowed_origin:
-        allowed_origin = "https://jabilinventory.store"
-    
-    # ALWAYS set CORS headers
-    headers = {
-        "Access-Control-Allow-Origin": allowed_origin,
-        "Access-Control-Allow-Credentials": "true",
-        "Access-Control-Allow-Methods": "GET, OPTIONS, HEAD",
-        "Access-Control-Allow-Headers": "*",
-        "Access-Control-Max-Age": "3600",
-        "Vary": "Origin"
-    }
+    headers = upload_origins.headers(request)
+    headers["Access-Control-Max-Age"] = "3600"
     return JSONResponse(content={}, headers=headers)
 
 # Include routers
@@ -214,13 +114,34 @@ app.include_router(boxes.router)
 app.include_router(item_batches.router)
 app.include_router(items.router)
 app.include_router(notifications.router, prefix="/api/notifications", tags=["notifications"])
+app.include_router(search.router)
+app.include_router(scan.router)
+app.include_router(issuances.router)
+app.include_router(reservations.router)
+app.include_router(jobs.router)
+app.include_router(labels.router)
+
+@app.on_event("startup")
+def start_background_workers():
+    # Periodic alerts, reservation expiry and cleanup (app.tasks)
+    if os.getenv("DISABLE_JOB_RUNNER", "").lower() not in ("1", "true", "yes"):
+        job_runner.start()
+    # Outgoing emails (app.email_outbox)
+    if os.getenv("DISABLE_EMAIL_SENDER", "").lower() not in ("1", "true", "yes"):
+        email_sender.start()
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    job_runner.stop()
+    email_sender.stop()
+    label_renderer.shutdown()
 
 @app.get("/")
 def read_root():
     return {
         "message": "HR Store Inventory API",
         "version": "2.0.0",
-        "modules": ["auth", "users", "categories", "item_types", "plants", "stores", "boxes", "item_batches", "items", "notifications"],
+        "modules": ["auth", "users", "categories", "item_types", "plants", "stores", "boxes", "item_batches", "items", "notifications", "search", "scan", "issuances", "reservations", "jobs"],
         "docs": "/docs"
     }
 
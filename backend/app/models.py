@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, JSON, Boolean, Enum, TIMESTAMP, ForeignKey, Numeric, Date, Computed
+from sqlalchemy import Column, Integer, String, Text, JSON, Boolean, Enum, TIMESTAMP, ForeignKey, Numeric, Date, Computed, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.json_types import StringListJSON, stock_levels
 import enum
 
 class UserRole(str, enum.Enum):
@@ -37,12 +38,27 @@ class User(Base):
     email = Column(String(100), unique=True)
     full_name = Column(String(100))
     password_hash = Column(String(255), nullable=False)
-    profile_photo = Column(String(500), nullable=True)  # URL or path to profile photo
+    profile_photo = Column(String(500), nullable=True, index=True)  # URL or path to profile photo
     role = Column(Enum(UserRole), default=UserRole.worker)
     status = Column(Enum(Status), default=Status.active)
     created_at = Column(TIMESTAMP, server_default=func.now())
     last_login = Column(TIMESTAMP, nullable=True)
 
+# UploadBlob model (content-addressed upload store, see app.upload_store)
+# One row per stored image set (original + variants) named after its SHA-256;
+# a blob is referenced while a User.profile_photo points at its url, and
+# unreferenced blobs are deleted by the upload GC job after a grace period.
+class UploadBlob(Base):
+    __tablename__ = "upload_blobs"
+    
+    digest = Column(String(64), primary_key=True)  # SHA-256 of the uploaded bytes
+    kind = Column(String(20), nullable=False, default="profile_photo")
+    url = Column(String(500), nullable=False, unique=True)  # Value stored in User.profile_photo
+    size_bytes = Column(Integer, nullable=False, default=0)  # All files of the blob
+    file_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    last_used_at = Column(TIMESTAMP, server_default=func.now(), index=True)  # Last upload of this content
+
 # Notification model
 class Notification(Base):
     __tablename__ = "notifications"
@@ -58,9 +74,48 @@ class Notification(Base):
     created_at = Column(TIMESTAMP, server_default=func.now(), index=True)
     read_at = Column(TIMESTAMP, nullable=True)
     
+    __table_args__ = (
+        # Unread counts per audience (one user, or NULL = all users) without touching the rows
+        Index('ix_notifications_user_status', 'user_id', 'status', 'notification_id'),
+    )
+    
     # Relationship
     user = relationship("User", foreign_keys=[user_id])
 
+# NotificationReceipt model (per-user read state)
+# A row means the user has read the notification. Notification.status stays
+# 'unread' until the notification itself is closed for everyone (e.g. a
+# resolved stock alert), so a global notification read by one user stays
+# unread for the others.
+class NotificationReceipt(Base):
+    __tablename__ = "notification_receipts"
+    
+    user_id = Column(Integer, ForeignKey('users.user_id', ondelete='CASCADE'), primary_key=True)
+    notification_id = Column(Integer, ForeignKey('notifications.notification_id', ondelete='CASCADE'), primary_key=True)
+    read_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
+    
+    __table_args__ = (
+        # Reverse lookup when a notification is deleted
+        Index('ix_notification_receipts_notification', 'notification_id'),
+    )
+
+# NotificationArchive model (notifications moved out by the retention job)
+# Same columns as notifications; only written when NOTIFICATION_RETENTION_MODE=archive
+class NotificationArchive(Base):
+    __tablename__ = "notifications_archive"
+    
+    notification_id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=True, index=True)
+    type = Column(Enum(NotificationType), nullable=False)
+    title = Column(String(200), nullable=False)
+    message = Column(Text, nullable=False)
+    status = Column(Enum(NotificationStatus), default=NotificationStatus.unread)
+    link = Column(String(500), nullable=True)
+    notification_data = Column(JSON, nullable=True)
+    created_at = Column(TIMESTAMP, nullable=True, index=True)
+    read_at = Column(TIMESTAMP, nullable=True)
+    archived_at = Column(TIMESTAMP, server_default=func.now())
+
 # Category model
 class Category(Base):
     __tablename__ = "categories"
@@ -89,14 +144,13 @@ class ItemType(Base):
     type_name = Column(String(100), nullable=False)
     description = Column(Text)
     has_size = Column(Boolean, default=True)
-    available_sizes = Column(JSON)  # ["S","M","L","XL"]
+    available_sizes = Column(StringListJSON)  # ["S","M","L","XL"]
     has_color = Column(Boolean, default=False)
-    available_colors = Column(JSON)  # ["Red","Blue","Black"]
+    available_colors = Column(StringListJSON)  # ["Red","Blue","Black"]
     status = Column(Enum(Status), default=Status.active)
     display_order = Column(Integer, default=0)
     min_stock_level = Column(Integer, default=50, comment='Default minimum stock level per store for this item type')
     max_stock_level = Column(Integer, default=1000, comment='Default maximum stock level per store for this item type')
-    size_stock_levels = Column(JSON, comment='Stock levels per size: {"S": {"min": 50, "max": 1000}, "M": {"min": 30, "max": 1000}}')
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
     created_by = Column(String(100))
@@ -104,6 +158,42 @@ class ItemType(Base):
     
     # Relationship
     category = relationship("Category", back_populates="types")
+    size_thresholds = relationship("TypeSizeThreshold", cascade="all, delete-orphan")
+
+    @property
+    def size_stock_levels(self):
+        """Stock levels per size: {"S": {"min": 50, "max": 1000}}, None when there are none"""
+        return {
+            threshold.size: {"min": threshold.min_level, "max": threshold.max_level}
+            for threshold in self.size_thresholds
+        } or None
+
+    @size_stock_levels.setter
+    def size_stock_levels(self, levels):
+        """Replace the per-size thresholds (rows are updated in place, not re-created)"""
+        levels = stock_levels(levels) or {}
+        current = {threshold.size: threshold for threshold in self.size_thresholds}
+        for size, threshold in current.items():
+            if size not in levels:
+                self.size_thresholds.remove(threshold)
+        for size, level in levels.items():
+            threshold = current.get(size)
+            if threshold is None:
+                self.size_thresholds.append(TypeSizeThreshold(size=size, min_level=level["min"], max_level=level["max"]))
+            else:
+                threshold.min_level = level["min"]
+                threshold.max_level = level["max"]
+
+# TypeSizeThreshold model (min/max stock level of one size of an item type)
+# Overrides ItemType.min_stock_level / max_stock_level; see app.stock.with_stock_thresholds
+class TypeSizeThreshold(Base):
+    __tablename__ = "type_size_thresholds"
+    
+    type_id = Column(Integer, ForeignKey('item_types.type_id', ondelete='CASCADE'), primary_key=True)
+    size = Column(String(20), primary_key=True)
+    min_level = Column(Integer, nullable=False)
+    max_level = Column(Integer, nullable=False)
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
 # Plant model
 class Plant(Base):
@@ -237,8 +327,8 @@ class Item(Base):
     size = Column(String(20), nullable=True)
     color = Column(String(50), nullable=True)
     unit_type = Column(String(20), nullable=True, default='pcs')
-    qr_code = Column(String(100), nullable=True)
-    barcode = Column(String(100), nullable=True)
+    qr_code = Column(String(100), nullable=True, index=True)
+    barcode = Column(String(100), nullable=True, index=True)
     min_level = Column(Integer, default=10, comment='Minimum stock level per store')
     max_level = Column(Integer, default=1000, comment='Maximum stock level per store')
     min_stock = Column(Integer, default=50, comment='Minimum stock level')
@@ -283,6 +373,10 @@ class Inventory(Base):
 # StockTransaction model
 class StockTransaction(Base):
     __tablename__ = "stock_transactions"
+    __table_args__ = (
+        # Lines of one document (box check-in, issuance) share reference_type + reference_number
+        Index('ix_stock_transactions_reference', 'reference_type', 'reference_number'),
+    )
     
     transaction_id = Column(Integer, primary_key=True, autoincrement=True)
     item_id = Column(Integer, ForeignKey('items.item_id', ondelete='CASCADE'), nullable=False, index=True)
@@ -310,3 +404,174 @@ class StockTransaction(Base):
     from_store = relationship("Store", foreign_keys=[from_store_id])
     to_store = relationship("Store", foreign_keys=[to_store_id])
     box = relationship("Box", foreign_keys=[box_id])
+
+# ScanSession model (offline scan batches synced from the /scan page)
+class ScanSession(Base):
+    __tablename__ = "scan_sessions"
+    
+    session_id = Column(Integer, primary_key=True, autoincrement=True)
+    client_session_id = Column(String(100), nullable=True, index=True)  # Generated by the client
+    device_id = Column(String(100), nullable=True)
+    store_id = Column(Integer, ForeignKey('stores.store_id', ondelete='SET NULL'), nullable=True)
+    event_count = Column(Integer, nullable=False, default=0)
+    applied_count = Column(Integer, nullable=False, default=0)
+    duplicate_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+    created_by = Column(String(100))
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+# ScanEvent model (one queued scan; idempotency_key makes re-syncs safe)
+class ScanEvent(Base):
+    __tablename__ = "scan_events"
+    
+    event_id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(Integer, ForeignKey('scan_sessions.session_id', ondelete='CASCADE'), nullable=False, index=True)
+    idempotency_key = Column(String(100), unique=True, nullable=False, index=True)
+    event_type = Column(String(50), nullable=False)  # checkin, stock_out, transfer
+    code = Column(String(100), nullable=False)
+    entity_type = Column(String(20), nullable=True)  # item, box
+    entity_id = Column(Integer, nullable=True)
+    quantity = Column(Integer, nullable=True)
+    from_store_id = Column(Integer, nullable=True)
+    to_store_id = Column(Integer, nullable=True)
+    status = Column(String(20), nullable=False, index=True)  # applied, failed
+    message = Column(String(500), nullable=True)
+    transaction_ids = Column(JSON, nullable=True)  # StockTransaction IDs created by this event
+    scanned_at = Column(TIMESTAMP, nullable=True)  # Device time of the scan
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    session = relationship("ScanSession", foreign_keys=[session_id])
+
+# IdempotencyKey model (cached responses for retried write requests)
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint('scope', 'created_by', 'idempotency_key', name='uq_idempotency_keys_scope_user_key'),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    scope = Column(String(100), nullable=False)  # Endpoint the key belongs to, e.g. "stock_transactions"
+    idempotency_key = Column(String(100), nullable=False)  # Idempotency-Key request header
+    request_hash = Column(String(64), nullable=False)  # SHA-256 of the request body
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(JSON, nullable=False)
+    created_by = Column(String(100), nullable=False)  # Keys are per user
+    created_at = Column(TIMESTAMP, server_default=func.now(), index=True)
+
+# Issuance model (multi-line stock-out document, e.g. uniforms for a new-hire group)
+# Lines are StockTransactions with reference_type='ISSUANCE' and reference_number=issuance_number
+class Issuance(Base):
+    __tablename__ = "issuances"
+    
+    issuance_id = Column(Integer, primary_key=True, autoincrement=True)
+    issuance_number = Column(String(50), unique=True, nullable=False, index=True)  # ISS-YYYY-NNNN
+    store_id = Column(Integer, ForeignKey('stores.store_id', ondelete='SET NULL'), nullable=True, index=True)  # Default store for lines
+    employee_name = Column(String(100), nullable=True)
+    employee_id = Column(String(50), nullable=True, index=True)
+    department = Column(String(100), nullable=True)
+    reference_number = Column(String(100), nullable=True)  # External reference (HR request, PO, ...)
+    reason = Column(Text, nullable=True)
+    notes = Column(Text, nullable=True)
+    line_count = Column(Integer, nullable=False, default=0)
+    total_quantity = Column(Integer, nullable=False, default=0)
+    created_by = Column(String(100))
+    created_at = Column(TIMESTAMP, server_default=func.now(), index=True)
+    
+    # Relationships
+    store = relationship("Store", foreign_keys=[store_id])
+
+# Reservation model (stock held for an item in a store until confirmed, released or expired)
+# The held quantity is added to Inventory.reserved_quantity of the rows listed in allocations
+class Reservation(Base):
+    __tablename__ = "reservations"
+    __table_args__ = (
+        # Active holds per item/store, and the expiry sweep (oldest active first)
+        Index('ix_reservations_item_store_status', 'item_id', 'store_id', 'status'),
+        Index('ix_reservations_status_expires', 'status', 'expires_at'),
+    )
+    
+    reservation_id = Column(Integer, primary_key=True, autoincrement=True)
+    item_id = Column(Integer, ForeignKey('items.item_id', ondelete='CASCADE'), nullable=False)
+    store_id = Column(Integer, ForeignKey('stores.store_id', ondelete='CASCADE'), nullable=False)
+    box_id = Column(Integer, ForeignKey('boxes.box_id', ondelete='SET NULL'), nullable=True)  # Preferred box
+    quantity = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False, default='active')  # active, confirmed, released, expired
+    allocations = Column(JSON, nullable=True)  # [{"inventory_id", "box_id", "box_reference", "quantity"}]
+    expires_at = Column(TIMESTAMP, nullable=False)
+    reference_number = Column(String(100), nullable=True, index=True)  # Event / request reference
+    employee_name = Column(String(100), nullable=True)
+    employee_id = Column(String(50), nullable=True, index=True)
+    department = Column(String(100), nullable=True)
+    notes = Column(Text, nullable=True)
+    transaction_id = Column(Integer, ForeignKey('stock_transactions.transaction_id', ondelete='SET NULL'), nullable=True)  # stock_out on confirm
+    created_by = Column(String(100))
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    closed_at = Column(TIMESTAMP, nullable=True)  # Confirmed, released or expired
+    closed_by = Column(String(100), nullable=True)
+    
+    # Relationships
+    item = relationship("Item", foreign_keys=[item_id])
+    store = relationship("Store", foreign_keys=[store_id])
+
+# Job model (background work run by app.jobs.JobRunner: alerts, emails, cleanup)
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Runner polls for due queued jobs; status pages list runs per job name
+        Index('ix_jobs_status_run_after', 'status', 'run_after'),
+        Index('ix_jobs_name_created', 'job_name', 'created_at'),
+    )
+    
+    job_id = Column(Integer, primary_key=True, autoincrement=True)
+    job_name = Column(String(100), nullable=False)  # Registered handler, e.g. "generate_stock_alerts"
+    status = Column(String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    payload = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(TIMESTAMP, nullable=False, server_default=func.now())  # Not picked up before this
+    started_at = Column(TIMESTAMP, nullable=True)
+    finished_at = Column(TIMESTAMP, nullable=True)
+    duration_ms = Column(Integer, nullable=True)  # Execution time of the last attempt
+    created_by = Column(String(100), nullable=True)  # "scheduler" for periodic runs
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+# EmailOutbox model (queued emails, delivered by app.email_outbox.email_sender)
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    
+    email_id = Column(Integer, primary_key=True, autoincrement=True)
+    to_email = Column(String(255), nullable=False)
+    template = Column(String(50), nullable=False)  # app/email_templates/<template>.txt/.html
+    context = Column(JSON, nullable=True)  # Template variables; cleared once finished if sensitive
+    sensitive = Column(Boolean, default=False)  # Context contains secrets (e.g. a temporary password)
+    status = Column(String(20), nullable=False, default="queued")  # queued, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    next_attempt_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
+    claim_token = Column(String(36), nullable=True)  # Sender batch that owns the row while 'sending'
+    claimed_at = Column(TIMESTAMP, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_by = Column(String(100))
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    sent_at = Column(TIMESTAMP, nullable=True)
+    
+    __table_args__ = (
+        # Sender polls for due queued messages
+        Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+# StockAlertState model (current low/out-of-stock state per item and store)
+# Only pairs that are not 'ok' have a row; updated by app.alerts.update_stock_alerts on every stock movement
+class StockAlertState(Base):
+    __tablename__ = "stock_alert_states"
+    
+    item_id = Column(Integer, ForeignKey('items.item_id', ondelete='CASCADE'), primary_key=True)
+    store_id = Column(Integer, ForeignKey('stores.store_id', ondelete='CASCADE'), primary_key=True)
+    state = Column(String(10), nullable=False)  # low, out
+    quantity = Column(Integer, nullable=False, default=0)  # Total quantity when the state was entered
+    notification_id = Column(Integer, ForeignKey('notifications.notification_id', ondelete='SET NULL'), nullable=True)  # Open alert
+    changed_at = Column(TIMESTAMP, server_default=func.now())
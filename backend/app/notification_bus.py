@@ -0,0 +1,139 @@
+"""
+In-process pub/sub for pushing notification changes to connected clients.
+
+GET /api/notifications/stream (Server-Sent Events) subscribes one queue per
+open tab. Committed notification inserts/updates/deletes and read receipts
+are published through app.change_hooks; bulk statements (mark all read,
+resolved stock alerts) publish explicitly.
+
+Publishing is thread-safe: sync endpoints and the job runner publish from
+worker threads, and each message is handed to the subscriber's event loop
+with call_soon_threadsafe.
+
+Only clients connected to the same process receive events; with several
+API workers each worker fans out its own commits, and clients fall back to
+(infrequent) polling.
+"""
+import asyncio
+import json
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from app import change_hooks
+from app.models import Notification, NotificationReceipt
+
+# Messages buffered per connection before it is considered too slow
+QUEUE_SIZE = 100
+
+
+def format_event(event: str, data: dict) -> str:
+    """One Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str, separators=(',', ':'))}\n\n"
+
+
+class Subscriber:
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def _put(self, message: str):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow client: drop the backlog and ask it to reload instead
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(format_event("unread_changed", {"reason": "overflow"}))
+
+    def send(self, message: str):
+        self.loop.call_soon_threadsafe(self._put, message)
+
+
+class NotificationBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+
+    def subscribe(self, user_id: int) -> Subscriber:
+        """Register a connection (must be called from its event loop)"""
+        subscriber = Subscriber(user_id)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[subscriber.user_id]
+
+    def publish(self, event: str, data: dict, user_id: Optional[int] = None):
+        """Send an event to one user's connections, or to everyone if user_id is None"""
+        with self._lock:
+            if user_id is None:
+                targets = [s for subscribers in self._subscribers.values() for s in subscribers]
+            else:
+                targets = list(self._subscribers.get(user_id, ()))
+        if not targets:
+            return
+
+        message = format_event(event, data)
+        for subscriber in targets:
+            try:
+                subscriber.send(message)
+            except RuntimeError:
+                # Event loop already closed (server shutting down)
+                self.unsubscribe(subscriber)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._subscribers),
+                "connections": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            }
+
+
+def _snapshot(obj) -> Optional[dict]:
+    if isinstance(obj, NotificationReceipt):
+        return {"receipt": True, "notification_id": obj.notification_id, "user_id": obj.user_id}
+    if not isinstance(obj, Notification):
+        return None
+    return {
+        "notification_id": obj.notification_id,
+        "user_id": obj.user_id,
+        "type": obj.type.value if hasattr(obj.type, "value") else obj.type,
+        "title": obj.title,
+        "message": obj.message,
+        "status": obj.status.value if hasattr(obj.status, "value") else obj.status,
+        "link": obj.link,
+        "metadata": obj.notification_data,
+        # Server default - not loaded after the INSERT, avoid a query inside the flush
+        "created_at": obj.__dict__.get("created_at") or datetime.now(),
+        "read_at": obj.read_at,
+    }
+
+
+def _publish_changes(changes: List[Tuple[str, dict]]):
+    for action, data in changes:
+        if data is None:
+            continue
+        if data.get("receipt"):
+            # Read by one user - only their own tabs change
+            if action != "delete":
+                notification_bus.publish("notification_read", {"notification_id": data["notification_id"]}, data["user_id"])
+        elif action == "delete":
+            notification_bus.publish("notification_deleted", {"notification_id": data["notification_id"]}, data["user_id"])
+        elif data["status"] == "unread":
+            notification_bus.publish("notification", data, data["user_id"])
+        else:
+            notification_bus.publish("notification_read", {"notification_id": data["notification_id"]}, data["user_id"])
+
+
+# Singleton instance
+notification_bus = NotificationBus()
+
+change_hooks.watch([Notification, NotificationReceipt], _snapshot, _publish_changes)
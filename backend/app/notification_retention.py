@@ -0,0 +1,140 @@
+"""
+Notification retention: prune notifications older than a per-type TTL.
+
+Runs as the periodic "purge_notifications" background job (app.tasks), or on
+demand through POST /api/notifications/retention/run. Old rows are removed in
+small batches, one commit each, so no run holds locks on notifications for
+long; depending on NOTIFICATION_RETENTION_MODE they are deleted or first
+copied to notifications_archive.
+
+TTL per type defaults to RETENTION_DAYS and can be overridden with
+NOTIFICATION_RETENTION_<TYPE>_DAYS (0 keeps that type forever). Open stock
+alerts (still referenced by stock_alert_states) are never pruned.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, exists, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Notification, NotificationArchive, NotificationReceipt, NotificationType, StockAlertState
+)
+
+RETENTION_DAYS = {
+    NotificationType.low_stock: 30,
+    NotificationType.out_of_stock: 30,
+    NotificationType.pending_checkin: 7,
+    NotificationType.transaction: 30,
+    NotificationType.system: 90,
+    NotificationType.info: 90,
+    NotificationType.warning: 90,
+    NotificationType.error: 90,
+}
+
+RETENTION_MODE = os.getenv("NOTIFICATION_RETENTION_MODE", "delete")  # delete | archive
+RETENTION_BATCH_SIZE = int(os.getenv("NOTIFICATION_RETENTION_BATCH_SIZE", "1000"))
+
+ARCHIVED_COLUMNS = [
+    "notification_id", "user_id", "type", "title", "message", "status",
+    "link", "notification_data", "created_at", "read_at",
+]
+
+
+def retention_policy() -> Dict[NotificationType, Optional[int]]:
+    """TTL in days per type (None = kept forever)"""
+    policy = {}
+    for notification_type, default_days in RETENTION_DAYS.items():
+        days = int(os.getenv(f"NOTIFICATION_RETENTION_{notification_type.name.upper()}_DAYS", default_days))
+        policy[notification_type] = days if days > 0 else None
+    return policy
+
+
+def _expired(notification_type: NotificationType, cutoff: datetime):
+    return [
+        Notification.type == notification_type,
+        Notification.created_at < cutoff,
+        # Open stock alerts are resolved through their state row, keep them
+        ~exists().where(StockAlertState.notification_id == Notification.notification_id),
+    ]
+
+
+def eligible_counts(db: Session) -> Dict[str, int]:
+    """Rows each type would lose on the next run (nothing is changed)"""
+    now = datetime.now()
+    counts = {}
+    for notification_type, days in retention_policy().items():
+        if days is None:
+            continue
+        counts[notification_type.value] = db.query(func.count(Notification.notification_id)).filter(
+            *_expired(notification_type, now - timedelta(days=days))
+        ).scalar()
+    return counts
+
+
+def purge_notifications(db: Session, mode: str = RETENTION_MODE, batch_size: int = RETENTION_BATCH_SIZE) -> dict:
+    """
+    Delete (or archive, then delete) expired notifications batch by batch,
+    committing after each batch. Returns rows removed per type, receipts
+    removed, batches and the time taken.
+    """
+    if mode not in ("delete", "archive"):
+        raise ValueError(f"Unknown notification retention mode: {mode}")
+
+    started = time.perf_counter()
+    now = datetime.now()
+    removed: Dict[str, int] = {}
+    receipts_removed = 0
+    batches = 0
+
+    for notification_type, days in retention_policy().items():
+        if days is None:
+            continue
+        cutoff = now - timedelta(days=days)
+        while True:
+            # Oldest first by primary key: each batch is a short range lock
+            ids: List[int] = [
+                notification_id for (notification_id,) in db.query(Notification.notification_id).filter(
+                    *_expired(notification_type, cutoff)
+                ).order_by(Notification.notification_id.asc()).limit(batch_size)
+            ]
+            if not ids:
+                break
+
+            if mode == "archive":
+                db.execute(
+                    insert(NotificationArchive).from_select(
+                        ARCHIVED_COLUMNS + ["archived_at"],
+                        select(
+                            *[getattr(Notification, column) for column in ARCHIVED_COLUMNS],
+                            literal(now)
+                        ).where(Notification.notification_id.in_(ids))
+                    )
+                )
+            receipts_removed += db.execute(
+                delete(NotificationReceipt).where(NotificationReceipt.notification_id.in_(ids))
+            ).rowcount
+            deleted = db.execute(
+                delete(Notification).where(Notification.notification_id.in_(ids))
+            ).rowcount
+            db.commit()
+
+            batches += 1
+            removed[notification_type.value] = removed.get(notification_type.value, 0) + deleted
+            if len(ids) < batch_size:
+                break
+
+    duration_ms = int((time.perf_counter() - started) * 1000)
+    total = sum(removed.values())
+    if total:
+        print(f"[Retention] {'Archived' if mode == 'archive' else 'Deleted'} {total} notifications in {batches} batches ({duration_ms} ms)")
+    return {
+        "mode": mode,
+        "removed": removed,
+        "total_removed": total,
+        "receipts_removed": receipts_removed,
+        "batches": batches,
+        "duration_ms": duration_ms,
+    }
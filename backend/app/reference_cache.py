@@ -0,0 +1,236 @@
+"""
+In-process cache of reference data: categories, item types, plants and stores.
+
+These sets change rarely but are listed on nearly every page. Each set is
+loaded with one or two queries (joins and grouped counts instead of a query
+per row), serialised once through its response schema and kept until a
+committed write to a model it depends on invalidates it (app.change_hooks).
+List endpoints filter and page the cached rows in memory.
+
+Every set carries a digest of its content. List responses get an ETag made of
+the digest and the query parameters, and a matching If-None-Match is answered
+with 304 before any filtering or serialisation - so identical content gives
+identical ETags in every API process, and browsers revalidate for free.
+
+Writes made by another API process (or directly in SQL) are not seen by the
+hooks, so sets are also reloaded after CACHE_TTL_SECONDS; that bounds how
+stale another process can be.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import func, inspect
+from sqlalchemy.orm import Session, selectinload
+
+from app import change_hooks
+from app.models import Category, ItemType, TypeSizeThreshold, Plant, Store
+from app.schemas import CategoryResponse, ItemTypeResponse, PlantResponse, StoreResponse
+from app.serializers import FastJSONResponse
+
+CACHE_TTL_SECONDS = int(os.getenv("REFERENCE_CACHE_TTL_SECONDS", "60"))
+
+# Browsers keep the response but revalidate it (ETag) before every use
+CACHE_CONTROL = "private, no-cache"
+
+CATEGORIES = "categories"
+ITEM_TYPES = "item_types"
+PLANTS = "plants"
+STORES = "stores"
+
+# Set -> models whose writes invalidate it (counts and names of the related model included)
+DEPENDENCIES = {
+    CATEGORIES: {Category, ItemType},
+    ITEM_TYPES: {ItemType, TypeSizeThreshold, Category},
+    PLANTS: {Plant, Store},
+    STORES: {Store, Plant},
+}
+
+
+@dataclass
+class ReferenceSet:
+    rows: List[dict]  # JSON-ready, in display order
+    digest: str
+    loaded_at: float
+
+
+def _columns(obj) -> dict:
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+
+def _load_categories(db: Session) -> List[dict]:
+    type_counts = dict(db.query(ItemType.category_id, func.count(ItemType.type_id)).group_by(ItemType.category_id))
+    rows = []
+    for category in db.query(Category).order_by(Category.display_order.asc(), Category.category_name.asc()):
+        data = _columns(category)
+        data["type_count"] = type_counts.get(category.category_id, 0)
+        rows.append(CategoryResponse.model_validate(data).model_dump(mode="json"))
+    return rows
+
+
+def _load_item_types(db: Session) -> List[dict]:
+    rows = []
+    for type_obj, category_name in db.query(ItemType, Category.category_name).outerjoin(
+        Category, Category.category_id == ItemType.category_id
+    ).options(
+        selectinload(ItemType.size_thresholds)
+    ).order_by(ItemType.display_order.asc(), ItemType.type_name.asc()):
+        data = _columns(type_obj)  # JSON columns arrive validated (app.json_types)
+        data["size_stock_levels"] = type_obj.size_stock_levels
+        data["category_name"] = category_name
+        data["item_count"] = 0  # Placeholder for future items count
+        rows.append(ItemTypeResponse.model_validate(data).model_dump(mode="json"))
+    return rows
+
+
+def _load_plants(db: Session) -> List[dict]:
+    store_counts = dict(db.query(Store.plant_id, func.count(Store.store_id)).group_by(Store.plant_id))
+    rows = []
+    for plant in db.query(Plant).order_by(Plant.plant_name.asc()):
+        data = _columns(plant)
+        data["store_count"] = store_counts.get(plant.plant_id, 0)
+        rows.append(PlantResponse.model_validate(data).model_dump(mode="json"))
+    return rows
+
+
+def _load_stores(db: Session) -> List[dict]:
+    """Stores without stock figures (current_items changes with every movement, see store_usage)"""
+    rows = []
+    for store, plant_name, plant_code in db.query(Store, Plant.plant_name, Plant.plant_code).outerjoin(
+        Plant, Plant.plant_id == Store.plant_id
+    ).order_by(Store.store_name.asc()):
+        data = _columns(store)
+        data.update(plant_name=plant_name, plant_code=plant_code, current_items=0, utilization_percentage=0.0)
+        rows.append(StoreResponse.model_validate(data).model_dump(mode="json"))
+    return rows
+
+
+LOADERS: Dict[str, Callable[[Session], List[dict]]] = {
+    CATEGORIES: _load_categories,
+    ITEM_TYPES: _load_item_types,
+    PLANTS: _load_plants,
+    STORES: _load_stores,
+}
+
+
+class ReferenceCache:
+    def __init__(self, ttl_seconds: int = CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._sets: Dict[str, ReferenceSet] = {}
+        # Bumped by every invalidation: a load that raced with a write is not kept
+        self._generations: Dict[str, int] = {name: 0 for name in LOADERS}
+        self.hits = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    def get(self, db: Session, name: str) -> ReferenceSet:
+        entry = self._sets.get(name)
+        if entry is not None and time.monotonic() - entry.loaded_at < self.ttl_seconds:
+            self.hits += 1
+            return entry
+
+        generation = self._generations[name]
+        rows = LOADERS[name](db)
+        digest = hashlib.sha1(json.dumps(rows, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+        entry = ReferenceSet(rows=rows, digest=digest, loaded_at=time.monotonic())
+        with self._lock:
+            self.loads += 1
+            if self._generations[name] == generation:
+                self._sets[name] = entry
+        return entry
+
+    def invalidate(self, models):
+        """Drop the sets depending on any of the given models"""
+        models = set(models)
+        with self._lock:
+            for name, dependencies in DEPENDENCIES.items():
+                if dependencies & models:
+                    self._generations[name] += 1
+                    self._sets.pop(name, None)
+                    self.invalidations += 1
+
+    def clear(self):
+        self.invalidate(set().union(*DEPENDENCIES.values()))
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "loads": self.loads,
+                "invalidations": self.invalidations,
+                "sets": {
+                    name: {"rows": len(entry.rows), "age_seconds": round(now - entry.loaded_at, 1)}
+                    for name, entry in self._sets.items()
+                },
+            }
+
+
+def make_etag(digest: str, params: dict) -> str:
+    key = json.dumps(params, sort_keys=True, default=str)
+    return '"' + hashlib.sha1(f"{digest}:{key}".encode()).hexdigest()[:32] + '"'
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def matches_search(row: dict, search: Optional[str], fields) -> bool:
+    """Case-insensitive substring match, like SQL LIKE '%search%' with the default collation"""
+    if not search:
+        return True
+    needle = search.lower()
+    return any(needle in (row.get(field) or "").lower() for field in fields)
+
+
+def reference_response(
+    request: Request,
+    db: Session,
+    name: str,
+    params: dict,
+    select: Callable[[List[dict]], List[dict]],
+    extra_digest: Optional[Callable[[], str]] = None,
+    finalize: Optional[Callable[[List[dict]], List[dict]]] = None,
+) -> Response:
+    """
+    List response for a cached set: select() filters / pages the rows,
+    finalize() adds per-request data to the selected rows (copies), and
+    extra_digest() must change whenever finalize's data does.
+    """
+    reference_set = reference_cache.get(db, name)
+    digest = reference_set.digest + (extra_digest() if extra_digest else "")
+    etag = make_etag(digest, params)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    rows = select(reference_set.rows)
+    if finalize:
+        rows = finalize([dict(row) for row in rows])
+    return FastJSONResponse(content=rows, headers=headers)
+
+
+def _snapshot(obj):
+    return type(obj)
+
+
+def _apply_changes(changes):
+    reference_cache.invalidate({model for _, model in changes})
+
+
+# Singleton instance
+reference_cache = ReferenceCache()
+
+change_hooks.watch([Category, ItemType, TypeSizeThreshold, Plant, Store], _snapshot, _apply_changes)
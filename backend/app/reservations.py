@@ -0,0 +1,84 @@
+"""
+Stock reservations: holds on Inventory.reserved_quantity that expire.
+
+A reservation records which inventory rows hold its quantity (allocations),
+so releasing it - explicitly, or by the expiry sweeper once expires_at has
+passed - gives back exactly those units with one executemany UPDATE.
+
+The expiry sweep runs as the periodic "expire_reservations" background job
+(app.tasks); it releases expired holds in batches, oldest first, using the
+(status, expires_at) index.
+"""
+from datetime import datetime
+from typing import Iterable, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import Reservation
+from app.stock import Allocation, release_reserved
+
+# reference_type / reference_number prefix of the stock_out written on confirm
+RESERVATION_REFERENCE_TYPE = "RESERVATION"
+
+SWEEP_BATCH_SIZE = 500
+
+
+def reservation_reference(reservation: Reservation) -> str:
+    return f"RES-{reservation.reservation_id:06d}"
+
+
+def allocations_json(allocations: List[Allocation]) -> List[dict]:
+    return [
+        {
+            "inventory_id": row.inventory_id,
+            "box_id": row.box_id,
+            "box_reference": row.box_reference,
+            "quantity": quantity,
+        }
+        for row, quantity in allocations
+    ]
+
+
+def reservation_holds(reservations: Iterable[Reservation]) -> List[Tuple[int, int]]:
+    """(inventory_id, quantity) pairs held by reservations"""
+    return [
+        (hold["inventory_id"], hold["quantity"])
+        for reservation in reservations
+        for hold in (reservation.allocations or [])
+    ]
+
+
+def close_reservations(db: Session, reservations: List[Reservation], status: str, closed_by: str):
+    """Release the stock held by reservations and mark them closed (caller commits)"""
+    release_reserved(db, reservation_holds(reservations))
+    now = datetime.now()
+    for reservation in reservations:
+        reservation.status = status
+        reservation.closed_at = now
+        reservation.closed_by = closed_by
+
+
+def expire_reservations(db: Session, batch_size: int = SWEEP_BATCH_SIZE) -> Tuple[int, int]:
+    """
+    Release every active reservation past its expires_at, one batch (and one
+    commit) at a time. Returns (expired_count, released_quantity).
+    """
+    expired_count = 0
+    released_quantity = 0
+    while True:
+        batch = db.query(Reservation).filter(
+            Reservation.status == 'active',
+            Reservation.expires_at <= datetime.now()
+        ).order_by(Reservation.expires_at.asc()).limit(batch_size).with_for_update().all()
+        if not batch:
+            break
+
+        close_reservations(db, batch, 'expired', 'system')
+        db.commit()
+
+        expired_count += len(batch)
+        released_quantity += sum(reservation.quantity for reservation in batch)
+        if len(batch) < batch_size:
+            break
+
+    return expired_count, released_quantity
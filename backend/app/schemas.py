@@ -1,7 +1,8 @@
 from pydantic import BaseModel, Field, field_validator, model_validator
-from typing import Optional, List, Dict, Dict, Any
+from typing import Optional, List, Dict, Dict, Any, Union
 from datetime import datetime, date
 from enum import Enum
+from app.images import photo_variant_urls
 
 # User-related schemas (keep for authentication)
 class UserRole(str, Enum):
@@ -54,6 +55,8 @@ class UserResponse(BaseModel):
     email: Optional[str]
     full_name: Optional[str]
     profile_photo: Optional[str] = None
+    # {"64": {"webp": url, "jpg": url}, "256": {...}} - use these for avatars instead of the original
+    profile_photo_variants: Optional[Dict[str, Dict[str, str]]] = None
     role: str
     status: str
     created_at: datetime
@@ -61,6 +64,12 @@ class UserResponse(BaseModel):
     
     class Config:
         from_attributes = True
+    
+    @model_validator(mode='after')
+    def fill_photo_variants(self):
+        if self.profile_photo_variants is None:
+            self.profile_photo_variants = photo_variant_urls(self.profile_photo)
+        return self
 
 # Authentication schemas
 class Token(BaseModel):
@@ -482,6 +491,15 @@ class BoxCheckIn(BaseModel):
     store_id: int
     location_in_store: Optional[str] = Field(None, max_length=200)
 
+class LabelLayoutName(str, Enum):
+    a4 = "a4"            # 3 x 8 labels of 70 x 37 mm per A4 sheet
+    thermal = "thermal"  # 100 x 50 mm thermal roll, one label per page
+
+class BoxLabelsRequest(BaseModel):
+    box_ids: List[int] = Field(..., min_length=1, max_length=200)
+    layout: LabelLayoutName = LabelLayoutName.a4
+    include_items: bool = Field(True, description='Also print one label per item line of each box')
+
 class BoxResponse(BaseModel):
     box_id: int
     box_code: str
@@ -592,6 +610,12 @@ class StockTransactionCreate(BaseModel):
     notes: Optional[str] = None
     box_id: Optional[int] = None
 
+class StockAllocation(BaseModel):
+    inventory_id: int
+    box_id: Optional[int] = None
+    box_reference: Optional[str] = None  # Box code
+    quantity: int
+
 class StockTransactionResponse(BaseModel):
     transaction_id: int
     transaction_type: str
@@ -614,10 +638,50 @@ class StockTransactionResponse(BaseModel):
     item_name: Optional[str] = None
     from_store_name: Optional[str] = None
     to_store_name: Optional[str] = None
+    allocations: Optional[List[StockAllocation]] = None  # Per-box split (stock_out / transfer_out responses only)
     
     class Config:
         from_attributes = True
 
+class BulkTransferLine(BaseModel):
+    item_id: int
+    quantity: int = Field(..., gt=0)
+    box_id: Optional[int] = None  # Take from this box first
+
+class BulkTransferCreate(BaseModel):
+    from_store_id: int
+    to_store_id: int
+    lines: List[BulkTransferLine] = Field([], max_length=2000)
+    box_ids: List[int] = Field([], max_length=1000, description="Whole boxes to move with their remaining contents")
+    reference_number: Optional[str] = None
+    employee_name: Optional[str] = None
+    employee_id: Optional[str] = None
+    department: Optional[str] = None
+    reason: Optional[str] = None
+    notes: Optional[str] = None
+
+    @model_validator(mode='after')
+    def check_not_empty(self):
+        if not self.lines and not self.box_ids:
+            raise ValueError('lines or box_ids is required')
+        if self.from_store_id == self.to_store_id:
+            raise ValueError('from_store_id and to_store_id must be different')
+        return self
+
+class BulkTransferResult(BaseModel):
+    item_id: int
+    box_id: Optional[int] = None  # Set for lines created from box_ids
+    quantity: int
+    allocations: List[StockAllocation] = []
+
+class BulkTransferResponse(BaseModel):
+    from_store_id: int
+    to_store_id: int
+    transaction_count: int
+    total_quantity: int
+    boxes_moved: List[int] = []
+    results: List[BulkTransferResult] = []
+
 # Notification schemas
 class NotificationBase(BaseModel):
     type: NotificationType
@@ -657,3 +721,292 @@ class NotificationResponse(BaseModel):
                 obj_dict['metadata'] = obj_dict.pop('notification_data')
             return super().model_validate(obj_dict, **kwargs)
         return super().model_validate(obj, **kwargs)
+
+# ============================================================================
+# SEARCH SCHEMAS
+# ============================================================================
+
+class SearchResult(BaseModel):
+    type: str  # item, box, po, item_type, transaction
+    id: Union[int, str]  # po results are keyed by po_number
+    title: Optional[str]
+    subtitle: Optional[str] = None
+    link: Optional[str] = None
+    score: float
+
+# ============================================================================
+# SCAN SCHEMAS
+# ============================================================================
+
+class ScanResolveRequest(BaseModel):
+    codes: List[str] = Field(..., min_length=1, max_length=1000)
+    include_location: bool = True
+    allow_prefix: bool = Field(False, description="Fall back to prefix matching for partial/truncated codes")
+
+class ScanLocation(BaseModel):
+    store_id: Optional[int]
+    store_name: Optional[str] = None
+    location_in_store: Optional[str] = None
+    quantity: Optional[int] = None
+    available_quantity: Optional[int] = None
+
+class ScanMatch(BaseModel):
+    entity_type: str  # item, box
+    entity_id: int
+    code: str
+    label: Optional[str] = None
+    status: Optional[str] = None  # Box status (pending_checkin, checked_in, ...)
+    locations: List[ScanLocation] = []
+
+class ScanResolution(BaseModel):
+    code: str
+    found: bool
+    matched_by: Optional[str] = None  # exact, prefix
+    matches: List[ScanMatch] = []
+
+class ScanEventType(str, Enum):
+    checkin = "checkin"
+    stock_out = "stock_out"
+    transfer = "transfer"
+
+class ScanEventCreate(BaseModel):
+    idempotency_key: str = Field(..., min_length=1, max_length=100, description="Client-generated, unique per scan")
+    event_type: ScanEventType
+    code: str = Field(..., min_length=1, max_length=100)  # Scanned box or item code
+    quantity: Optional[int] = Field(None, gt=0, description="Required for item codes; box codes move the whole box")
+    from_store_id: Optional[int] = None
+    to_store_id: Optional[int] = None
+    location_in_store: Optional[str] = Field(None, max_length=200)
+    reference_number: Optional[str] = None
+    employee_name: Optional[str] = None
+    employee_id: Optional[str] = None
+    department: Optional[str] = None
+    reason: Optional[str] = None
+    notes: Optional[str] = None
+    scanned_at: Optional[datetime] = None
+
+class ScanSessionCreate(BaseModel):
+    client_session_id: Optional[str] = Field(None, max_length=100)
+    device_id: Optional[str] = Field(None, max_length=100)
+    store_id: Optional[int] = None  # Default store for events that do not set one
+    events: List[ScanEventCreate] = Field(..., min_length=1, max_length=1000)
+
+class ScanEventResult(BaseModel):
+    idempotency_key: str
+    status: str  # applied, duplicate, failed
+    message: Optional[str] = None
+    entity_type: Optional[str] = None
+    entity_id: Optional[int] = None
+    transaction_ids: List[int] = []
+
+class ScanSessionResponse(BaseModel):
+    session_id: int
+    client_session_id: Optional[str] = None
+    received: int
+    applied: int
+    duplicates: int
+    failed: int
+    created_at: Optional[datetime] = None
+    results: List[ScanEventResult] = []
+
+# ============================================================================
+# ISSUANCE SCHEMAS
+# ============================================================================
+
+class IssuanceLineCreate(BaseModel):
+    item_id: int
+    quantity: int = Field(..., gt=0)
+    store_id: Optional[int] = None  # Defaults to the document store_id
+    box_id: Optional[int] = None  # Take from this box first
+    notes: Optional[str] = None
+
+class IssuanceCreate(BaseModel):
+    store_id: Optional[int] = None
+    employee_name: Optional[str] = Field(None, max_length=100)
+    employee_id: Optional[str] = Field(None, max_length=50)
+    department: Optional[str] = Field(None, max_length=100)
+    reference_number: Optional[str] = Field(None, max_length=100)
+    reason: Optional[str] = None
+    notes: Optional[str] = None
+    lines: List[IssuanceLineCreate] = Field(..., min_length=1, max_length=1000)
+
+class IssuanceLineResponse(BaseModel):
+    transaction_id: int
+    item_id: int
+    item_code: Optional[str] = None
+    item_name: Optional[str] = None
+    size: Optional[str] = None
+    store_id: Optional[int] = None
+    store_name: Optional[str] = None
+    box_id: Optional[int] = None
+    quantity: int
+    notes: Optional[str] = None
+
+class IssuanceResponse(BaseModel):
+    issuance_id: int
+    issuance_number: str
+    store_id: Optional[int] = None
+    store_name: Optional[str] = None
+    employee_name: Optional[str] = None
+    employee_id: Optional[str] = None
+    department: Optional[str] = None
+    reference_number: Optional[str] = None
+    reason: Optional[str] = None
+    notes: Optional[str] = None
+    line_count: int
+    total_quantity: int
+    created_by: Optional[str] = None
+    created_at: Optional[datetime] = None
+    lines: List[IssuanceLineResponse] = []
+
+    class Config:
+        from_attributes = True
+
+# ============================================================================
+# RESERVATION SCHEMAS
+# ============================================================================
+
+class ReservationStatus(str, Enum):
+    active = "active"
+    confirmed = "confirmed"
+    released = "released"
+    expired = "expired"
+
+class ReservationLineCreate(BaseModel):
+    item_id: int
+    quantity: int = Field(..., gt=0)
+    store_id: Optional[int] = None  # Defaults to the request store_id
+    box_id: Optional[int] = None  # Hold from this box first
+
+class ReservationCreate(BaseModel):
+    store_id: Optional[int] = None
+    ttl_minutes: int = Field(30, ge=1, le=10080)  # Hold expires after this (max 7 days)
+    reference_number: Optional[str] = Field(None, max_length=100)
+    employee_name: Optional[str] = Field(None, max_length=100)
+    employee_id: Optional[str] = Field(None, max_length=50)
+    department: Optional[str] = Field(None, max_length=100)
+    notes: Optional[str] = None
+    lines: List[ReservationLineCreate] = Field(..., min_length=1, max_length=2000)
+
+class ReservationConfirm(BaseModel):
+    quantity: Optional[int] = Field(None, gt=0)  # Issue less than held; the rest is released
+    employee_name: Optional[str] = Field(None, max_length=100)
+    employee_id: Optional[str] = Field(None, max_length=50)
+    department: Optional[str] = Field(None, max_length=100)
+    reason: Optional[str] = None
+    notes: Optional[str] = None
+
+class ReservationResponse(BaseModel):
+    reservation_id: int
+    item_id: int
+    store_id: int
+    box_id: Optional[int] = None
+    quantity: int
+    status: ReservationStatus
+    allocations: List[StockAllocation] = []
+    expires_at: datetime
+    reference_number: Optional[str] = None
+    employee_name: Optional[str] = None
+    employee_id: Optional[str] = None
+    department: Optional[str] = None
+    notes: Optional[str] = None
+    transaction_id: Optional[int] = None
+    created_by: Optional[str] = None
+    created_at: Optional[datetime] = None
+    closed_at: Optional[datetime] = None
+    closed_by: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class ReservationSweepResponse(BaseModel):
+    expired_count: int
+    released_quantity: int
+
+# ============================================================================
+# BACKGROUND JOB SCHEMAS
+# ============================================================================
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+class JobCreate(BaseModel):
+    job_name: str = Field(..., max_length=100)
+    payload: Optional[Dict[str, Any]] = None
+
+class JobResponse(BaseModel):
+    job_id: int
+    job_name: str
+    status: JobStatus
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    run_after: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[int] = None
+    created_by: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class JobMetricsResponse(BaseModel):
+    job_name: str
+    interval_seconds: Optional[int] = None
+    next_run_at: Optional[datetime] = None
+    # Since this process started
+    runs: int
+    failures: int
+    avg_ms: Optional[float] = None
+    max_ms: Optional[int] = None
+    last_ms: Optional[int] = None
+    last_status: Optional[str] = None
+    last_finished_at: Optional[datetime] = None
+    # From the jobs table (all processes, last 24 hours)
+    queued: int = 0
+    runs_24h: int = 0
+    failures_24h: int = 0
+    avg_ms_24h: Optional[float] = None
+    max_ms_24h: Optional[int] = None
+
+# ============================================================================
+# LABEL SCHEMAS
+# ============================================================================
+
+class LabelFormat(str, Enum):
+    png = "png"
+    svg = "svg"
+
+class LabelOutput(str, Enum):
+    pdf = "pdf"
+    zip = "zip"
+    json = "json"
+
+class QrLabelRequest(BaseModel):
+    codes: List[str] = Field(..., min_length=1, max_length=500, description='Box codes, item codes or any text to encode')
+    size: int = Field(256, ge=64, le=1024, description='Image size in pixels (PNG and PDF)')
+    format: LabelFormat = LabelFormat.png
+    output: LabelOutput = Field(LabelOutput.pdf, description='pdf: one label per page (always PNG), zip: one file per code, json: data URIs')
+
+    @field_validator('codes')
+    @classmethod
+    def validate_codes(cls, codes):
+        codes = [code.strip() for code in codes]
+        if any(not code or len(code) > 500 for code in codes):
+            raise ValueError('Codes must be 1-500 characters')
+        return codes
+
+class QrLabel(BaseModel):
+    code: str
+    data_uri: str
+
+class QrLabelResponse(BaseModel):
+    format: LabelFormat
+    size: int
+    cached: int
+    labels: List[QrLabel]
@@ -0,0 +1,442 @@
+"""
+In-process search index for items, boxes, purchase orders, item types and
+stock transactions.
+
+Replaces leading-wildcard LIKE scans with a token index:
+- every indexed field is split into lowercase alphanumeric tokens
+- tokens are kept in a sorted list, so a prefix lookup is a bisect
+- postings map token -> {document key: field weight}
+
+Transactions are indexed once per reference (reference_type +
+reference_number), so a multi-line issuance or transfer is a single result.
+
+The index is built lazily on the first search and kept in sync with
+committed writes through app.change_hooks. Transactions written with a bulk
+INSERT (issuance and bulk transfer lines) are not seen by the hooks; their
+handlers index them with index_reference(). Each worker process holds its
+own copy, and writes made by another process are not seen at all, so once
+the index is older than INDEX_TTL_SECONDS the next search starts a reload
+in a background thread and keeps answering from the current copy until the
+new one is swapped in. POST /api/search/reindex reloads it at once.
+"""
+import os
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import change_hooks
+from app.database import SessionLocal
+from app.models import Item, Box, ItemType, StockTransaction
+
+INDEX_TTL_SECONDS = int(os.getenv("SEARCH_INDEX_TTL_SECONDS", "300"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+DocKey = Tuple[str, Any]
+
+# Result types in display order (used as tie-breaker)
+RESULT_TYPES = ["item", "box", "po", "item_type", "transaction"]
+
+# Field weights - codes rank above names, names above free text
+CODE_WEIGHT = 3.0
+NAME_WEIGHT = 2.0
+TEXT_WEIGHT = 1.0
+
+# Transactions referencing a box code are already covered by the box document
+SKIPPED_REFERENCE_TYPES = {"BOX"}
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase alphanumeric tokens"""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def _item_doc(item_id, item_code, item_name, qr_code, barcode) -> dict:
+    return {
+        "key": ("item", item_id),
+        "title": item_name or item_code,
+        "subtitle": item_code,
+        "code": item_code,
+        "link": f"/inventory?item_id={item_id}",
+        "fields": [
+            (item_code, CODE_WEIGHT),
+            (qr_code, CODE_WEIGHT),
+            (barcode, CODE_WEIGHT),
+            (item_name, NAME_WEIGHT),
+        ],
+    }
+
+
+def _box_doc(box_id, box_code, supplier, po_number) -> dict:
+    subtitle = " / ".join(part for part in [supplier, f"PO {po_number}" if po_number else None] if part)
+    return {
+        "key": ("box", box_id),
+        "title": box_code,
+        "subtitle": subtitle or None,
+        "code": box_code,
+        "link": f"/receiving/details?id={box_id}",
+        "po_number": po_number,
+        "fields": [
+            (box_code, CODE_WEIGHT),
+            (po_number, NAME_WEIGHT),
+            (supplier, TEXT_WEIGHT),
+        ],
+    }
+
+
+def _po_doc(po_number) -> dict:
+    return {
+        "key": ("po", po_number),
+        "title": po_number,
+        "subtitle": None,  # Filled with box count at query time
+        "code": po_number,
+        "link": f"/receiving?search={po_number}",
+        "fields": [(po_number, CODE_WEIGHT)],
+    }
+
+
+def _item_type_doc(type_id, type_name, description) -> dict:
+    return {
+        "key": ("item_type", type_id),
+        "title": type_name,
+        "subtitle": description,
+        "code": None,
+        "link": f"/categories?type_id={type_id}",
+        "fields": [
+            (type_name, NAME_WEIGHT),
+            (description, TEXT_WEIGHT),
+        ],
+    }
+
+
+def _transaction_doc(reference_type, reference_number, transaction_type, employee_name) -> dict:
+    """One document per reference, shared by all of its transaction lines"""
+    subtitle = " / ".join(part for part in [transaction_type, employee_name] if part)
+    return {
+        "key": ("transaction", (reference_type or "", reference_number)),
+        "id": reference_number,
+        "title": reference_number,
+        "subtitle": subtitle or None,
+        "code": reference_number,
+        "link": f"/inventory?reference_number={reference_number}",
+        "fields": [
+            (reference_number, CODE_WEIGHT),
+            (employee_name, TEXT_WEIGHT),
+        ],
+    }
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()  # One reload at a time
+        self._pending: Optional[List[Tuple[str, dict]]] = None  # Changes committed during a reload
+        self._built = False
+        self._built_at = 0.0
+        self._docs: Dict[DocKey, dict] = {}
+        self._doc_tokens: Dict[DocKey, Dict[str, float]] = {}
+        self._postings: Dict[str, Dict[DocKey, float]] = {}
+        self._tokens: List[str] = []  # Sorted, for prefix lookups
+        self._po_boxes: Dict[str, Set[int]] = {}
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def ensure_built(self, db: Session):
+        if self._built:
+            if time.monotonic() - self._built_at >= INDEX_TTL_SECONDS:
+                self._reload_in_background()
+            return
+        # First search in this process: nothing to answer from yet
+        with self._reload_lock:
+            if not self._built:
+                self._reload(db)
+
+    def rebuild(self, db: Session) -> dict:
+        with self._reload_lock:
+            self._reload(db)
+        return self.stats()
+
+    def _reload_in_background(self):
+        if not self._reload_lock.acquire(blocking=False):
+            return  # Already reloading
+        threading.Thread(target=self._background_reload, name="search-index-reload", daemon=True).start()
+
+    def _background_reload(self):
+        db = SessionLocal()
+        try:
+            self._reload(db)
+        except Exception as e:
+            self._built_at = time.monotonic()  # Retry after another TTL
+            print(f"[Search Index] Reload failed: {e}")
+        finally:
+            db.close()
+            self._reload_lock.release()
+
+    def _reload(self, db: Session):
+        """Load a new copy without holding the lock, then swap it in (caller holds _reload_lock)"""
+        with self._lock:
+            self._pending = []
+        try:
+            fresh = SearchIndex()
+            fresh._load(db)
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            # Writes committed while loading may be missing from the new copy
+            fresh._apply(self._pending)
+            self._pending = None
+            self._docs = fresh._docs
+            self._doc_tokens = fresh._doc_tokens
+            self._postings = fresh._postings
+            self._tokens = fresh._tokens
+            self._po_boxes = fresh._po_boxes
+            self._built = True
+            self._built_at = time.monotonic()
+        print(f"[Search Index] Built index: {len(self._docs)} documents, {len(self._tokens)} tokens")
+
+    def _load(self, db: Session):
+        for row in db.query(Item.item_id, Item.item_code, Item.item_name, Item.qr_code, Item.barcode):
+            self._put(_item_doc(*row), sort=False)
+
+        for row in db.query(Box.box_id, Box.box_code, Box.supplier, Box.po_number):
+            self._put_box(_box_doc(*row), sort=False)
+
+        for row in db.query(ItemType.type_id, ItemType.type_name, ItemType.description):
+            self._put(_item_type_doc(*row), sort=False)
+
+        # One row per reference, not per transaction line
+        references = db.query(
+            StockTransaction.reference_type,
+            StockTransaction.reference_number,
+            func.min(StockTransaction.transaction_type),
+            func.min(StockTransaction.employee_name),
+        ).filter(
+            StockTransaction.reference_number.isnot(None),
+            StockTransaction.reference_number != "",
+            StockTransaction.reference_type.notin_(SKIPPED_REFERENCE_TYPES) | StockTransaction.reference_type.is_(None),
+        ).group_by(StockTransaction.reference_type, StockTransaction.reference_number)
+        for row in references:
+            self._put(_transaction_doc(*row), sort=False)
+
+        self._tokens.sort()
+
+    # ------------------------------------------------------------------
+    # Document maintenance (caller holds the lock)
+    # ------------------------------------------------------------------
+
+    def _put(self, doc: dict, sort: bool = True):
+        key = doc["key"]
+        self._remove(key)
+
+        tokens: Dict[str, float] = {}
+        for value, weight in doc["fields"]:
+            for token in tokenize(value):
+                if weight > tokens.get(token, 0):
+                    tokens[token] = weight
+
+        for token, weight in tokens.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                if sort:
+                    insort(self._tokens, token)
+                else:
+                    self._tokens.append(token)  # Sorted once by _load()
+            postings[key] = weight
+
+        self._docs[key] = doc
+        self._doc_tokens[key] = tokens
+
+    def _remove(self, key: DocKey):
+        tokens = self._doc_tokens.pop(key, None)
+        self._docs.pop(key, None)
+        if not tokens:
+            return
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[token]
+                index = bisect_left(self._tokens, token)
+                if index < len(self._tokens) and self._tokens[index] == token:
+                    del self._tokens[index]
+
+    def _put_box(self, doc: dict, sort: bool = True):
+        box_id = doc["key"][1]
+        self._remove_box(box_id)
+        self._put(doc, sort)
+        po_number = doc.get("po_number")
+        if po_number:
+            boxes = self._po_boxes.setdefault(po_number, set())
+            if not boxes:
+                self._put(_po_doc(po_number), sort)
+            boxes.add(box_id)
+
+    def _remove_box(self, box_id: int):
+        old = self._docs.get(("box", box_id))
+        self._remove(("box", box_id))
+        po_number = old.get("po_number") if old else None
+        if po_number and po_number in self._po_boxes:
+            boxes = self._po_boxes[po_number]
+            boxes.discard(box_id)
+            if not boxes:
+                del self._po_boxes[po_number]
+                self._remove(("po", po_number))
+
+    # ------------------------------------------------------------------
+    # Change hooks
+    # ------------------------------------------------------------------
+
+    def apply_changes(self, changes: List[Tuple[str, dict]]):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.extend(changes)  # Replayed onto the copy being loaded
+            # Nothing to keep in sync until the first search builds the index
+            if self._built:
+                self._apply(changes)
+
+    def _apply(self, changes: List[Tuple[str, dict]]):
+        for action, doc in changes:
+            if doc is None:
+                continue
+            key = doc["key"]
+            if key[0] == "transaction" and action != "delete" and key in self._docs:
+                continue  # Another line of an indexed reference
+            if action == "delete" or doc.get("skip"):
+                if key[0] == "box":
+                    self._remove_box(key[1])
+                else:
+                    self._remove(key)
+            elif key[0] == "box":
+                self._put_box(doc)
+            else:
+                self._put(doc)
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    def _prefix_matches(self, prefix: str) -> List[str]:
+        start = bisect_left(self._tokens, prefix)
+        matches = []
+        for token in self._tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            matches.append(token)
+        return matches
+
+    def search(self, query: str, types: Optional[Set[str]] = None, limit: int = 20) -> List[dict]:
+        """
+        Ranked search. Every query token must match (as a prefix) some token
+        of the document; the score sums the best field weight per query token,
+        with exact token matches scoring above prefix matches.
+        """
+        query_tokens = list(dict.fromkeys(tokenize(query)))
+        if not query_tokens:
+            return []
+
+        with self._lock:
+            scores: Optional[Dict[DocKey, float]] = None
+
+            for query_token in query_tokens:
+                token_scores: Dict[DocKey, float] = {}
+                for token in self._prefix_matches(query_token):
+                    closeness = 1.0 if token == query_token else 0.5 + 0.4 * len(query_token) / len(token)
+                    for key, weight in self._postings[token].items():
+                        if types and key[0] not in types:
+                            continue
+                        score = weight * closeness
+                        if score > token_scores.get(key, 0):
+                            token_scores[key] = score
+
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {key: scores[key] + s for key, s in token_scores.items() if key in scores}
+                if not scores:
+                    return []
+
+            normalized_query = query.strip().lower()
+            results = []
+            for key, score in scores.items():
+                doc = self._docs[key]
+                code = doc.get("code")
+                if code and code.lower() == normalized_query:
+                    score += 10.0  # Exact code match (e.g. scanned code) always first
+
+                subtitle = doc["subtitle"]
+                if key[0] == "po":
+                    count = len(self._po_boxes.get(key[1], ()))
+                    subtitle = f"{count} box(es)"
+
+                results.append({
+                    "type": key[0],
+                    "id": doc.get("id", key[1]),
+                    "title": doc["title"],
+                    "subtitle": subtitle,
+                    "link": doc["link"],
+                    "score": round(score, 3),
+                })
+
+        results.sort(key=lambda r: (-r["score"], RESULT_TYPES.index(r["type"]), str(r["title"])))
+        return results[:limit]
+
+    def stats(self) -> dict:
+        with self._lock:
+            by_type: Dict[str, int] = {}
+            for key in self._docs:
+                by_type[key[0]] = by_type.get(key[0], 0) + 1
+            return {
+                "built": self._built,
+                "documents": len(self._docs),
+                "tokens": len(self._tokens),
+                "by_type": by_type,
+            }
+
+
+def _snapshot(obj) -> Optional[dict]:
+    """Build the index document for a changed row (called at flush time)"""
+    if isinstance(obj, Item):
+        return _item_doc(obj.item_id, obj.item_code, obj.item_name, obj.qr_code, obj.barcode)
+    if isinstance(obj, Box):
+        return _box_doc(obj.box_id, obj.box_code, obj.supplier, obj.po_number)
+    if isinstance(obj, ItemType):
+        return _item_type_doc(obj.type_id, obj.type_name, obj.description)
+    if isinstance(obj, StockTransaction):
+        doc = _transaction_doc(obj.reference_type, obj.reference_number, obj.transaction_type, obj.employee_name)
+        if not obj.reference_number or obj.reference_type in SKIPPED_REFERENCE_TYPES:
+            doc["skip"] = True
+        return doc
+    return None
+
+
+def index_reference(db: Session, reference_type: str, reference_number: Optional[str],
+                    transaction_type: str, employee_name: Optional[str] = None):
+    """
+    Index the reference of bulk INSERTed transaction lines (not seen by the
+    commit hooks) once the session commits. Call before the commit.
+    """
+    if not reference_number or reference_type in SKIPPED_REFERENCE_TYPES:
+        return
+    doc = _transaction_doc(reference_type, reference_number, transaction_type, employee_name)
+    change_hooks.on_commit(db, lambda: search_index.apply_changes([("upsert", doc)]))
+
+
+# Singleton instance
+search_index = SearchIndex()
+
+change_hooks.watch([Item, Box, ItemType, StockTransaction], _snapshot, search_index.apply_changes)
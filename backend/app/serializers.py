@@ -0,0 +1,182 @@
+"""
+Fast JSON output for the large list endpoints (items, inventory, boxes, stock
+transactions).
+
+These endpoints used to build a Pydantic response object per row and return
+the list through response_model, so every row was validated twice and then
+serialised by FastAPI. Their rows come straight from the database, so they
+are now built as plain dicts and returned in a FastJSONResponse (orjson). A
+Response returned by a handler is sent as is: FastAPI skips response_model
+validation and serialisation for it. The response_model stays on the route
+for the OpenAPI schema, and the rows must produce exactly its fields.
+
+Items and inventory select one labelled SQL expression per response field
+(ITEM_COLUMNS / INVENTORY_COLUMNS), so a ?fields= projection narrows the
+SELECT itself; boxes and transactions are built from ORM rows (*_row()).
+
+FastJSONResponse is not the app's default_response_class on purpose: any
+custom default disables FastAPI's own fast path (Pydantic serialising a
+response_model straight to JSON bytes) for every other route.
+
+scripts/benchmark_serialization.py compares both paths per 1000 rows.
+"""
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import func, literal
+
+from app.models import Box, Inventory, Item, ItemBatch, ItemType, Store, StockTransaction
+from app.stock import STOCK_MIN_LEVEL, STOCK_MAX_LEVEL
+
+
+def _default(value):
+    # Pydantic's JSON mode writes Decimal as a string
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (datetime, date and enums natively)"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def select_columns(fields: Optional[str], columns: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The {field: SQL expression} entries named by a ?fields=a,b,c parameter, in
+    schema order; all of them without the parameter. Only these are SELECTed
+    and serialised. Unknown names are a 400.
+    """
+    if not fields:
+        return dict(columns)
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - columns.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown field(s): {', '.join(sorted(unknown))}. Available: {', '.join(columns)}"
+        )
+    return {name: expression for name, expression in columns.items() if name in requested}
+
+
+def labelled(columns: Dict[str, Any]) -> list:
+    return [expression.label(name) for name, expression in columns.items()]
+
+
+def projected_row(row, names) -> dict:
+    """Response dict of a row selected with labelled() columns"""
+    mapping = row._mapping
+    return {name: mapping[name] for name in names}
+
+
+# InventoryResponse fields; thresholds and names need the joins of GET /api/items/inventory
+INVENTORY_COLUMNS = {
+    "inventory_id": Inventory.inventory_id,
+    "store_id": Inventory.store_id,
+    "item_id": Inventory.item_id,
+    "quantity": Inventory.quantity,
+    "reserved_quantity": func.coalesce(Inventory.reserved_quantity, 0),
+    "available_quantity": Inventory.quantity - func.coalesce(Inventory.reserved_quantity, 0),
+    "min_level": STOCK_MIN_LEVEL,
+    "max_level": STOCK_MAX_LEVEL,
+    "location_in_store": func.nullif(Inventory.location_in_store, ""),
+    "last_counted_at": Inventory.last_counted_at,
+    "last_counted_by": func.nullif(Inventory.last_counted_by, ""),
+    "notes": func.nullif(Inventory.notes, ""),
+    "created_at": Inventory.created_at,
+    "updated_at": Inventory.updated_at,
+    "store_name": Store.store_name,
+    "item_code": Item.item_code,
+    "item_name": Item.item_name,
+    "size": Item.size,
+    "year_code": ItemBatch.year_code,
+    "box_reference": Inventory.box_reference,  # Box code (e.g., BOX-2025-0005)
+    "box_id": Inventory.box_id,
+}
+
+# ItemResponse fields; year_code / type_name need the joins of GET /api/items/
+ITEM_COLUMNS = {
+    "item_id": Item.item_id,
+    "batch_id": Item.batch_id,
+    "item_code": Item.item_code,
+    "item_name": Item.item_name,
+    "size": Item.size,
+    "color": Item.color,
+    "unit_type": Item.unit_type,
+    "qr_code": Item.qr_code,
+    "barcode": Item.barcode,
+    "min_stock": Item.min_stock,
+    "max_stock": Item.max_stock,
+    "status": Item.status,
+    "created_at": Item.created_at,
+    "updated_at": Item.updated_at,
+    "created_by": Item.created_by,
+    "year_code": ItemBatch.year_code,
+    "type_name": ItemType.type_name,
+    "total_stock": literal(0),  # Replaced by a per-item sum with include_stock
+}
+
+
+def box_row(box: Box, total_items: int, store_name: Optional[str]) -> dict:
+    """BoxResponse fields"""
+    return {
+        "box_id": box.box_id,
+        "box_code": box.box_code,
+        "qr_code": box.qr_code or box.box_code,
+        "supplier": box.supplier,
+        "po_number": box.po_number,
+        "do_number": box.do_number,
+        "invoice_number": box.invoice_number,
+        "store_id": box.store_id,
+        "location_in_store": box.location_in_store,
+        "status": box.status,
+        "received_date": box.received_date or date.today(),
+        "received_by": box.received_by or box.created_by or "System",
+        "checked_in_at": box.checked_in_at or box.checked_in_date,
+        "checked_in_by": box.checked_in_by,
+        "notes": box.notes,
+        "created_at": box.created_at,
+        "updated_at": box.updated_at,
+        "total_items": int(total_items or 0),
+        "store_name": store_name,
+    }
+
+
+def transaction_row(
+    trans: StockTransaction,
+    item_code: Optional[str],
+    item_name: Optional[str],
+    from_store_name: Optional[str],
+    to_store_name: Optional[str],
+) -> dict:
+    """StockTransactionResponse fields (without allocations)"""
+    return {
+        "transaction_id": trans.transaction_id,
+        "transaction_type": trans.transaction_type,
+        "box_id": trans.box_id,
+        "item_id": trans.item_id,
+        "from_store_id": trans.from_store_id,
+        "to_store_id": trans.to_store_id,
+        "quantity": trans.quantity,
+        "reference_number": trans.reference_number,
+        "reference_type": trans.reference_type,
+        "request_by": trans.request_by,
+        "employee_name": trans.employee_name,
+        "employee_id": trans.employee_id,
+        "department": trans.department,
+        "reason": trans.reason,
+        "notes": trans.notes,
+        "created_by": trans.created_by,
+        "created_at": trans.created_at,
+        "item_code": item_code,
+        "item_name": item_name,
+        "from_store_name": from_store_name,
+        "to_store_name": to_store_name,
+        "allocations": None,
+    }
@@ -0,0 +1,421 @@
+"""
+Shared stock movement helpers.
+
+Stock-outs and transfers are allocated FIFO across the per-box inventory
+rows created by box check-in (oldest checked_in_at first), and the quantity
+taken from each box is subtracted from BoxContent.remaining. A single
+movement (POST /api/items/transactions) reads and locks the item's candidate
+rows with one SELECT ... FOR UPDATE (allocate_stock), so concurrent
+stock-outs serialize per row and cannot oversell. Stock-ins add to a row with
+one atomic UPDATE (add_inventory), never with a read-modify-write in Python.
+
+Batch endpoints (scan sessions, ...) apply many movements inside one database
+transaction. Instead of a lookup-validate-write cycle per movement, the
+inventory rows they touch are preloaded and locked with one query into an
+InventoryLedger, updated in memory, and written by a single flush at commit.
+
+Reservations hold stock in Inventory.reserved_quantity. Every allocation
+above only takes quantity - reserved_quantity, so held stock cannot be
+issued or transferred by anyone else.
+
+Min / max stock levels are evaluated in SQL (STOCK_MIN_LEVEL /
+STOCK_MAX_LEVEL after with_stock_thresholds): the item's size row in
+type_size_thresholds, else the item type defaults.
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, bindparam, case, func, update
+from sqlalchemy.orm import Session
+
+from app.models import Item, ItemBatch, ItemType, TypeSizeThreshold, Inventory, Box, BoxContent
+
+DEFAULT_MIN_LEVEL = 50
+DEFAULT_MAX_LEVEL = 1000
+
+# Thresholds of the item in a query prepared by with_stock_thresholds()
+STOCK_MIN_LEVEL = func.coalesce(TypeSizeThreshold.min_level, ItemType.min_stock_level, DEFAULT_MIN_LEVEL)
+STOCK_MAX_LEVEL = func.coalesce(TypeSizeThreshold.max_level, ItemType.max_stock_level, DEFAULT_MAX_LEVEL)
+
+StockKey = Tuple[int, int]  # (item_id, store_id)
+Allocation = Tuple[Inventory, int]  # (inventory row, quantity taken from it)
+
+
+class StockError(Exception):
+    """A stock movement that cannot be applied (insufficient stock, invalid state, ...)"""
+    pass
+
+
+def fifo_order(prefer_box_id: Optional[int] = None) -> list:
+    """
+    ORDER BY for allocating an item's inventory rows: the preferred box first
+    (when the caller scanned a specific box), then oldest check-in first.
+    Rows without a box (stock_in, legacy rows) fall back to their creation time.
+    Requires an outer join from Inventory to Box.
+    """
+    order = []
+    if prefer_box_id:
+        order.append(case((Inventory.box_id == prefer_box_id, 0), else_=1))
+    order.append(func.coalesce(Box.checked_in_at, Inventory.created_at).asc())
+    order.append(Inventory.inventory_id.asc())
+    return order
+
+
+def split_fifo(rows: List[Inventory], quantity: int, reserve: bool = False) -> List[Allocation]:
+    """
+    Take quantity from rows in the given order and return [(row, taken)].
+    Rows are modified in place (reserve=True holds the quantity in
+    reserved_quantity instead of removing it). Raises StockError if the rows
+    do not hold enough unreserved stock.
+    """
+    available = sum(max(row.quantity - (row.reserved_quantity or 0), 0) for row in rows)
+    if quantity > available:
+        raise StockError(f"Insufficient stock. Available: {available}, Requested: {quantity}")
+
+    allocations = []
+    remaining = quantity
+    for row in rows:
+        if remaining <= 0:
+            break
+        taken = min(max(row.quantity - (row.reserved_quantity or 0), 0), remaining)
+        if taken <= 0:
+            continue
+        if reserve:
+            row.reserved_quantity = (row.reserved_quantity or 0) + taken
+        else:
+            row.quantity -= taken
+        remaining -= taken
+        allocations.append((row, taken))
+    return allocations
+
+
+def allocate_stock(db: Session, item_id: int, store_id: int, quantity: int, prefer_box_id: Optional[int] = None) -> List[Allocation]:
+    """
+    Allocate a stock-out across the item's inventory rows in a store, oldest
+    box first. The candidate rows are read and locked with one query
+    (SELECT ... FOR UPDATE) so concurrent allocations serialize per row.
+    Quantities are updated on the ORM rows and written when the session flushes.
+    """
+    rows = db.query(Inventory).outerjoin(
+        Box, Box.box_id == Inventory.box_id
+    ).filter(
+        Inventory.item_id == item_id,
+        Inventory.store_id == store_id,
+        Inventory.quantity - Inventory.reserved_quantity > 0
+    ).order_by(*fifo_order(prefer_box_id)).with_for_update().all()
+
+    return split_fifo(rows, quantity)
+
+
+def release_reserved(db: Session, holds: Iterable[Tuple[int, int]]):
+    """
+    Give back held stock: subtract (inventory_id, quantity) pairs from
+    reserved_quantity with one executemany UPDATE, never below zero.
+    """
+    released: Dict[int, int] = {}
+    for inventory_id, quantity in holds:
+        released[inventory_id] = released.get(inventory_id, 0) + quantity
+    if not released:
+        return
+
+    statement = update(Inventory).where(
+        Inventory.inventory_id == bindparam("b_inventory_id")
+    ).values(
+        reserved_quantity=case(
+            (Inventory.reserved_quantity > bindparam("b_quantity"), Inventory.reserved_quantity - bindparam("b_quantity")),
+            else_=0
+        )
+    )
+    db.connection().execute(statement, [
+        {"b_inventory_id": inventory_id, "b_quantity": quantity}
+        for inventory_id, quantity in released.items()
+    ])
+
+
+def consume_box_contents(db: Session, allocations: Iterable[Allocation]):
+    """
+    Subtract allocated quantities from BoxContent.remaining with one
+    executemany UPDATE (one parameter set per box/item).
+    """
+    taken: Dict[Tuple[int, int], int] = {}
+    for row, quantity in allocations:
+        if row.box_id:
+            key = (row.box_id, row.item_id)
+            taken[key] = taken.get(key, 0) + quantity
+    if not taken:
+        return
+
+    statement = update(BoxContent).where(
+        BoxContent.box_id == bindparam("b_box_id"),
+        BoxContent.item_id == bindparam("b_item_id")
+    ).values(
+        remaining=case(
+            (BoxContent.remaining > bindparam("b_quantity"), BoxContent.remaining - bindparam("b_quantity")),
+            else_=0
+        )
+    )
+    db.connection().execute(statement, [
+        {"b_box_id": box_id, "b_item_id": item_id, "b_quantity": quantity}
+        for (box_id, item_id), quantity in taken.items()
+    ])
+
+
+def mark_emptied_boxes(db: Session, box_ids: Iterable[int]) -> Set[int]:
+    """
+    Set checked-in boxes with nothing remaining to 'stocked_out'.
+    Returns the IDs of the boxes that were updated.
+    """
+    box_ids = set(box_ids)
+    if not box_ids:
+        return set()
+
+    emptied = {
+        box_id for box_id, remaining in db.query(
+            BoxContent.box_id, func.sum(BoxContent.remaining)
+        ).filter(
+            BoxContent.box_id.in_(box_ids)
+        ).group_by(BoxContent.box_id)
+        if not remaining or remaining <= 0
+    }
+    if emptied:
+        for box in db.query(Box).filter(Box.box_id.in_(emptied), Box.status == 'checked_in'):
+            box.status = 'stocked_out'
+    return emptied
+
+
+def receive_allocations(
+    db: Session,
+    allocations: List[Allocation],
+    store_id: int,
+    destination_rows: Optional[List[Inventory]] = None,
+) -> List[Inventory]:
+    """
+    Add transferred quantities to the destination store, keeping one row per
+    box (rows without a box merge into the store's box-less row).
+    destination_rows are the item's existing rows in the destination store;
+    when omitted they are loaded (and locked) with one query.
+    Returns the destination rows that were changed or created.
+    """
+    if not allocations:
+        return []
+
+    if destination_rows is None:
+        item_ids = {row.item_id for row, _ in allocations}
+        destination_rows = db.query(Inventory).filter(
+            Inventory.item_id.in_(item_ids),
+            Inventory.store_id == store_id
+        ).order_by(Inventory.inventory_id.asc()).with_for_update().all()
+
+    by_box: Dict[Tuple[int, Optional[int]], Inventory] = {}
+    for row in destination_rows:
+        by_box.setdefault((row.item_id, row.box_id), row)
+
+    changed = []
+    for source, quantity in allocations:
+        target = by_box.get((source.item_id, source.box_id))
+        if target is not None:
+            target.quantity += quantity
+        else:
+            target = Inventory(
+                item_id=source.item_id,
+                store_id=store_id,
+                quantity=quantity,
+                reserved_quantity=0,
+                min_level=source.min_level,  # Copy from source inventory
+                max_level=source.max_level,
+                box_id=source.box_id,
+                box_reference=source.box_reference,
+            )
+            db.add(target)
+            by_box[(source.item_id, source.box_id)] = target
+            destination_rows.append(target)
+        if target not in changed:
+            changed.append(target)
+    return changed
+
+
+def add_inventory(db: Session, inventory_id: int, quantity: int):
+    """Atomically add quantity to one inventory row (no read-modify-write)"""
+    db.query(Inventory).filter(
+        Inventory.inventory_id == inventory_id
+    ).update(
+        {Inventory.quantity: Inventory.quantity + quantity},
+        synchronize_session=False
+    )
+
+
+def with_stock_thresholds(query):
+    """
+    Outer-join the item type and size threshold of Item to a query that
+    already selects from / joins Item, so STOCK_MIN_LEVEL and STOCK_MAX_LEVEL
+    can be selected, filtered and aggregated on.
+    """
+    return query.outerjoin(
+        ItemBatch, ItemBatch.batch_id == Item.batch_id
+    ).outerjoin(
+        ItemType, ItemType.type_id == ItemBatch.type_id
+    ).outerjoin(
+        TypeSizeThreshold,
+        and_(TypeSizeThreshold.type_id == ItemBatch.type_id, TypeSizeThreshold.size == Item.size)
+    )
+
+
+def load_stock_levels(db: Session, item_ids: Iterable[int]) -> Dict[int, Tuple[int, int]]:
+    """
+    Get (min_level, max_level) for many items with one query
+    """
+    item_ids = set(item_ids)
+    if not item_ids:
+        return {}
+
+    rows = with_stock_thresholds(
+        db.query(Item.item_id, STOCK_MIN_LEVEL, STOCK_MAX_LEVEL)
+    ).filter(
+        Item.item_id.in_(item_ids)
+    )
+
+    return {item_id: (int(min_level), int(max_level)) for item_id, min_level, max_level in rows}
+
+
+class InventoryLedger:
+    """
+    In-memory view of the Inventory rows for a set of (item_id, store_id) pairs.
+
+    Rows are loaded and locked with one query up front (missing pairs are
+    loaded lazily) and modified in place; the caller commits the session once
+    at the end.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._rows: Dict[StockKey, List[Inventory]] = {}
+        self.changed: Set[StockKey] = set()  # Pairs whose quantity changed (for stock alerts)
+
+    def load(self, keys: Iterable[StockKey]):
+        keys = {key for key in keys if key not in self._rows}
+        if not keys:
+            return
+
+        item_ids = {item_id for item_id, _ in keys}
+        store_ids = {store_id for _, store_id in keys}
+        # Lock the rows until commit - quantities are rewritten from memory
+        rows = self.db.query(Inventory).outerjoin(
+            Box, Box.box_id == Inventory.box_id
+        ).filter(
+            Inventory.item_id.in_(item_ids),
+            Inventory.store_id.in_(store_ids)
+        ).order_by(*fifo_order()).with_for_update().all()
+
+        for key in keys:
+            self._rows[key] = []
+        for row in rows:
+            key = (row.item_id, row.store_id)
+            if key in keys:
+                self._rows[key].append(row)
+
+    def rows(self, item_id: int, store_id: int) -> List[Inventory]:
+        key = (item_id, store_id)
+        if key not in self._rows:
+            self.load([key])
+        return self._rows[key]
+
+    def available(self, item_id: int, store_id: int) -> int:
+        return sum(
+            max(row.quantity - (row.reserved_quantity or 0), 0)
+            for row in self.rows(item_id, store_id)
+        )
+
+    def take(self, item_id: int, store_id: int, quantity: int, prefer_box_id: Optional[int] = None) -> List[Allocation]:
+        """
+        Deduct quantity from the item's rows in a store, FIFO by box check-in
+        (the preferred box first). Raises StockError if not enough is available.
+        """
+        rows = self.rows(item_id, store_id)
+        if prefer_box_id:
+            rows = sorted(rows, key=lambda row: row.box_id != prefer_box_id)
+        allocations = split_fifo(rows, quantity)
+        self.changed.add((item_id, store_id))
+        return allocations
+
+    def reserve(self, item_id: int, store_id: int, quantity: int, prefer_box_id: Optional[int] = None) -> List[Allocation]:
+        """
+        Hold quantity in the item's rows (reserved_quantity), FIFO like take().
+        Raises StockError if not enough unreserved stock is available.
+        """
+        rows = self.rows(item_id, store_id)
+        if prefer_box_id:
+            rows = sorted(rows, key=lambda row: row.box_id != prefer_box_id)
+        return split_fifo(rows, quantity, reserve=True)
+
+    def box_rows(self, box_id: int, item_id: int, store_id: int) -> List[Inventory]:
+        """The item's inventory rows in a store that belong to one box"""
+        return [row for row in self.rows(item_id, store_id) if row.box_id == box_id]
+
+    def box_quantity(self, box_id: int, item_ids: Iterable[int], store_id: int) -> int:
+        """Units of a box still in a store (reserved ones included)"""
+        return sum(row.quantity for item_id in set(item_ids) for row in self.box_rows(box_id, item_id, store_id))
+
+    def plan_box(self, box_id: int, contents: List[BoxContent], store_id: int) -> List[Tuple[int, int]]:
+        """
+        (item_id, quantity) to move out of a box: its remaining contents,
+        capped by the unreserved stock of the box's own rows in the store
+        """
+        remaining: Dict[int, int] = {}
+        for content in contents:
+            if content.remaining and content.remaining > 0:
+                remaining[content.item_id] = remaining.get(content.item_id, 0) + content.remaining
+        planned = []
+        for item_id, quantity in remaining.items():
+            available = sum(
+                max(row.quantity - (row.reserved_quantity or 0), 0)
+                for row in self.box_rows(box_id, item_id, store_id)
+            )
+            quantity = min(quantity, available)
+            if quantity > 0:
+                planned.append((item_id, quantity))
+        return planned
+
+    def take_from_box(self, box_id: int, item_id: int, store_id: int, quantity: int) -> List[Allocation]:
+        """
+        Deduct quantity from the item's rows of one box only (never from other
+        boxes). Raises StockError if the box does not hold enough unreserved stock.
+        """
+        allocations = split_fifo(self.box_rows(box_id, item_id, store_id), quantity)
+        self.changed.add((item_id, store_id))
+        return allocations
+
+    def receive(self, allocations: List[Allocation], store_id: int) -> List[Inventory]:
+        """Add taken quantities to a destination store, keeping one row per box"""
+        if not allocations:
+            return []
+        item_id = allocations[0][0].item_id
+        rows = self.rows(item_id, store_id)
+        self.changed.add((item_id, store_id))
+        return receive_allocations(self.db, allocations, store_id, destination_rows=rows)
+
+    def add_row(
+        self,
+        item_id: int,
+        store_id: int,
+        quantity: int,
+        levels: Optional[Tuple[int, int]] = None,
+        box_id: Optional[int] = None,
+        box_reference: Optional[str] = None,
+    ) -> Inventory:
+        """
+        Create a separate inventory row (box check-in keeps one row per box)
+        """
+        min_level, max_level = levels or (DEFAULT_MIN_LEVEL, DEFAULT_MAX_LEVEL)
+        row = Inventory(
+            item_id=item_id,
+            store_id=store_id,
+            quantity=quantity,
+            reserved_quantity=0,
+            min_level=min_level,
+            max_level=max_level,
+            box_id=box_id,
+            box_reference=box_reference,
+        )
+        self.db.add(row)
+        self.rows(item_id, store_id).append(row)
+        self.changed.add((item_id, store_id))
+        return row
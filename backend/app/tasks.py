@@ -0,0 +1,90 @@
+"""
+Background jobs run by app.jobs.job_runner.
+
+Periodic jobs are queued by the runner every interval_seconds (configurable
+through the environment); any job can also be queued on demand with
+app.jobs.enqueue() or POST /api/jobs. Emails are not jobs: they go through
+the outbox (app.email_outbox).
+"""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app import alerts, notification_retention, upload_store
+from app.jobs import job
+from app.models import EmailOutbox, IdempotencyKey, Job
+from app.reservations import expire_reservations
+
+# Stock movements update alerts themselves; this is only a reconcile pass
+STOCK_ALERTS_INTERVAL = int(os.getenv("STOCK_ALERTS_INTERVAL_SECONDS", "21600"))
+PENDING_CHECKIN_ALERTS_INTERVAL = int(os.getenv("PENDING_CHECKIN_ALERTS_INTERVAL_SECONDS", "3600"))
+RESERVATION_SWEEP_INTERVAL = int(os.getenv("RESERVATION_SWEEP_SECONDS", "60"))
+CLEANUP_INTERVAL = int(os.getenv("CLEANUP_INTERVAL_SECONDS", "3600"))
+NOTIFICATION_RETENTION_INTERVAL = int(os.getenv("NOTIFICATION_RETENTION_INTERVAL_SECONDS", "86400"))
+UPLOAD_GC_INTERVAL = int(os.getenv("UPLOAD_GC_INTERVAL_SECONDS", "86400"))
+
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "48"))
+FINISHED_JOB_RETENTION_DAYS = int(os.getenv("FINISHED_JOB_RETENTION_DAYS", "7"))
+SENT_EMAIL_RETENTION_DAYS = int(os.getenv("SENT_EMAIL_RETENTION_DAYS", "30"))
+
+
+@job("generate_stock_alerts", interval_seconds=STOCK_ALERTS_INTERVAL)
+def generate_stock_alerts(db: Session, payload: dict) -> dict:
+    return {"transitions": alerts.generate_stock_alerts(db)}
+
+
+@job("generate_pending_checkin_alerts", interval_seconds=PENDING_CHECKIN_ALERTS_INTERVAL)
+def generate_pending_checkin_alerts(db: Session, payload: dict) -> dict:
+    return {"alerts_created": alerts.generate_pending_checkin_alerts(db)}
+
+
+@job("expire_reservations", interval_seconds=RESERVATION_SWEEP_INTERVAL, max_attempts=1)
+def expire_reservations_job(db: Session, payload: dict) -> dict:
+    expired_count, released_quantity = expire_reservations(db)
+    return {"expired_count": expired_count, "released_quantity": released_quantity}
+
+
+@job("purge_idempotency_keys", interval_seconds=CLEANUP_INTERVAL, max_attempts=1)
+def purge_idempotency_keys(db: Session, payload: dict) -> dict:
+    cutoff = datetime.now() - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+    deleted = db.query(IdempotencyKey).filter(
+        IdempotencyKey.created_at < cutoff
+    ).delete(synchronize_session=False)
+    return {"deleted": deleted}
+
+
+@job("purge_finished_jobs", interval_seconds=CLEANUP_INTERVAL, max_attempts=1)
+def purge_finished_jobs(db: Session, payload: dict) -> dict:
+    cutoff = datetime.now() - timedelta(days=FINISHED_JOB_RETENTION_DAYS)
+    deleted = db.query(Job).filter(
+        Job.status.in_(["succeeded", "failed"]),
+        Job.finished_at < cutoff
+    ).delete(synchronize_session=False)
+    return {"deleted": deleted}
+
+
+@job("purge_notifications", interval_seconds=NOTIFICATION_RETENTION_INTERVAL, max_attempts=1)
+def purge_notifications(db: Session, payload: dict) -> dict:
+    return notification_retention.purge_notifications(
+        db,
+        mode=payload.get("mode", notification_retention.RETENTION_MODE),
+    )
+
+
+@job("purge_email_outbox", interval_seconds=CLEANUP_INTERVAL, max_attempts=1)
+def purge_email_outbox(db: Session, payload: dict) -> dict:
+    cutoff = datetime.now() - timedelta(days=SENT_EMAIL_RETENTION_DAYS)
+    deleted = db.query(EmailOutbox).filter(
+        EmailOutbox.status.in_(["sent", "failed"]),
+        EmailOutbox.created_at < cutoff
+    ).delete(synchronize_session=False)
+    return {"deleted": deleted}
+
+
+@job("gc_uploads", interval_seconds=UPLOAD_GC_INTERVAL, max_attempts=1)
+def gc_uploads(db: Session, payload: dict) -> dict:
+    return upload_store.collect_garbage(
+        db,
+        grace_hours=int(payload.get("grace_hours", upload_store.GC_GRACE_HOURS)),
+    )
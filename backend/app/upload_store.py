@@ -0,0 +1,137 @@
+"""
+Content-addressed upload store.
+
+Files are named after the SHA-256 of the uploaded bytes and sharded by its
+first two byte pairs, so identical uploads are stored once and no directory
+grows beyond a few entries:
+    uploads/profiles/ab/cd/abcd...<64 hex>.jpg
+    uploads/profiles/ab/cd/abcd...<64 hex>_256.webp   (variants share the prefix)
+
+Each stored set of files is recorded in upload_blobs. References are not
+counted separately: a blob is in use while some User.profile_photo equals
+its url, so the count can never drift from the data. collect_garbage() finds
+unreferenced blobs with one anti-join (no directory listing) and deletes
+their files, skipping blobs uploaded within the grace period so an upload
+between writing its files and saving the user is never collected.
+"""
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import UploadBlob, User
+from app.uploads import UPLOADS_DIR
+
+PROFILE_PHOTO_DIR = UPLOADS_DIR / "profiles"
+PROFILE_PHOTO_URL = "/uploads/profiles"
+
+GC_GRACE_HOURS = int(os.getenv("UPLOAD_GC_GRACE_HOURS", "24"))
+GC_BATCH_SIZE = 200
+
+_BLOB_URL = re.compile(r"^/uploads/profiles/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.jpg$")
+
+
+def shard_dir(digest: str) -> Path:
+    return PROFILE_PHOTO_DIR / digest[:2] / digest[2:4]
+
+
+def blob_path(digest: str, suffix: str) -> Path:
+    """Path of one file of a blob, e.g. suffix ".jpg" or "_256.webp" """
+    return shard_dir(digest) / f"{digest}{suffix}"
+
+
+def blob_url(digest: str, suffix: str) -> str:
+    return f"{PROFILE_PHOTO_URL}/{digest[:2]}/{digest[2:4]}/{digest}{suffix}"
+
+
+def digest_from_url(url: Optional[str]) -> Optional[str]:
+    """Digest of a stored profile photo url (None for legacy / external urls)"""
+    match = _BLOB_URL.match(url or "")
+    return match.group(1) if match else None
+
+
+def register_blob(db: Session, digest: str, url: str, size_bytes: int, file_count: int, kind: str = "profile_photo"):
+    """Record a stored blob, or mark an existing one as just used (the caller commits)"""
+    now = datetime.now()
+    blob = db.get(UploadBlob, digest)
+    if blob is None:
+        try:
+            with db.begin_nested():
+                db.add(UploadBlob(
+                    digest=digest, kind=kind, url=url, size_bytes=size_bytes,
+                    file_count=file_count, created_at=now, last_used_at=now,
+                ))
+            return
+        except IntegrityError:
+            # Same content registered concurrently
+            blob = db.get(UploadBlob, digest)
+    blob.last_used_at = now
+
+
+def collect_garbage(db: Session, grace_hours: int = GC_GRACE_HOURS, batch_size: int = GC_BATCH_SIZE) -> dict:
+    """
+    Delete unreferenced blobs not used for grace_hours, batch by batch (one
+    commit each). Returns blobs / files / bytes removed and the time taken.
+    """
+    started = time.perf_counter()
+    cutoff = datetime.now() - timedelta(hours=grace_hours)
+    removed_blobs = removed_files = removed_bytes = 0
+
+    while True:
+        batch = [digest for (digest,) in db.query(UploadBlob.digest).outerjoin(
+            User, User.profile_photo == UploadBlob.url
+        ).filter(
+            User.user_id.is_(None),
+            UploadBlob.last_used_at < cutoff
+        ).order_by(UploadBlob.last_used_at.asc()).limit(batch_size)]
+        if not batch:
+            break
+
+        for digest in batch:
+            # Conditional delete: skipped if the blob was uploaded again meanwhile
+            deleted = db.query(UploadBlob).filter(
+                UploadBlob.digest == digest,
+                UploadBlob.last_used_at < cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+            if not deleted:
+                continue
+
+            directory = shard_dir(digest)
+            for path in directory.glob(f"{digest}*"):
+                try:
+                    size = path.stat().st_size
+                    path.unlink()
+                except FileNotFoundError:
+                    continue
+                removed_files += 1
+                removed_bytes += size
+            _remove_empty_dirs(directory)
+            removed_blobs += 1
+
+        if len(batch) < batch_size:
+            break
+
+    duration_ms = int((time.perf_counter() - started) * 1000)
+    if removed_blobs:
+        print(f"[Upload Store] Removed {removed_blobs} unreferenced blobs ({removed_files} files, {removed_bytes} bytes) in {duration_ms} ms")
+    return {
+        "removed_blobs": removed_blobs,
+        "removed_files": removed_files,
+        "removed_bytes": removed_bytes,
+        "duration_ms": duration_ms,
+    }
+
+
+def _remove_empty_dirs(directory: Path):
+    # Shard directories are created on demand; drop them again once empty
+    for path in (directory, directory.parent):
+        try:
+            path.rmdir()
+        except OSError:
+            break
@@ -0,0 +1,122 @@
+"""
+Serving of user uploads (/uploads/...) with CORS, caching and Range support.
+
+Allowed origins are normalised once (lowercase, without "www.") into a set,
+so matching an image request's origin is one set lookup instead of a scan of
+CORS_ORIGINS with string rewriting per entry.
+
+Responses carry a strong ETag (file mtime + size) and Last-Modified, and
+If-None-Match / If-Modified-Since are answered with 304 without opening the
+file. Files whose name contains a content hash or random hex id (profile
+photos, generated variants) are never overwritten - a new upload gets a new
+name - so they are sent with "Cache-Control: immutable" and browsers skip
+revalidation entirely; other files must be revalidated (cheap 304s). Range
+requests (including multi-range and If-Range) are handled by Starlette's
+FileResponse.
+"""
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Iterable, Optional
+from urllib.parse import unquote, urlsplit
+
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response
+
+UPLOADS_DIR = Path(__file__).parent.parent / "uploads"
+
+# Used when the request's origin is not allowed (images must always load on the main site)
+DEFAULT_ORIGIN = "https://jabilinventory.store"
+
+# A path segment containing a hex digest / uuid4 hex: the name is never reused
+CONTENT_ADDRESSED = re.compile(r"(?:^|[/._-])[0-9a-f]{16,64}(?:[._-]|$)")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+def _normalize_origin(origin: str) -> str:
+    return origin.lower().replace("www.", "", 1)
+
+
+class OriginMatcher:
+    """CORS origin check with the allowed list compiled once"""
+
+    def __init__(self, origins: Iterable[str], default: str = DEFAULT_ORIGIN):
+        origins = [origin for origin in origins if origin]
+        self._exact = frozenset(origins)
+        self._normalized = frozenset(_normalize_origin(origin) for origin in origins)
+        self.default = default
+
+    def match(self, origin: Optional[str]) -> str:
+        """The origin to echo in Access-Control-Allow-Origin (allowed, with or without www)"""
+        if origin and (origin in self._exact or _normalize_origin(origin) in self._normalized):
+            return origin
+        return self.default
+
+    def for_request(self, request: Request) -> str:
+        origin = request.headers.get("origin")
+        if not origin:
+            # Plain <img> requests send no Origin - fall back to the Referer
+            referer = request.headers.get("referer")
+            if referer:
+                parts = urlsplit(referer)
+                if parts.scheme and parts.netloc:
+                    origin = f"{parts.scheme}://{parts.netloc}"
+        return self.match(origin)
+
+    def headers(self, request: Request) -> dict:
+        return {
+            "Access-Control-Allow-Origin": self.for_request(request),
+            "Access-Control-Allow-Credentials": "true",
+            "Access-Control-Allow-Methods": "GET, OPTIONS, HEAD",
+            "Access-Control-Allow-Headers": "*",
+            "Vary": "Origin",  # Important for CORS caching
+        }
+
+
+_uploads_root = os.path.realpath(UPLOADS_DIR)
+
+
+def resolve_upload(file_path: str) -> str:
+    """Absolute path of an upload (403 outside the uploads directory, 404 if missing)"""
+    full_path = os.path.realpath(os.path.join(_uploads_root, unquote(file_path)))
+    if os.path.commonpath([full_path, _uploads_root]) != _uploads_root:
+        raise HTTPException(status_code=403, detail="Access denied")
+    if not os.path.isfile(full_path):
+        raise HTTPException(status_code=404, detail="File not found")
+    return full_path
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Takes precedence over If-Modified-Since (RFC 9110 13.2.2); weak comparison
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def serve_upload(file_path: str, request: Request, origins: OriginMatcher) -> Response:
+    full_path = resolve_upload(file_path)
+    stat_result = os.stat(full_path)
+
+    etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+    headers = origins.headers(request)
+    headers["ETag"] = etag
+    headers["Last-Modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+    headers["Cache-Control"] = (
+        IMMUTABLE_CACHE_CONTROL if CONTENT_ADDRESSED.search(file_path) else REVALIDATE_CACHE_CONTROL
+    )
+
+    if _not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(path=full_path, stat_result=stat_result, headers=headers)
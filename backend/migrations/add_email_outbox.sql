@@ -0,0 +1,28 @@
+-- Email outbox (app/email_outbox.py)
+-- Emails are queued in the request's transaction and delivered by the
+-- background sender in batches over one reused SMTP connection, with
+-- retries and exponential backoff. Replaces the send_welcome_email job.
+
+CREATE TABLE `email_outbox` (
+  `email_id` int(11) NOT NULL AUTO_INCREMENT,
+  `to_email` varchar(255) NOT NULL,
+  `template` varchar(50) NOT NULL,
+  `context` longtext CHARACTER SET utf8mb4 COLLATE utf8mb4_bin DEFAULT NULL CHECK (json_valid(`context`)),
+  `sensitive` tinyint(1) DEFAULT 0,
+  `status` varchar(20) NOT NULL DEFAULT 'queued',
+  `attempts` int(11) NOT NULL DEFAULT 0,
+  `max_attempts` int(11) NOT NULL DEFAULT 5,
+  `next_attempt_at` timestamp NOT NULL DEFAULT current_timestamp(),
+  `claim_token` varchar(36) DEFAULT NULL,
+  `claimed_at` timestamp NULL DEFAULT NULL,
+  `last_error` text DEFAULT NULL,
+  `created_by` varchar(100) DEFAULT NULL,
+  `created_at` timestamp NULL DEFAULT current_timestamp(),
+  `sent_at` timestamp NULL DEFAULT NULL,
+  PRIMARY KEY (`email_id`),
+  KEY `ix_email_outbox_status_next_attempt` (`status`, `next_attempt_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- Welcome emails still waiting as background jobs have no handler any more
+UPDATE `jobs` SET `status` = 'failed', `error` = 'Moved to email_outbox', `payload` = NULL, `finished_at` = current_timestamp()
+WHERE `job_name` = 'send_welcome_email' AND `status` IN ('queued', 'running');
@@ -0,0 +1,17 @@
+-- Idempotency-Key support for POST /api/items/transactions
+-- One row per (scope, user, key) holding the original response for replay on retry.
+-- Keys are scoped per user: another user's key never replays their response.
+
+CREATE TABLE `idempotency_keys` (
+  `id` int(11) NOT NULL AUTO_INCREMENT,
+  `scope` varchar(100) NOT NULL,
+  `idempotency_key` varchar(100) NOT NULL,
+  `request_hash` varchar(64) NOT NULL,
+  `status_code` int(11) NOT NULL,
+  `response_body` longtext CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL CHECK (json_valid(`response_body`)),
+  `created_by` varchar(100) NOT NULL,
+  `created_at` timestamp NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_idempotency_keys_scope_user_key` (`scope`, `created_by`, `idempotency_key`),
+  KEY `ix_idempotency_keys_created_at` (`created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,29 @@
+-- Multi-line issuance documents (POST /api/issuances)
+-- Issuance lines are stock_transactions rows with reference_type = 'ISSUANCE'
+-- and reference_number = issuance_number.
+
+CREATE TABLE `issuances` (
+  `issuance_id` int(11) NOT NULL AUTO_INCREMENT,
+  `issuance_number` varchar(50) NOT NULL,
+  `store_id` int(11) DEFAULT NULL,
+  `employee_name` varchar(100) DEFAULT NULL,
+  `employee_id` varchar(50) DEFAULT NULL,
+  `department` varchar(100) DEFAULT NULL,
+  `reference_number` varchar(100) DEFAULT NULL,
+  `reason` text DEFAULT NULL,
+  `notes` text DEFAULT NULL,
+  `line_count` int(11) NOT NULL DEFAULT 0,
+  `total_quantity` int(11) NOT NULL DEFAULT 0,
+  `created_by` varchar(100) DEFAULT NULL,
+  `created_at` timestamp NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`issuance_id`),
+  UNIQUE KEY `ix_issuances_issuance_number` (`issuance_number`),
+  KEY `ix_issuances_store_id` (`store_id`),
+  KEY `ix_issuances_employee_id` (`employee_id`),
+  KEY `ix_issuances_created_at` (`created_at`),
+  CONSTRAINT `issuances_store_fk` FOREIGN KEY (`store_id`) REFERENCES `stores` (`store_id`) ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- Loading all lines of a document (issuance, box check-in) by reference
+ALTER TABLE `stock_transactions`
+  ADD KEY `ix_stock_transactions_reference` (`reference_type`, `reference_number`);
@@ -0,0 +1,24 @@
+-- Background jobs (app/jobs.py runner, handlers in app/tasks.py)
+-- Periodic alert generation, reservation expiry, cleanup and queued emails.
+-- Jobs are claimed with UPDATE ... SET status = 'running' WHERE status = 'queued',
+-- so several app processes can share the table.
+
+CREATE TABLE `jobs` (
+  `job_id` int(11) NOT NULL AUTO_INCREMENT,
+  `job_name` varchar(100) NOT NULL,
+  `status` varchar(20) NOT NULL DEFAULT 'queued',
+  `payload` longtext CHARACTER SET utf8mb4 COLLATE utf8mb4_bin DEFAULT NULL CHECK (json_valid(`payload`)),
+  `result` longtext CHARACTER SET utf8mb4 COLLATE utf8mb4_bin DEFAULT NULL CHECK (json_valid(`result`)),
+  `error` text DEFAULT NULL,
+  `attempts` int(11) NOT NULL DEFAULT 0,
+  `max_attempts` int(11) NOT NULL DEFAULT 3,
+  `run_after` timestamp NOT NULL DEFAULT current_timestamp(),
+  `started_at` timestamp NULL DEFAULT NULL,
+  `finished_at` timestamp NULL DEFAULT NULL,
+  `duration_ms` int(11) DEFAULT NULL,
+  `created_by` varchar(100) DEFAULT NULL,
+  `created_at` timestamp NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`job_id`),
+  KEY `ix_jobs_status_run_after` (`status`, `run_after`),
+  KEY `ix_jobs_name_created` (`job_name`, `created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,25 @@
+-- Per-user notification read state (app/api/notifications.py)
+-- Global notifications (user_id IS NULL) used to share one status column, so
+-- one user marking them read marked them read for everyone. A receipt row now
+-- records that one user has read one notification; notifications.status is
+-- only set to 'read' when a notification is closed for everyone (resolved
+-- stock alerts).
+
+CREATE TABLE `notification_receipts` (
+  `user_id` int(11) NOT NULL,
+  `notification_id` int(11) NOT NULL,
+  `read_at` timestamp NOT NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`user_id`, `notification_id`),
+  KEY `ix_notification_receipts_notification` (`notification_id`),
+  CONSTRAINT `notification_receipts_user_fk` FOREIGN KEY (`user_id`) REFERENCES `users` (`user_id`) ON DELETE CASCADE,
+  CONSTRAINT `notification_receipts_notification_fk` FOREIGN KEY (`notification_id`) REFERENCES `notifications` (`notification_id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- Unread counts per audience are answered from this index alone, anti-joined
+-- with the receipts primary key
+ALTER TABLE `notifications`
+  ADD INDEX `ix_notifications_user_status` (`user_id`, `status`, `notification_id`);
+
+-- Notifications already marked read stay read: user notifications were only
+-- visible to their owner, and global ones can no longer be told apart by
+-- reader, so they are treated as closed for everyone.
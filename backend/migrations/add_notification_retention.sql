@@ -0,0 +1,40 @@
+-- Notification retention (app/notification_retention.py)
+-- The daily "purge_notifications" job removes notifications older than the
+-- TTL of their type in batches of NOTIFICATION_RETENTION_BATCH_SIZE rows.
+-- With NOTIFICATION_RETENTION_MODE=archive the rows are copied here first.
+
+CREATE TABLE `notifications_archive` (
+  `notification_id` int(11) NOT NULL,
+  `user_id` int(11) DEFAULT NULL,
+  `type` enum('low_stock','out_of_stock','pending_checkin','transaction','system','info','warning','error') NOT NULL,
+  `title` varchar(200) NOT NULL,
+  `message` text NOT NULL,
+  `status` enum('unread','read') DEFAULT 'unread',
+  `link` varchar(500) DEFAULT NULL,
+  `notification_data` longtext CHARACTER SET utf8mb4 COLLATE utf8mb4_bin DEFAULT NULL CHECK (json_valid(`notification_data`)),
+  `created_at` timestamp NULL DEFAULT NULL,
+  `read_at` timestamp NULL DEFAULT NULL,
+  `archived_at` timestamp NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`notification_id`),
+  KEY `ix_notifications_archive_user_id` (`user_id`),
+  KEY `ix_notifications_archive_created_at` (`created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- Optional: monthly range partitioning of the archive, so old months can be
+-- dropped instantly (ALTER TABLE ... DROP PARTITION p2025_01) instead of
+-- deleted row by row. The partition key has to be part of the primary key.
+-- notifications itself is not partitioned: InnoDB does not allow foreign
+-- keys on partitioned tables, and notification_receipts and
+-- stock_alert_states reference it. Batched retention keeps it small instead.
+--
+-- ALTER TABLE `notifications_archive`
+--   MODIFY `created_at` timestamp NOT NULL DEFAULT '1970-01-01 00:00:01',
+--   DROP PRIMARY KEY,
+--   ADD PRIMARY KEY (`notification_id`, `created_at`);
+-- ALTER TABLE `notifications_archive`
+--   PARTITION BY RANGE (UNIX_TIMESTAMP(`created_at`)) (
+--     PARTITION p2025_01 VALUES LESS THAN (UNIX_TIMESTAMP('2025-02-01')),
+--     PARTITION p2025_02 VALUES LESS THAN (UNIX_TIMESTAMP('2025-03-01')),
+--     PARTITION pmax VALUES LESS THAN MAXVALUE
+--   );
+-- New months are split off pmax with REORGANIZE PARTITION.
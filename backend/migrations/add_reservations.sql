@@ -0,0 +1,35 @@
+-- Stock reservations (POST /api/reservations)
+-- Held quantities are added to inventory.reserved_quantity of the rows listed
+-- in `allocations`; stock-outs and transfers only take quantity - reserved_quantity.
+-- Active holds past expires_at are released by the background sweeper
+-- (RESERVATION_SWEEP_SECONDS, default 60).
+
+CREATE TABLE `reservations` (
+  `reservation_id` int(11) NOT NULL AUTO_INCREMENT,
+  `item_id` int(11) NOT NULL,
+  `store_id` int(11) NOT NULL,
+  `box_id` int(11) DEFAULT NULL,
+  `quantity` int(11) NOT NULL,
+  `status` varchar(20) NOT NULL DEFAULT 'active',
+  `allocations` longtext CHARACTER SET utf8mb4 COLLATE utf8mb4_bin DEFAULT NULL CHECK (json_valid(`allocations`)),
+  `expires_at` timestamp NOT NULL,
+  `reference_number` varchar(100) DEFAULT NULL,
+  `employee_name` varchar(100) DEFAULT NULL,
+  `employee_id` varchar(50) DEFAULT NULL,
+  `department` varchar(100) DEFAULT NULL,
+  `notes` text DEFAULT NULL,
+  `transaction_id` int(11) DEFAULT NULL,
+  `created_by` varchar(100) DEFAULT NULL,
+  `created_at` timestamp NULL DEFAULT current_timestamp(),
+  `closed_at` timestamp NULL DEFAULT NULL,
+  `closed_by` varchar(100) DEFAULT NULL,
+  PRIMARY KEY (`reservation_id`),
+  KEY `ix_reservations_item_store_status` (`item_id`, `store_id`, `status`),
+  KEY `ix_reservations_status_expires` (`status`, `expires_at`),
+  KEY `ix_reservations_reference_number` (`reference_number`),
+  KEY `ix_reservations_employee_id` (`employee_id`),
+  CONSTRAINT `reservations_item_fk` FOREIGN KEY (`item_id`) REFERENCES `items` (`item_id`) ON DELETE CASCADE,
+  CONSTRAINT `reservations_store_fk` FOREIGN KEY (`store_id`) REFERENCES `stores` (`store_id`) ON DELETE CASCADE,
+  CONSTRAINT `reservations_box_fk` FOREIGN KEY (`box_id`) REFERENCES `boxes` (`box_id`) ON DELETE SET NULL,
+  CONSTRAINT `reservations_transaction_fk` FOREIGN KEY (`transaction_id`) REFERENCES `stock_transactions` (`transaction_id`) ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,6 @@
+-- Indexes for QR/barcode scan resolution (/api/scan/resolve)
+-- items.qr_code already has a UNIQUE key in hr_store_inventory.sql;
+-- items.barcode had no index at all.
+
+ALTER TABLE `items`
+  ADD KEY `ix_items_barcode` (`barcode`);
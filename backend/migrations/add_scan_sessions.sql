@@ -0,0 +1,42 @@
+-- Offline scan session sync (POST /api/scan/sessions)
+-- scan_events.idempotency_key is UNIQUE so re-sent events are never applied twice.
+
+CREATE TABLE `scan_sessions` (
+  `session_id` int(11) NOT NULL AUTO_INCREMENT,
+  `client_session_id` varchar(100) DEFAULT NULL,
+  `device_id` varchar(100) DEFAULT NULL,
+  `store_id` int(11) DEFAULT NULL,
+  `event_count` int(11) NOT NULL DEFAULT 0,
+  `applied_count` int(11) NOT NULL DEFAULT 0,
+  `duplicate_count` int(11) NOT NULL DEFAULT 0,
+  `failed_count` int(11) NOT NULL DEFAULT 0,
+  `created_by` varchar(100) DEFAULT NULL,
+  `created_at` timestamp NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`session_id`),
+  KEY `ix_scan_sessions_client_session_id` (`client_session_id`),
+  CONSTRAINT `scan_sessions_store_fk` FOREIGN KEY (`store_id`) REFERENCES `stores` (`store_id`) ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+CREATE TABLE `scan_events` (
+  `event_id` int(11) NOT NULL AUTO_INCREMENT,
+  `session_id` int(11) NOT NULL,
+  `idempotency_key` varchar(100) NOT NULL,
+  `event_type` varchar(50) NOT NULL,
+  `code` varchar(100) NOT NULL,
+  `entity_type` varchar(20) DEFAULT NULL,
+  `entity_id` int(11) DEFAULT NULL,
+  `quantity` int(11) DEFAULT NULL,
+  `from_store_id` int(11) DEFAULT NULL,
+  `to_store_id` int(11) DEFAULT NULL,
+  `status` varchar(20) NOT NULL,
+  `message` varchar(500) DEFAULT NULL,
+  `transaction_ids` longtext CHARACTER SET utf8mb4 COLLATE utf8mb4_bin DEFAULT NULL CHECK (json_valid(`transaction_ids`)),
+  `scanned_at` timestamp NULL DEFAULT NULL,
+  `created_at` timestamp NULL DEFAULT current_timestamp(),
+  `updated_at` timestamp NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+  PRIMARY KEY (`event_id`),
+  UNIQUE KEY `ix_scan_events_idempotency_key` (`idempotency_key`),
+  KEY `ix_scan_events_session_id` (`session_id`),
+  KEY `ix_scan_events_status` (`status`),
+  CONSTRAINT `scan_events_session_fk` FOREIGN KEY (`session_id`) REFERENCES `scan_sessions` (`session_id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,34 @@
+-- Incremental low / out of stock alerts (app/alerts.py update_stock_alerts)
+-- One row per item/store pair that is currently low or out of stock; pairs
+-- that are ok have no row. Stock write paths re-evaluate only the pairs they
+-- touched and create / resolve notifications on a state transition.
+
+CREATE TABLE `stock_alert_states` (
+  `item_id` int(11) NOT NULL,
+  `store_id` int(11) NOT NULL,
+  `state` varchar(10) NOT NULL,
+  `quantity` int(11) NOT NULL DEFAULT 0,
+  `notification_id` int(11) DEFAULT NULL,
+  `changed_at` timestamp NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`item_id`, `store_id`),
+  KEY `stock_alert_states_store_fk` (`store_id`),
+  KEY `stock_alert_states_notification_fk` (`notification_id`),
+  CONSTRAINT `stock_alert_states_item_fk` FOREIGN KEY (`item_id`) REFERENCES `items` (`item_id`) ON DELETE CASCADE,
+  CONSTRAINT `stock_alert_states_store_fk` FOREIGN KEY (`store_id`) REFERENCES `stores` (`store_id`) ON DELETE CASCADE,
+  CONSTRAINT `stock_alert_states_notification_fk` FOREIGN KEY (`notification_id`) REFERENCES `notifications` (`notification_id`) ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- Seed from unread alerts created by the old full-scan generator so they are
+-- resolved on the next movement instead of being duplicated
+INSERT IGNORE INTO `stock_alert_states` (`item_id`, `store_id`, `state`, `quantity`, `notification_id`)
+SELECT
+  JSON_VALUE(n.`notification_data`, '$.item_id'),
+  JSON_VALUE(n.`notification_data`, '$.store_id'),
+  IF(n.`type` = 'out_of_stock', 'out', 'low'),
+  COALESCE(JSON_VALUE(n.`notification_data`, '$.quantity'), 0),
+  MAX(n.`notification_id`)
+FROM `notifications` n
+JOIN `items` i ON i.`item_id` = JSON_VALUE(n.`notification_data`, '$.item_id')
+JOIN `stores` s ON s.`store_id` = JSON_VALUE(n.`notification_data`, '$.store_id')
+WHERE n.`type` IN ('low_stock', 'out_of_stock') AND n.`status` = 'unread'
+GROUP BY 1, 2, 3, 4;
@@ -0,0 +1,31 @@
+-- Per-size stock thresholds as rows instead of the item_types.size_stock_levels JSON
+-- The effective min/max level of an item (its size row, else the item type
+-- defaults) is computed in SQL by joining this table (app/stock.py
+-- with_stock_thresholds), so low-stock filters and alerts are set-based and
+-- no longer use the Inventory.min_level copied at check-in.
+-- Run migrations/normalize_item_type_json.sql first. Needs MariaDB 10.6+ (JSON_TABLE).
+
+CREATE TABLE `type_size_thresholds` (
+  `type_id` int(11) NOT NULL,
+  `size` varchar(20) NOT NULL,
+  `min_level` int(11) NOT NULL,
+  `max_level` int(11) NOT NULL,
+  `updated_at` timestamp NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+  PRIMARY KEY (`type_id`, `size`),
+  CONSTRAINT `type_size_thresholds_ibfk_1` FOREIGN KEY (`type_id`) REFERENCES `item_types` (`type_id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- One row per key of the JSON object; entries without a numeric min and max are dropped
+INSERT INTO `type_size_thresholds` (`type_id`, `size`, `min_level`, `max_level`)
+SELECT t.`type_id`, s.`size`,
+       CAST(JSON_VALUE(t.`size_stock_levels`, CONCAT('$."', s.`size`, '".min')) AS INTEGER),
+       CAST(JSON_VALUE(t.`size_stock_levels`, CONCAT('$."', s.`size`, '".max')) AS INTEGER)
+FROM `item_types` t,
+     JSON_TABLE(JSON_KEYS(t.`size_stock_levels`), '$[*]' COLUMNS (`size` varchar(20) PATH '$')) s
+WHERE JSON_TYPE(t.`size_stock_levels`) = 'OBJECT'
+  AND JSON_VALUE(t.`size_stock_levels`, CONCAT('$."', s.`size`, '".min')) IS NOT NULL
+  AND JSON_VALUE(t.`size_stock_levels`, CONCAT('$."', s.`size`, '".max')) IS NOT NULL;
+
+ALTER TABLE `item_types`
+  DROP CONSTRAINT `ck_item_types_size_stock_levels_object`,
+  DROP COLUMN `size_stock_levels`;
@@ -0,0 +1,22 @@
+-- Content-addressed upload store (app/upload_store.py)
+-- Profile photos are stored once per distinct content under
+-- uploads/profiles/<2 hex>/<2 hex>/<sha256>*.{jpg,webp}; upload_blobs records
+-- each stored set so the gc_uploads job can delete unreferenced ones.
+-- Existing photos are moved into the store with
+--   python scripts/migrate_uploads_to_store.py [--dry-run] [--delete-legacy]
+
+CREATE TABLE `upload_blobs` (
+  `digest` varchar(64) NOT NULL,
+  `kind` varchar(20) NOT NULL DEFAULT 'profile_photo',
+  `url` varchar(500) NOT NULL,
+  `size_bytes` int(11) NOT NULL DEFAULT 0,
+  `file_count` int(11) NOT NULL DEFAULT 0,
+  `created_at` timestamp NULL DEFAULT current_timestamp(),
+  `last_used_at` timestamp NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`digest`),
+  UNIQUE KEY `url` (`url`),
+  KEY `ix_upload_blobs_last_used_at` (`last_used_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- The GC anti-join looks up users by photo url
+CREATE INDEX `ix_users_profile_photo` ON `users` (`profile_photo`);
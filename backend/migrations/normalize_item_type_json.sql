@@ -0,0 +1,38 @@
+-- Native JSON values for item type configuration (app/json_types.py)
+-- Older code stored the JSON *text* of available_sizes, available_colors and
+-- size_stock_levels, so some rows hold a JSON string (sometimes encoded twice)
+-- instead of an array / object. Unwrap those values, then make the column
+-- checks reject anything but the expected JSON shape.
+-- The statements are idempotent; the unwrap UPDATEs can be re-run until they
+-- report 0 rows (two passes cover rows encoded twice).
+
+UPDATE `item_types` SET `available_sizes` = JSON_UNQUOTE(`available_sizes`)
+WHERE JSON_TYPE(`available_sizes`) = 'STRING' AND JSON_VALID(JSON_UNQUOTE(`available_sizes`));
+UPDATE `item_types` SET `available_sizes` = JSON_UNQUOTE(`available_sizes`)
+WHERE JSON_TYPE(`available_sizes`) = 'STRING' AND JSON_VALID(JSON_UNQUOTE(`available_sizes`));
+
+UPDATE `item_types` SET `available_colors` = JSON_UNQUOTE(`available_colors`)
+WHERE JSON_TYPE(`available_colors`) = 'STRING' AND JSON_VALID(JSON_UNQUOTE(`available_colors`));
+UPDATE `item_types` SET `available_colors` = JSON_UNQUOTE(`available_colors`)
+WHERE JSON_TYPE(`available_colors`) = 'STRING' AND JSON_VALID(JSON_UNQUOTE(`available_colors`));
+
+UPDATE `item_types` SET `size_stock_levels` = JSON_UNQUOTE(`size_stock_levels`)
+WHERE JSON_TYPE(`size_stock_levels`) = 'STRING' AND JSON_VALID(JSON_UNQUOTE(`size_stock_levels`));
+UPDATE `item_types` SET `size_stock_levels` = JSON_UNQUOTE(`size_stock_levels`)
+WHERE JSON_TYPE(`size_stock_levels`) = 'STRING' AND JSON_VALID(JSON_UNQUOTE(`size_stock_levels`));
+
+-- Anything still not of the expected type is unusable: reset it
+UPDATE `item_types` SET `available_sizes` = '[]'
+WHERE `available_sizes` IS NULL OR JSON_TYPE(`available_sizes`) <> 'ARRAY';
+UPDATE `item_types` SET `available_colors` = '[]'
+WHERE `available_colors` IS NULL OR JSON_TYPE(`available_colors`) <> 'ARRAY';
+UPDATE `item_types` SET `size_stock_levels` = NULL
+WHERE JSON_TYPE(`size_stock_levels`) <> 'OBJECT' OR JSON_LENGTH(`size_stock_levels`) = 0;
+
+ALTER TABLE `item_types`
+  ADD CONSTRAINT `ck_item_types_available_sizes_array`
+    CHECK (`available_sizes` IS NULL OR JSON_TYPE(`available_sizes`) = 'ARRAY'),
+  ADD CONSTRAINT `ck_item_types_available_colors_array`
+    CHECK (`available_colors` IS NULL OR JSON_TYPE(`available_colors`) = 'ARRAY'),
+  ADD CONSTRAINT `ck_item_types_size_stock_levels_object`
+    CHECK (`size_stock_levels` IS NULL OR JSON_TYPE(`size_stock_levels`) = 'OBJECT');
@@ -0,0 +1,171 @@
+"""
+Benchmark: N single transfers vs one bulk transfer.
+
+Creates a throwaway plant with two stores and N items stocked in the first
+store, then moves one unit of every item to the second store twice:
+
+    single  N calls of POST /api/items/transactions (transfer_out)
+    bulk    one call of POST /api/items/transactions/bulk-transfer with N lines
+
+The endpoint functions are called directly (no HTTP layer) with one database
+session each; SQL statements are counted with a cursor execute listener.
+The test rows are removed afterwards.
+
+Usage (from the backend directory, against the configured DATABASE_URL):
+    python scripts/benchmark_bulk_transfer.py --lines 500
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import event  # noqa: E402
+
+from app.database import SessionLocal, engine, Base  # noqa: E402
+from app.models import Plant, Store, Item, Inventory, StockTransaction  # noqa: E402
+from app.schemas import StockTransactionCreate, BulkTransferCreate  # noqa: E402
+from app.api.items import create_stock_transaction, bulk_transfer  # noqa: E402
+
+BENCHMARK_USER = SimpleNamespace(username="benchmark")
+
+
+def create_fixture(lines: int):
+    db = SessionLocal()
+    try:
+        suffix = uuid.uuid4().hex[:8].upper()
+        plant = Plant(plant_code=f"BENCH-{suffix}", plant_name="Benchmark Plant")
+        db.add(plant)
+        db.flush()
+        from_store = Store(plant_id=plant.plant_id, store_code=f"BENCH-{suffix}-A", store_name="Benchmark Store A")
+        to_store = Store(plant_id=plant.plant_id, store_code=f"BENCH-{suffix}-B", store_name="Benchmark Store B")
+        items = [Item(item_code=f"BENCH-{suffix}-{n:05d}", item_name="Benchmark Item") for n in range(lines)]
+        db.add_all([from_store, to_store, *items])
+        db.flush()
+        db.add_all([
+            Inventory(item_id=item.item_id, store_id=from_store.store_id, quantity=10, reserved_quantity=0)
+            for item in items
+        ])
+        db.commit()
+        return plant.plant_id, from_store.store_id, to_store.store_id, [item.item_id for item in items]
+    finally:
+        db.close()
+
+
+def drop_fixture(plant_id: int, item_ids: list):
+    db = SessionLocal()
+    try:
+        db.query(StockTransaction).filter(StockTransaction.item_id.in_(item_ids)).delete(synchronize_session=False)
+        db.query(Inventory).filter(Inventory.item_id.in_(item_ids)).delete(synchronize_session=False)
+        db.query(Item).filter(Item.item_id.in_(item_ids)).delete(synchronize_session=False)
+        db.query(Store).filter(Store.plant_id == plant_id).delete(synchronize_session=False)
+        db.query(Plant).filter(Plant.plant_id == plant_id).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self)
+
+
+def run_single(from_store_id: int, to_store_id: int, item_ids: list):
+    async def transfer_all():
+        for item_id in item_ids:
+            db = SessionLocal()
+            try:
+                await create_stock_transaction(
+                    StockTransactionCreate(
+                        transaction_type="transfer_out",
+                        item_id=item_id,
+                        from_store_id=from_store_id,
+                        to_store_id=to_store_id,
+                        quantity=1,
+                    ),
+                    idempotency_key=None,
+                    db=db,
+                    current_user=BENCHMARK_USER,
+                )
+            finally:
+                db.close()
+
+    asyncio.run(transfer_all())
+
+
+def run_bulk(from_store_id: int, to_store_id: int, item_ids: list):
+    db = SessionLocal()
+    try:
+        bulk_transfer(
+            BulkTransferCreate(
+                from_store_id=from_store_id,
+                to_store_id=to_store_id,
+                lines=[{"item_id": item_id, "quantity": 1} for item_id in item_ids],
+            ),
+            db=db,
+            current_user=BENCHMARK_USER,
+        )
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=500, help="Number of items / transfer lines (default 500)")
+    parser.add_argument("--keep", action="store_true", help="Keep the test rows afterwards")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    plant_id, from_store_id, to_store_id, item_ids = create_fixture(args.lines)
+
+    try:
+        results = {}
+        for name, run in (("single", run_single), ("bulk", run_bulk)):
+            with StatementCounter() as counter:
+                started = time.perf_counter()
+                run(from_store_id, to_store_id, item_ids)
+                elapsed = time.perf_counter() - started
+            results[name] = (elapsed, counter.count)
+            print(f"[Benchmark] {name:>6}: {args.lines} lines in {elapsed:.3f}s, {counter.count} SQL statements")
+
+        db = SessionLocal()
+        try:
+            moved = db.query(Inventory).filter(
+                Inventory.item_id.in_(item_ids),
+                Inventory.store_id == to_store_id,
+                Inventory.quantity == 2
+            ).count()
+        finally:
+            db.close()
+
+        single_elapsed, single_statements = results["single"]
+        bulk_elapsed, bulk_statements = results["bulk"]
+        print(
+            f"[Benchmark] bulk is {single_elapsed / max(bulk_elapsed, 1e-9):.1f}x faster, "
+            f"{single_statements / max(bulk_statements, 1):.1f}x fewer statements"
+        )
+        passed = moved == args.lines
+        print("[Benchmark] PASS" if passed else f"[Benchmark] FAIL (expected {args.lines} items with 2 units in store B, got {moved})")
+        return 0 if passed else 1
+    finally:
+        if not args.keep:
+            drop_fixture(plant_id, item_ids)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Benchmark of list response serialization, per 1000 rows.
+
+Compares for inventory, box and stock transaction rows:
+    pydantic   what the endpoints did before: a response object per row
+               (InventoryResponse(**data) / BoxResponse(**data), or the ORM
+               row for transactions), validated again and serialised through
+               the route's response_model (List[...] TypeAdapter, JSON bytes)
+    fast       app.serializers: row dicts rendered by FastJSONResponse
+               (inventory: projected_row() over labelled column rows)
+Rows are built in memory (no database), so only serialization is measured.
+
+Usage (from the backend directory):
+    python scripts/benchmark_serialization.py --rows 1000 --repeat 20
+"""
+import argparse
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy.engine import Row  # noqa: E402
+
+from app.models import Box, StockTransaction  # noqa: E402
+from app.schemas import BoxResponse, InventoryResponse, StockTransactionResponse  # noqa: E402
+from app.serializers import INVENTORY_COLUMNS, FastJSONResponse, box_row, projected_row, transaction_row  # noqa: E402
+
+
+def make_rows(count: int):
+    now = datetime(2025, 1, 1, 8, 30)
+    inventory, boxes, transactions = [], [], []
+    for i in range(count):
+        created = now + timedelta(minutes=i)
+        # As selected by GET /api/items/inventory (one labelled column per field)
+        inventory.append(dict(
+            inventory_id=i + 1, store_id=1 + i % 5, item_id=1 + i % 200, quantity=100 + i, reserved_quantity=i % 7,
+            available_quantity=100 + i - i % 7, min_level=50, max_level=1000, location_in_store=f"Rack {i % 40}",
+            last_counted_at=None, last_counted_by=None, notes=None, created_at=created, updated_at=created,
+            store_name="Main Store", item_code="WS-27-M-001", item_name="White Smock 2027 - Size M", size="M",
+            year_code="27", box_reference=f"BOX-2025-{1 + i // 4:04d}", box_id=1 + i // 4,
+        ))
+        boxes.append(Box(
+            box_id=i + 1, box_code=f"BOX-2025-{i + 1:04d}", qr_code=f"BOX-2025-{i + 1:04d}", supplier="Acme Sdn Bhd",
+            po_number=f"PO-{i:05d}", status="checked_in", store_id=1 + i % 5, location_in_store=f"Rack {i % 40}",
+            received_date=date(2025, 1, 1), received_by="admin", checked_in_at=created, checked_in_by="admin",
+            created_at=created, updated_at=created,
+        ))
+        transaction = StockTransaction(
+            transaction_id=i + 1, transaction_type="stock_out", item_id=1 + i % 200, from_store_id=1 + i % 5,
+            quantity=1 + i % 20, reference_number=f"REQ-{i:05d}", request_by="HR", employee_name="Aina",
+            employee_id=f"E{i:05d}", department="Production", reason="Issue", created_by="admin", created_at=created,
+        )
+        # Names the handler used to set on the ORM row before returning it
+        transaction.item_code, transaction.item_name = f"WS-27-M-{i % 200:03d}", "White Smock 2027 - Size M"
+        transaction.from_store_name, transaction.to_store_name = "Main Store", None
+        transactions.append(transaction)
+    # Result rows as the query returns them (labelled columns)
+    names = list(INVENTORY_COLUMNS)
+    key_to_index = {name: index for index, name in enumerate(names)}
+    inventory = [Row(None, None, key_to_index, tuple(row[name] for name in names)) for row in inventory]
+    return inventory, boxes, transactions
+
+
+def inventory_fast(rows):
+    names = list(INVENTORY_COLUMNS)
+    return [projected_row(row, names) for row in rows]
+
+
+def box_fast(rows):
+    return [box_row(box, 120, "Main Store") for box in rows]
+
+
+def transaction_fast(rows):
+    return [
+        transaction_row(trans, trans.item_code, trans.item_name, trans.from_store_name, trans.to_store_name)
+        for trans in rows
+    ]
+
+
+def scenarios(inventory, boxes, transactions):
+    inventory_adapter = TypeAdapter(List[InventoryResponse])
+    box_adapter = TypeAdapter(List[BoxResponse])
+    transaction_adapter = TypeAdapter(List[StockTransactionResponse])
+
+    def respond(adapter, content):
+        # FastAPI: validate the returned value against response_model, then dump JSON bytes
+        return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+    return [
+        ("inventory", "pydantic", lambda: respond(inventory_adapter, [
+            InventoryResponse(**data) for data in inventory_fast(inventory)
+        ])),
+        ("inventory", "fast", lambda: FastJSONResponse(inventory_fast(inventory)).body),
+        ("boxes", "pydantic", lambda: respond(box_adapter, [BoxResponse(**data) for data in box_fast(boxes)])),
+        ("boxes", "fast", lambda: FastJSONResponse(box_fast(boxes)).body),
+        ("transactions", "pydantic", lambda: respond(transaction_adapter, transactions)),
+        ("transactions", "fast", lambda: FastJSONResponse(transaction_fast(transactions)).body),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    per_thousand = 1000 / args.rows
+    results = {}
+    for endpoint, path, run in scenarios(*rows):
+        run()  # Warm up
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            body = run()
+            timings.append(time.perf_counter() - started)
+        median_ms = statistics.median(timings) * 1000 * per_thousand
+        results[(endpoint, path)] = median_ms
+        print(f"{endpoint:<13} {path:<9} {median_ms:>8.2f} ms / 1000 rows   {len(body) / 1024:>7.1f} KB")
+
+    for endpoint in dict.fromkeys(endpoint for endpoint, _ in results):
+        speedup = results[(endpoint, "pydantic")] / results[(endpoint, "fast")]
+        print(f"{endpoint:<13} {speedup:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark of the upload endpoint (GET /uploads/...) under concurrent load.
+
+Writes a test image into uploads/benchmark/, starts the app with uvicorn on a
+local port (background jobs and email sender disabled) and runs concurrent
+keep-alive clients against it for each scenario:
+    full         plain GET, whole file (first visit)
+    revalidate   GET with If-None-Match of the current ETag (304, no body)
+    range        GET with a 64 KB Range (206)
+Reports requests/s, latency percentiles and bytes transferred, then removes
+the test file.
+
+Usage (from the backend directory):
+    python scripts/benchmark_uploads.py --clients 32 --requests 200 --size-kb 256
+"""
+import argparse
+import http.client
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DISABLE_JOB_RUNNER", "1")
+os.environ.setdefault("DISABLE_EMAIL_SENDER", "1")
+
+import uvicorn  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.uploads import UPLOADS_DIR  # noqa: E402
+
+
+def start_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def run_client(port: int, path: str, headers: dict, requests: int, expected_status: int):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    latencies = []
+    received = 0
+    try:
+        for _ in range(requests):
+            started = time.perf_counter()
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+            latencies.append(time.perf_counter() - started)
+            if response.status != expected_status:
+                raise RuntimeError(f"Expected {expected_status}, got {response.status}")
+            received += len(body)
+    finally:
+        conn.close()
+    return latencies, received
+
+
+def run_scenario(name: str, port: int, path: str, headers: dict, clients: int, requests: int, expected_status: int):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(
+            lambda _: run_client(port, path, headers, requests, expected_status), range(clients)
+        ))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for client_latencies, _ in results for latency in client_latencies)
+    total = len(latencies)
+    received = sum(received for _, received in results)
+    p95 = latencies[int(total * 0.95) - 1]
+    print(f"{name:<11} {total / elapsed:>9.0f} req/s   p50 {statistics.median(latencies) * 1000:>6.2f} ms   "
+          f"p95 {p95 * 1000:>6.2f} ms   {received / 1024 / 1024:>8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent keep-alive connections")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per client and scenario")
+    parser.add_argument("--size-kb", type=int, default=256, help="Size of the test image")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    bench_dir = UPLOADS_DIR / "benchmark"
+    bench_dir.mkdir(parents=True, exist_ok=True)
+    image = bench_dir / f"{uuid.uuid4().hex}.jpg"
+    image.write_bytes(os.urandom(args.size_kb * 1024))
+    path = f"/uploads/benchmark/{image.name}"
+
+    server = start_server(args.port)
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", args.port)
+        conn.request("GET", path, headers={"Origin": "http://localhost:3000"})
+        response = conn.getresponse()
+        response.read()
+        etag = response.getheader("ETag")
+        print(f"{path} ({args.size_kb} KB) - Cache-Control: {response.getheader('Cache-Control')}, ETag: {etag}")
+        print(f"{args.clients} clients x {args.requests} requests per scenario")
+        conn.close()
+
+        origin = {"Origin": "http://localhost:3000"}
+        run_scenario("full", args.port, path, origin, args.clients, args.requests, 200)
+        run_scenario("revalidate", args.port, path, {**origin, "If-None-Match": etag}, args.clients, args.requests, 304)
+        run_scenario("range", args.port, path, {**origin, "Range": "bytes=0-65535"}, args.clients, args.requests, 206)
+    finally:
+        server.should_exit = True
+        image.unlink()
+        try:
+            bench_dir.rmdir()
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Exercise the email outbox against a local SMTP stand-in (aiosmtpd).
+
+Starts an aiosmtpd server on localhost, points the outbox sender at it
+(plain SMTP, no login) and:
+  1. queues N welcome emails and delivers them through EmailSender.send_pending,
+     checking every message arrived over a single SMTP connection;
+  2. restarts the SMTP server and delivers another batch, checking the sender
+     reconnects instead of failing the messages;
+  3. sends the same number of messages with a new connection per message (the
+     old EmailService behaviour) for comparison.
+The outbox rows it creates are deleted afterwards.
+
+Requires aiosmtpd (pip install aiosmtpd) - a test-only dependency.
+
+Usage (from the backend directory, against the configured DATABASE_URL):
+    python scripts/check_email_outbox.py --messages 200 --batch-size 50
+"""
+import argparse
+import smtplib
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    sys.exit("aiosmtpd is required: pip install aiosmtpd")
+
+from app.database import SessionLocal, engine, Base  # noqa: E402
+from app.email_outbox import EmailSender, queue_welcome_email  # noqa: E402
+from app.email_service import email_service  # noqa: E402
+from app.models import EmailOutbox  # noqa: E402
+
+CREATED_BY = "outbox-check"
+
+
+class CollectingHandler:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope.rcpt_tos[0])
+        return "250 Message accepted for delivery"
+
+
+def queue(count: int, offset: int = 0):
+    db = SessionLocal()
+    try:
+        for i in range(offset, offset + count):
+            queue_welcome_email(db, f"user{i}@example.com", f"user{i}", None, "Temp-1234", created_by=CREATED_BY)
+        db.commit()
+    finally:
+        db.close()
+
+
+def drain(sender: EmailSender) -> float:
+    started = time.perf_counter()
+    while sender.send_pending():
+        pass
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+
+    # Plain local server: no STARTTLS, no login
+    email_service.smtp_server = "127.0.0.1"
+    email_service.smtp_port = args.port
+    email_service.smtp_use_tls = False
+    email_service.smtp_require_auth = False
+    email_service.smtp_username = ""
+    email_service.smtp_password = ""
+
+    handler = CollectingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=args.port)
+    controller.start()
+    sender = EmailSender(email_service, batch_size=args.batch_size)
+    ok = True
+    try:
+        # 1. Batched delivery over one connection
+        queue(args.messages)
+        elapsed = drain(sender)
+        received = len(handler.messages)
+        print(f"Outbox:      {received}/{args.messages} delivered in {elapsed:.2f}s "
+              f"({elapsed / max(received, 1) * 1000:.2f} ms/message, "
+              f"{sender.batches} batches, {sender.connection.connections_opened} SMTP connection(s))")
+        ok &= received == args.messages and sender.connection.connections_opened == 1
+
+        # 2. Server restart: the sender reconnects
+        controller.stop()
+        controller = Controller(handler, hostname="127.0.0.1", port=args.port)
+        controller.start()
+        sender.connection._last_used = 0  # Force the keepalive check
+        queue(args.batch_size, offset=args.messages)
+        drain(sender)
+        received = len(handler.messages)
+        expected = args.messages + args.batch_size
+        print(f"Reconnect:   {received}/{expected} delivered after a server restart "
+              f"({sender.connection.connections_opened} SMTP connections, {sender.retried} retried, {sender.failed} failed)")
+        ok &= received == expected and sender.failed == 0
+
+        # 3. Baseline: one connection per message
+        before = len(handler.messages)
+        started = time.perf_counter()
+        for i in range(args.messages):
+            subject, text_body, html_body = email_service.render(
+                "welcome", {"name": "baseline", "username": "baseline", "temporary_password": "x", "login_url": "x"}
+            )
+            msg = email_service.build_message(f"baseline{i}@example.com", subject, text_body, html_body)
+            with smtplib.SMTP("127.0.0.1", args.port) as server:
+                server.send_message(msg)
+        elapsed = time.perf_counter() - started
+        print(f"Per-message: {len(handler.messages) - before}/{args.messages} delivered in {elapsed:.2f}s "
+              f"({elapsed / args.messages * 1000:.2f} ms/message, {args.messages} SMTP connections)")
+    finally:
+        sender.connection.close()
+        controller.stop()
+        db = SessionLocal()
+        try:
+            left = db.query(EmailOutbox).filter(EmailOutbox.created_by == CREATED_BY)
+            unsent = left.filter(EmailOutbox.status != "sent").count()
+            # Temporary passwords are dropped once sent (JSON null loads as None)
+            sensitive_left = sum(1 for email in left if email.context is not None)
+            ok &= unsent == 0 and sensitive_left == 0
+            left.delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
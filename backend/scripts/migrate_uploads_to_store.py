@@ -0,0 +1,117 @@
+"""
+Move existing profile photos into the content-addressed upload store.
+
+Photos saved before app.upload_store existed live directly in
+uploads/profiles/ (either "<user_id>_<uuid>.<ext>" or "<sha256>.jpg" with
+variants). Each user's photo is re-processed through the normal upload
+pipeline (validation, re-encoding, variants), registered in upload_blobs and
+User.profile_photo is updated - one commit per user, so the script can be
+stopped and re-run safely. Identical photos end up as a single blob.
+
+With --delete-legacy, flat files in uploads/profiles/ that no user references
+any more are deleted afterwards.
+
+Usage (from the backend directory, against the configured DATABASE_URL):
+    python scripts/migrate_uploads_to_store.py --dry-run
+    python scripts/migrate_uploads_to_store.py --delete-legacy
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.database import SessionLocal  # noqa: E402
+from app.images import ImageError, store_profile_photo  # noqa: E402
+from app.models import User  # noqa: E402
+from app.upload_store import PROFILE_PHOTO_DIR, PROFILE_PHOTO_URL, digest_from_url  # noqa: E402
+from app.uploads import UPLOADS_DIR  # noqa: E402
+
+LEGACY_PREFIX = PROFILE_PHOTO_URL + "/"
+
+
+def legacy_path(url: str) -> Path:
+    return UPLOADS_DIR / url[len("/uploads/"):]
+
+
+def migrate_users(db, dry_run: bool) -> dict:
+    report = {"users": 0, "migrated": 0, "missing": 0, "invalid": 0, "bytes_before": 0}
+    users = db.query(User.user_id, User.profile_photo).filter(
+        User.profile_photo.like(LEGACY_PREFIX + "%")
+    ).order_by(User.user_id).all()
+
+    for user_id, url in users:
+        if digest_from_url(url):
+            continue  # Already in the store
+        report["users"] += 1
+        path = legacy_path(url)
+        if not path.is_file():
+            report["missing"] += 1
+            print(f"  user {user_id}: {url} not found, left unchanged")
+            continue
+        report["bytes_before"] += path.stat().st_size
+        if dry_run:
+            print(f"  user {user_id}: {url}")
+            continue
+
+        try:
+            with path.open("rb") as source:
+                new_url = store_profile_photo(db, source)
+        except ImageError as e:
+            db.rollback()
+            report["invalid"] += 1
+            print(f"  user {user_id}: {url} is not a valid image ({e}), left unchanged")
+            continue
+        db.query(User).filter(User.user_id == user_id).update({User.profile_photo: new_url}, synchronize_session=False)
+        db.commit()
+        report["migrated"] += 1
+        print(f"  user {user_id}: {url} -> {new_url}")
+    return report
+
+
+def delete_legacy(db, dry_run: bool) -> dict:
+    """Delete flat files in uploads/profiles/ no user references (shard directories are kept)"""
+    referenced = {
+        url for (url,) in db.query(User.profile_photo).filter(User.profile_photo.like(LEGACY_PREFIX + "%"))
+    }
+    deleted_files = deleted_bytes = 0
+    for path in sorted(PROFILE_PHOTO_DIR.iterdir()) if PROFILE_PHOTO_DIR.is_dir() else []:
+        if not path.is_file() or path.name.startswith("."):
+            continue
+        if f"{PROFILE_PHOTO_URL}/{path.name}" in referenced:
+            continue
+        # Variants of a referenced "<sha256>.jpg" share its prefix
+        if any(url.startswith(f"{PROFILE_PHOTO_URL}/{path.name.split('_')[0].split('.')[0]}.") for url in referenced):
+            continue
+        size = path.stat().st_size
+        if not dry_run:
+            path.unlink()
+        deleted_files += 1
+        deleted_bytes += size
+    return {"deleted_files": deleted_files, "deleted_bytes": deleted_bytes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    parser.add_argument("--delete-legacy", action="store_true", help="delete unreferenced files in uploads/profiles/")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(f"Migrating profile photos{' (dry run)' if args.dry_run else ''}...")
+        report = migrate_users(db, args.dry_run)
+        print(
+            f"{report['users']} legacy photo(s): {report['migrated']} migrated, "
+            f"{report['missing']} missing, {report['invalid']} invalid ({report['bytes_before']} bytes)"
+        )
+        if args.delete_legacy:
+            deleted = delete_legacy(db, args.dry_run)
+            verb = "Would delete" if args.dry_run else "Deleted"
+            print(f"{verb} {deleted['deleted_files']} legacy file(s) ({deleted['deleted_bytes']} bytes)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,7 @@ import {
 } from '@heroicons/react/24/outline';
 import { usersService, User, UserCreate } from '@/lib/api/users';
 import { authService } from '@/lib/auth';
-import { getApiUrl } from '@/lib/api';
+import { profilePhotoUrl } from '@/lib/api';
 import toast from 'react-hot-toast';
 import BaseModal from '@/components/common/BaseModal';
 
@@ -340,9 +340,7 @@ export default function UsersPage() {
                   <div className="flex items-center gap-3">
                     {user.profile_photo ? (
                       <img
-                        src={user.profile_photo.startsWith('/') 
-                          ? `${getApiUrl()}${encodeURI(user.profile_photo)}` 
-                          : encodeURI(user.profile_photo)}
+                        src={profilePhotoUrl(user, 256)}
                         alt={user.full_name || user.username}
                         className="w-12 h-12 rounded-full object-cover border-2 border-gray-200 dark:border-gray-700"
                         onError={(e) => {
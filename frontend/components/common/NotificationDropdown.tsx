@@ -82,11 +82,43 @@ export default function NotificationDropdown({ isMobile = false }: NotificationD
 
   useEffect(() => {
     loadNotifications();
-    
-    // Refresh every 2 minutes to reduce database connections
-    const interval = setInterval(loadNotifications, 120000);
-    
-    return () => clearInterval(interval);
+
+    // Changes are pushed over the notification stream; polling is only a
+    // fallback for browsers without EventSource or a dropped stream
+    const unsubscribe = notificationsService.subscribe((message) => {
+      switch (message.event) {
+        case 'unread_count':
+          setUnreadCount(message.data.count);
+          break;
+        case 'notification':
+          setNotifications(prev => [
+            message.data,
+            ...prev.filter(n => n.notification_id !== message.data.notification_id),
+          ].slice(0, 50));
+          setUnreadCount(prev => prev + 1);
+          break;
+        case 'notification_read':
+          setNotifications(prev =>
+            prev.map(n =>
+              n.notification_id === message.data.notification_id ? { ...n, status: 'read' as const } : n
+            )
+          );
+          break;
+        case 'notification_deleted':
+          setNotifications(prev => prev.filter(n => n.notification_id !== message.data.notification_id));
+          break;
+        case 'unread_changed':
+          loadNotifications();
+          break;
+      }
+    });
+
+    const interval = setInterval(loadNotifications, unsubscribe ? 600000 : 120000);
+
+    return () => {
+      clearInterval(interval);
+      unsubscribe?.();
+    };
   }, []);
 
   // Prevent body scroll when mobile sheet is open
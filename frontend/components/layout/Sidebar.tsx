@@ -21,7 +21,7 @@ import {
   TableCellsIcon,
 } from '@heroicons/react/24/outline';
 import { authService, User } from '@/lib/auth';
-import { getApiUrl } from '@/lib/api';
+import { profilePhotoUrl } from '@/lib/api';
 
 interface NavItem {
   name: string;
@@ -258,9 +258,7 @@ export default function Sidebar({ onMobileMenuToggle, mobileMenuOpen: externalMo
               >
                 {user?.profile_photo ? (
                   <img
-                    src={user.profile_photo.startsWith('/') 
-                      ? `${getApiUrl()}${encodeURI(user.profile_photo)}` 
-                      : encodeURI(user.profile_photo)}
+                    src={profilePhotoUrl(user, 64)}
                     alt={user?.full_name || 'User'}
                     className="w-8 h-8 rounded-full object-cover flex-shrink-0 border-2 border-slate-600"
                     onError={(e) => {
@@ -358,9 +356,7 @@ function SidebarContent({
         <div className="flex items-center px-3 py-2 mb-2">
           {user?.profile_photo ? (
             <img
-              src={user.profile_photo.startsWith('/') 
-                ? `${getApiUrl()}${encodeURI(user.profile_photo)}` 
-                : encodeURI(user.profile_photo)}
+              src={profilePhotoUrl(user, 64)}
               alt={user?.full_name || 'User'}
               className="w-8 h-8 rounded-full object-cover flex-shrink-0 border-2 border-gray-300"
               onError={(e) => {
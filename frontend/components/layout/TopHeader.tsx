@@ -11,7 +11,7 @@ import {
   MoonIcon,
 } from '@heroicons/react/24/outline';
 import { authService } from '@/lib/auth';
-import { getApiUrl } from '@/lib/api';
+import { profilePhotoUrl } from '@/lib/api';
 import NotificationDropdown from '@/components/common/NotificationDropdown';
 import { useTheme } from '@/components/providers/ThemeProvider';
 
@@ -122,9 +122,7 @@ export default function TopHeader({ onMenuClick, isMenuOpen = false }: TopHeader
                 <div className="flex items-center gap-4 mb-8">
                   {user?.profile_photo ? (
                     <img
-                      src={user.profile_photo.startsWith('/') 
-                        ? `${getApiUrl()}${encodeURI(user.profile_photo)}` 
-                        : encodeURI(user.profile_photo)}
+                      src={profilePhotoUrl(user, 256)}
                       alt={user?.full_name || 'User'}
                       className="w-16 h-16 rounded-full object-cover border-2 border-gray-200 dark:border-gray-700"
                       onError={(e) => {
@@ -3,11 +3,10 @@
 import { useRef, useState } from 'react';
 import { motion } from 'framer-motion';
 import { PrinterIcon, ArrowDownTrayIcon } from '@heroicons/react/24/outline';
-import html2pdf from 'html2pdf.js';
 import { toast } from 'react-hot-toast';
 import BaseModal from '@/components/common/BaseModal';
 import BoxQRPrintLabel from './BoxQRPrintLabel';
-import { BoxWithContents } from '@/lib/api/boxes';
+import { BoxWithContents, LabelLayout, boxesService } from '@/lib/api/boxes';
 
 interface BoxPrintModalProps {
   isOpen: boolean;
@@ -18,6 +17,7 @@ interface BoxPrintModalProps {
 export default function BoxPrintModal({ isOpen, onClose, box }: BoxPrintModalProps) {
   const printRef = useRef<HTMLDivElement>(null);
   const [downloading, setDownloading] = useState(false);
+  const [labelLayout, setLabelLayout] = useState<LabelLayout>('a4');
 
   const handlePrint = () => {
     if (!box || !printRef.current) {
@@ -115,55 +115,19 @@ export default function BoxPrintModal({ isOpen, onClose, box }: BoxPrintModalPro
   };
 
   const handleDownloadPDF = async () => {
-    if (!box || !printRef.current) return;
+    if (!box) return;
 
     setDownloading(true);
     
     try {
-      const element = printRef.current;
-      const filename = `Box_QR_Label_${box.box_code}_${new Date().toISOString().split('T')[0]}.pdf`;
-
-      // Wait a bit to ensure all content is rendered
-      await new Promise(resolve => setTimeout(resolve, 100));
-
-      // Get actual element dimensions
-      const rect = element.getBoundingClientRect();
-      const scrollHeight = element.scrollHeight;
-      const scrollWidth = element.scrollWidth;
-
-      const opt = {
-        margin: [5, 5, 5, 5],
-        filename: filename,
-        image: { type: 'jpeg', quality: 0.98 },
-        html2canvas: { 
-          scale: 3,
-          useCORS: true,
-          letterRendering: true,
-          logging: false,
-          windowWidth: Math.max(scrollWidth, rect.width),
-          windowHeight: Math.max(scrollHeight, rect.height),
-          allowTaint: true,
-          backgroundColor: '#ffffff',
-          scrollX: 0,
-          scrollY: 0,
-          width: scrollWidth,
-          height: scrollHeight,
-        },
-        jsPDF: { 
-          unit: 'mm', 
-          format: 'a4', 
-          orientation: 'portrait',
-          compress: true,
-        },
-        pagebreak: { 
-          mode: ['avoid-all', 'css', 'legacy'],
-          before: '.page-break-before',
-          after: '.page-break-after',
-          avoid: ['.no-break', 'table', 'tr', 'td', '.bg-blue-50']
-        }
-      };
-
-      await html2pdf().set(opt).from(element).save();
+      // Box and item labels are rendered server-side, ready for the label printer
+      const response = await boxesService.getLabels(box.box_id, labelLayout);
+      const url = URL.createObjectURL(response.data);
+      const a = document.createElement('a');
+      a.href = url;
+      a.download = `Box_Labels_${box.box_code}_${labelLayout}.pdf`;
+      a.click();
+      URL.revokeObjectURL(url);
       
       toast.success('PDF downloaded successfully!');
     } catch (error) {
@@ -185,6 +149,14 @@ export default function BoxPrintModal({ isOpen, onClose, box }: BoxPrintModalPro
       maxHeight="max-h-[95vh]"
       footer={
         <div className="flex flex-col sm:flex-row gap-3 justify-end">
+          <select
+            value={labelLayout}
+            onChange={(e) => setLabelLayout(e.target.value as LabelLayout)}
+            className="px-4 py-3 border border-gray-300 rounded-lg text-gray-700 bg-white"
+          >
+            <option value="a4">A4 label sheet</option>
+            <option value="thermal">Thermal labels (100 x 50 mm)</option>
+          </select>
           <motion.button
             whileHover={{ scale: 1.02 }}
             whileTap={{ scale: 0.98 }}
@@ -213,7 +185,7 @@ export default function BoxPrintModal({ isOpen, onClose, box }: BoxPrintModalPro
             <p className="font-semibold mb-2">Print Instructions:</p>
             <ul className="mt-2 space-y-1 list-disc list-inside ml-4">
               <li><strong>Print:</strong> Opens print dialog - choose your printer or &quot;Save as PDF&quot;</li>
-              <li><strong>Download PDF:</strong> Automatically downloads PDF file to your computer</li>
+              <li><strong>Download PDF:</strong> Downloads labels for the box and each item line (A4 label sheet or thermal labels)</li>
             </ul>
             <p className="mt-2">Make sure to use A4 or A5 paper.</p>
           </div>
@@ -21,6 +21,15 @@ export const getApiUrl = () => {
   return process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 };
 
+// Resized profile photo variant (falls back to the original for photos uploaded before variants existed)
+export const profilePhotoUrl = (
+  user: { profile_photo?: string | null; profile_photo_variants?: Record<string, Record<string, string>> | null },
+  size: 64 | 256
+): string => {
+  const photo = user.profile_photo_variants?.[String(size)]?.webp || user.profile_photo || '';
+  return photo.startsWith('/') ? `${getApiUrl()}${encodeURI(photo)}` : encodeURI(photo);
+};
+
 const API_URL = getApiUrl();
 
 const api = axios.create({
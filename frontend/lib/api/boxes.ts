@@ -75,6 +75,9 @@ export interface BoxInventory {
   checked_in_at: string;
 }
 
+// Server-rendered label PDFs: A4 sheet (3 x 8 labels) or 100 x 50 mm thermal roll
+export type LabelLayout = 'a4' | 'thermal';
+
 export const boxesService = {
   // Create new box (receive from supplier)
   create: (data: BoxCreate) => api.post<BoxWithContents>('/api/boxes/', data),
@@ -93,6 +96,21 @@ export const boxesService = {
   checkIn: (id: number, data: BoxCheckIn) =>
     api.put<Box>(`/api/boxes/${id}/checkin`, data),
 
+  // Printable labels for the box and its item lines (PDF)
+  getLabels: (id: number, layout: LabelLayout = 'a4', includeItems = true) =>
+    api.get<Blob>(`/api/boxes/${id}/labels`, {
+      params: { layout, include_items: includeItems },
+      responseType: 'blob',
+    }),
+
+  // Printable labels for many boxes at once, e.g. a whole delivery (PDF)
+  getLabelsBulk: (boxIds: number[], layout: LabelLayout = 'a4', includeItems = true) =>
+    api.post<Blob>(
+      '/api/boxes/labels',
+      { box_ids: boxIds, layout, include_items: includeItems },
+      { responseType: 'blob' }
+    ),
+
   // List all boxes
   list: (params?: {
     skip?: number;
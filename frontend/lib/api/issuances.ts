@@ -0,0 +1,75 @@
+import api from '../api';
+
+export interface IssuanceLineInput {
+  item_id: number;
+  quantity: number;
+  store_id?: number; // Defaults to the issuance store_id
+  box_id?: number;
+  notes?: string;
+}
+
+export interface IssuanceLine {
+  transaction_id: number;
+  item_id: number;
+  item_code?: string | null;
+  item_name?: string | null;
+  size?: string | null;
+  store_id?: number | null;
+  store_name?: string | null;
+  box_id?: number | null;
+  quantity: number;
+  notes?: string | null;
+}
+
+export interface Issuance {
+  issuance_id: number;
+  issuance_number: string;
+  store_id?: number | null;
+  store_name?: string | null;
+  employee_name?: string | null;
+  employee_id?: string | null;
+  department?: string | null;
+  reference_number?: string | null;
+  reason?: string | null;
+  notes?: string | null;
+  line_count: number;
+  total_quantity: number;
+  created_by?: string | null;
+  created_at?: string;
+  lines: IssuanceLine[];
+}
+
+export const issuancesService = {
+  /**
+   * Issue many items in one document - all lines succeed or none do
+   */
+  create: async (data: {
+    store_id?: number;
+    employee_name?: string;
+    employee_id?: string;
+    department?: string;
+    reference_number?: string;
+    reason?: string;
+    notes?: string;
+    lines: IssuanceLineInput[];
+  }): Promise<Issuance> => {
+    const response = await api.post('/api/issuances/', data);
+    return response.data;
+  },
+
+  list: async (params?: {
+    skip?: number;
+    limit?: number;
+    employee_id?: string;
+    department?: string;
+    store_id?: number;
+  }): Promise<Issuance[]> => {
+    const response = await api.get('/api/issuances/', { params });
+    return response.data;
+  },
+
+  get: async (issuanceId: number): Promise<Issuance> => {
+    const response = await api.get(`/api/issuances/${issuanceId}`);
+    return response.data;
+  },
+};
@@ -105,6 +105,33 @@ export interface StockTransaction {
   item_name?: string;
 }
 
+export interface BulkTransferLine {
+  item_id: number;
+  quantity: number;
+  box_id?: number; // Take from this box first
+}
+
+export interface BulkTransferResult {
+  item_id: number;
+  box_id?: number; // Set for lines derived from box_ids
+  quantity: number;
+  allocations: {
+    inventory_id: number;
+    box_id?: number;
+    box_reference?: string;
+    quantity: number;
+  }[];
+}
+
+export interface BulkTransferResponse {
+  from_store_id: number;
+  to_store_id: number;
+  transaction_count: number;
+  total_quantity: number;
+  boxes_moved: number[];
+  results: BulkTransferResult[];
+}
+
 // ============================================================================
 // ITEMS SERVICE
 // ============================================================================
@@ -189,6 +216,14 @@ export const inventoryService = {
 // STOCK TRANSACTIONS SERVICE
 // ============================================================================
 
+// Idempotency-Key for POST /api/items/transactions (retries replay the stored response)
+export function newIdempotencyKey(): string {
+  if (typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function') {
+    return crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}-${Math.random().toString(36).slice(2)}`;
+}
+
 export const stockTransactionsService = {
   // Get stock transactions
   async list(params?: {
@@ -218,6 +253,9 @@ export const stockTransactionsService = {
     reference_type?: string;
     notes?: string;
     box_id?: number;
+  }, options?: {
+    // Reuse the same key when retrying the same transaction so it is applied only once
+    idempotencyKey?: string;
   }): Promise<StockTransaction> {
     // Ensure quantity is positive and greater than 0
     const quantity = Math.abs(data.quantity);
@@ -250,8 +288,29 @@ export const stockTransactionsService = {
       payload.box_id = data.box_id;
     }
     
+    const idempotencyKey = options?.idempotencyKey || newIdempotencyKey();
+    
     console.log('[StockTransaction] Sending payload:', payload);
-    const response = await api.post<StockTransaction>('/api/items/transactions', payload);
+    const response = await api.post<StockTransaction>('/api/items/transactions', payload, {
+      headers: { 'Idempotency-Key': idempotencyKey },
+    });
+    return response.data;
+  },
+
+  // Transfer many items and/or whole boxes between two stores (all or nothing)
+  async bulkTransfer(data: {
+    from_store_id: number;
+    to_store_id: number;
+    lines?: BulkTransferLine[];
+    box_ids?: number[];
+    reference_number?: string;
+    employee_name?: string;
+    employee_id?: string;
+    department?: string;
+    reason?: string;
+    notes?: string;
+  }): Promise<BulkTransferResponse> {
+    const response = await api.post<BulkTransferResponse>('/api/items/transactions/bulk-transfer', data);
     return response.data;
   },
 };
@@ -0,0 +1,68 @@
+import api from '../api';
+
+export type JobStatus = 'queued' | 'running' | 'succeeded' | 'failed';
+
+export interface Job {
+  job_id: number;
+  job_name: string;
+  status: JobStatus;
+  result?: Record<string, any> | null;
+  error?: string | null;
+  attempts: number;
+  max_attempts: number;
+  run_after?: string | null;
+  started_at?: string | null;
+  finished_at?: string | null;
+  duration_ms?: number | null;
+  created_by?: string | null;
+  created_at?: string;
+}
+
+export interface JobMetrics {
+  job_name: string;
+  interval_seconds?: number | null;
+  next_run_at?: string | null;
+  // Since the API process started
+  runs: number;
+  failures: number;
+  avg_ms?: number | null;
+  max_ms?: number | null;
+  last_ms?: number | null;
+  last_status?: string | null;
+  last_finished_at?: string | null;
+  // All processes, last 24 hours
+  queued: number;
+  runs_24h: number;
+  failures_24h: number;
+  avg_ms_24h?: number | null;
+  max_ms_24h?: number | null;
+}
+
+// Background jobs (admin only)
+export const jobsService = {
+  list: async (params?: {
+    skip?: number;
+    limit?: number;
+    job_name?: string;
+    status?: JobStatus;
+  }): Promise<Job[]> => {
+    const response = await api.get('/api/jobs/', { params });
+    return response.data;
+  },
+
+  get: async (jobId: number): Promise<Job> => {
+    const response = await api.get(`/api/jobs/${jobId}`);
+    return response.data;
+  },
+
+  metrics: async (): Promise<JobMetrics[]> => {
+    const response = await api.get('/api/jobs/metrics');
+    return response.data;
+  },
+
+  // Queue a registered job (e.g. "generate_stock_alerts") to run now
+  run: async (jobName: string, payload?: Record<string, any>): Promise<Job> => {
+    const response = await api.post('/api/jobs/', { job_name: jobName, payload });
+    return response.data;
+  },
+};
@@ -1,4 +1,4 @@
-import api from '../api';
+import api, { getApiUrl } from '../api';
 
 export interface Notification {
   notification_id: number;
@@ -22,6 +22,22 @@ export interface NotificationCreate {
   user_id?: number | null;
 }
 
+export type NotificationStreamEvent =
+  | { event: 'unread_count'; data: { count: number } }
+  | { event: 'notification'; data: Notification }
+  | { event: 'notification_read' | 'notification_deleted'; data: { notification_id: number } }
+  | { event: 'unread_changed'; data: { reason: string } }
+  | { event: 'token_expired'; data: Record<string, never> };
+
+const STREAM_EVENTS: NotificationStreamEvent['event'][] = [
+  'unread_count',
+  'notification',
+  'notification_read',
+  'notification_deleted',
+  'unread_changed',
+  'token_expired',
+];
+
 export const notificationsService = {
   /**
    * Get notifications for current user
@@ -43,6 +59,51 @@ export const notificationsService = {
     return response.data;
   },
 
+  /**
+   * Subscribe to pushed notification changes (Server-Sent Events).
+   * EventSource cannot send headers, so the token goes in the query string.
+   * The browser reconnects by itself after network errors; on token expiry
+   * the stream is reopened with the current (refreshed) token.
+   * Returns an unsubscribe function, or null if streaming is unavailable.
+   */
+  subscribe: (
+    onEvent: (event: NotificationStreamEvent) => void,
+    onError?: () => void
+  ): (() => void) | null => {
+    if (typeof window === 'undefined' || typeof EventSource === 'undefined') {
+      return null;
+    }
+
+    let source: EventSource | null = null;
+    let closed = false;
+
+    const open = () => {
+      const token = localStorage.getItem('access_token');
+      if (!token || closed) return;
+      source = new EventSource(
+        `${getApiUrl()}/api/notifications/stream?token=${encodeURIComponent(token)}`
+      );
+      STREAM_EVENTS.forEach((name) => {
+        source!.addEventListener(name, (message) => {
+          const data = JSON.parse((message as MessageEvent).data);
+          if (name === 'token_expired') {
+            source?.close();
+            open();
+            return;
+          }
+          onEvent({ event: name, data } as NotificationStreamEvent);
+        });
+      });
+      source.onerror = () => onError?.();
+    };
+
+    open();
+    return () => {
+      closed = true;
+      source?.close();
+    };
+  },
+
   /**
    * Mark notification as read
    */
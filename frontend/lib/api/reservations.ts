@@ -0,0 +1,98 @@
+import api from '../api';
+
+export type ReservationStatus = 'active' | 'confirmed' | 'released' | 'expired';
+
+export interface ReservationLineInput {
+  item_id: number;
+  quantity: number;
+  store_id?: number; // Defaults to the request store_id
+  box_id?: number; // Hold from this box first
+}
+
+export interface ReservationAllocation {
+  inventory_id: number;
+  box_id?: number | null;
+  box_reference?: string | null;
+  quantity: number;
+}
+
+export interface Reservation {
+  reservation_id: number;
+  item_id: number;
+  store_id: number;
+  box_id?: number | null;
+  quantity: number;
+  status: ReservationStatus;
+  allocations: ReservationAllocation[];
+  expires_at: string;
+  reference_number?: string | null;
+  employee_name?: string | null;
+  employee_id?: string | null;
+  department?: string | null;
+  notes?: string | null;
+  transaction_id?: number | null; // stock_out written on confirm
+  created_by?: string | null;
+  created_at?: string;
+  closed_at?: string | null;
+  closed_by?: string | null;
+}
+
+export const reservationsService = {
+  /**
+   * Hold stock for many items (one reservation per line) - all lines succeed or none do
+   */
+  create: async (data: {
+    store_id?: number;
+    ttl_minutes?: number;
+    reference_number?: string;
+    employee_name?: string;
+    employee_id?: string;
+    department?: string;
+    notes?: string;
+    lines: ReservationLineInput[];
+  }): Promise<Reservation[]> => {
+    const response = await api.post('/api/reservations/', data);
+    return response.data;
+  },
+
+  list: async (params?: {
+    skip?: number;
+    limit?: number;
+    item_id?: number;
+    store_id?: number;
+    status?: ReservationStatus;
+    reference_number?: string;
+    employee_id?: string;
+  }): Promise<Reservation[]> => {
+    const response = await api.get('/api/reservations/', { params });
+    return response.data;
+  },
+
+  get: async (reservationId: number): Promise<Reservation> => {
+    const response = await api.get(`/api/reservations/${reservationId}`);
+    return response.data;
+  },
+
+  /**
+   * Issue the held stock (stock_out). A smaller quantity issues part of the hold and releases the rest.
+   */
+  confirm: async (
+    reservationId: number,
+    data?: {
+      quantity?: number;
+      employee_name?: string;
+      employee_id?: string;
+      department?: string;
+      reason?: string;
+      notes?: string;
+    }
+  ): Promise<Reservation> => {
+    const response = await api.post(`/api/reservations/${reservationId}/confirm`, data ?? {});
+    return response.data;
+  },
+
+  release: async (reservationId: number): Promise<Reservation> => {
+    const response = await api.post(`/api/reservations/${reservationId}/release`);
+    return response.data;
+  },
+};
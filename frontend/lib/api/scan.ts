@@ -0,0 +1,106 @@
+import api from '../api';
+
+export interface ScanLocation {
+  store_id: number | null;
+  store_name?: string | null;
+  location_in_store?: string | null;
+  quantity?: number | null;
+  available_quantity?: number | null;
+}
+
+export interface ScanMatch {
+  entity_type: 'item' | 'box';
+  entity_id: number;
+  code: string;
+  label?: string | null;
+  status?: string | null;
+  locations: ScanLocation[];
+}
+
+export interface ScanResolution {
+  code: string;
+  found: boolean;
+  matched_by?: 'exact' | 'prefix' | null;
+  matches: ScanMatch[];
+}
+
+export type ScanEventType = 'checkin' | 'stock_out' | 'transfer';
+
+export interface ScanEvent {
+  idempotency_key: string; // Generate once per scan (e.g. crypto.randomUUID()) and keep it across retries
+  event_type: ScanEventType;
+  code: string;
+  quantity?: number; // Required for item codes; box codes move the whole box
+  from_store_id?: number;
+  to_store_id?: number;
+  location_in_store?: string;
+  reference_number?: string;
+  employee_name?: string;
+  employee_id?: string;
+  department?: string;
+  reason?: string;
+  notes?: string;
+  scanned_at?: string;
+}
+
+export interface ScanEventResult {
+  idempotency_key: string;
+  status: 'applied' | 'duplicate' | 'failed';
+  message?: string | null;
+  entity_type?: 'item' | 'box' | null;
+  entity_id?: number | null;
+  transaction_ids: number[];
+}
+
+export interface ScanSessionResult {
+  session_id: number;
+  client_session_id?: string | null;
+  received: number;
+  applied: number;
+  duplicates: number;
+  failed: number;
+  created_at?: string;
+  results: ScanEventResult[];
+}
+
+export const scanService = {
+  /**
+   * Resolve many scanned codes in one request
+   */
+  resolve: async (
+    codes: string[],
+    options?: { include_location?: boolean; allow_prefix?: boolean }
+  ): Promise<ScanResolution[]> => {
+    const response = await api.post('/api/scan/resolve', { codes, ...options });
+    return response.data;
+  },
+
+  /**
+   * Resolve a single scanned code
+   */
+  resolveOne: async (code: string, allowPrefix: boolean = false): Promise<ScanResolution> => {
+    const response = await api.get('/api/scan/resolve', {
+      params: { code, allow_prefix: allowPrefix },
+    });
+    return response.data;
+  },
+
+  /**
+   * Sync a queued batch of offline scan events in one request.
+   * Safe to re-send: already applied idempotency keys come back as 'duplicate'.
+   */
+  syncSession: async (data: {
+    events: ScanEvent[];
+    store_id?: number;
+    client_session_id?: string;
+    device_id?: string;
+  }): Promise<ScanSessionResult> => {
+    const response = await api.post('/api/scan/sessions', data);
+    return response.data;
+  },
+
+  getSession: async (sessionId: number): Promise<ScanSessionResult> => {
+    const response = await api.get(`/api/scan/sessions/${sessionId}`);
+    return response.data;
+  },
+};
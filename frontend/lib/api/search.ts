@@ -0,0 +1,35 @@
+import api from '../api';
+
+export type SearchResultType = 'item' | 'box' | 'po' | 'item_type' | 'transaction';
+
+export interface SearchResult {
+  type: SearchResultType;
+  id: number | string; // po results are keyed by po_number
+  title: string | null;
+  subtitle: string | null;
+  link: string | null;
+  score: number;
+}
+
+export const searchService = {
+  /**
+   * Ranked type-ahead search across items, boxes, POs, item types and transactions.
+   * Pair with useDebounce on the input value.
+   */
+  search: async (
+    q: string,
+    params?: {
+      types?: SearchResultType[];
+      limit?: number;
+    }
+  ): Promise<SearchResult[]> => {
+    const response = await api.get('/api/search/', {
+      params: {
+        q,
+        types: params?.types?.join(','),
+        limit: params?.limit,
+      },
+    });
+    return response.data;
+  },
+};
@@ -42,8 +42,10 @@ export const storesService = {
     status?: string;
     store_type?: string;
     search?: string;
+    include_counts?: boolean;
   }): Promise<Store[]> {
-    const response = await api.get<Store[]>('/api/stores/', { params });
+    // Pickers don't show stock figures: skipping them lets the API answer from its cache (304)
+    const response = await api.get<Store[]>('/api/stores/', { params: { include_counts: false, ...params } });
     return response.data;
   },
 
@@ -10,6 +10,7 @@ export interface User {
   email?: string;
   full_name?: string;
   profile_photo?: string | null;
+  profile_photo_variants?: Record<string, Record<string, string>> | null; // {"64": {"webp", "jpg"}, "256": {...}}
   role: 'admin' | 'manager' | 'worker' | 'intern';
   status: 'active' | 'inactive';
   created_at: string;
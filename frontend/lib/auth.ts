@@ -6,6 +6,7 @@ export interface User {
   full_name: string;
   email: string | null;
   profile_photo?: string | null;
+  profile_photo_variants?: Record<string, Record<string, string>> | null; // {"64": {"webp", "jpg"}, "256": {...}}
   role: 'admin' | 'manager' | 'worker' | 'intern';
   status: 'active' | 'inactive';
   created_at: string;